@@ -7,6 +7,7 @@ import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 from apscheduler.schedulers.background import BackgroundScheduler
 import atexit
+from threading import Lock
 from datetime import datetime
 from os import environ, path, mkdir
 from dotenv import load_dotenv
@@ -14,65 +15,206 @@ from logging import basicConfig, DEBUG, ERROR, StreamHandler
 from logging.handlers import RotatingFileHandler
 
 from application.models.orm import db
+from application.models.models import User
 from application.codeforces.organization import (
     get_organization_users_information,
+    get_users_information,
+    get_organization_contests_participants,
     get_organization_users_contests,
     get_organization_users_problems,
 )
-from application.codeforces.contests import get_all_contests
+from application.codeforces import client
+from application.codeforces.contests import get_all_contests, get_new_contest_ids
 from application.codeforces.problems import get_all_problems
-from application.database import update_db
+from application.database import (
+    update_db,
+    prepare_staging_tables,
+    drop_staging_tables,
+    add_contest_participants_to_staging,
+    add_problems_solved_to_staging,
+    update_users_ratings,
+    get_submission_watermarks,
+    get_stored_handles,
+    get_stored_contest_ids,
+    rebuild_outdated_statistics,
+)
+from application.migrations import run_migrations
+from application.partitioning import init_partitions
+from application.response_cache import init_response_cache
+from application.utils.constants import UPDATE_DEADLINE
+from application.utils.json_encoder import JSONEncoder
 
 
 load_dotenv()
 
 
-def perform_update(app: Flask):
+# Ensures that the scheduled updates never run at the same time.
+update_lock = Lock()
+
+
+def perform_update(app: Flask, full_resync: bool = False):
     """
     Obtains the required data and performs a scheduled update to the database.
 
+    By default, for users who were already present during the previous update, only the
+    submissions made since then and the rating changes of new contests are fetched. A full
+    resynchronization refetches the entire submission and rating history of every user instead.
+
     Arguments:
     * app - The Flask application.
+    * full_resync - Boolean flag indicating whether to refetch all submissions and contests.
     """
 
-    try:
-        # 1. List of handles of users of the organization and their information.
-        users_information = get_organization_users_information()
-        handles = [user["handle"] for user in users_information]
-        app.logger.info(
-            f"{len(handles)} HANDLES FOUND IN {environ.get('ORGANIZATION_NAME')} AND USERS' INFORMATION RETRIEVED."
+    with update_lock, app.app_context():
+        # Statistics left outdated by a previous update are rebuilt first.
+        rebuild_outdated_statistics(app)
+
+        # Data stored during the previous update.
+        if full_resync:
+            submission_watermarks, stored_handles, stored_contest_ids = {}, set(), set()
+        else:
+            # Newest submission of each user seen during the previous update.
+            submission_watermarks = get_submission_watermarks()
+            stored_handles = get_stored_handles()
+            stored_contest_ids = get_stored_contest_ids()
+
+        # The users' contests and problems are written to the staging tables as soon as
+        # they are retrieved, so that the database writes overlap with the requests and
+        # the data of the whole organization is never held in memory at once.
+        prepare_staging_tables()
+
+        # Bounds the time the data retrieval may take, so that a Codeforces outage does
+        # not keep the update running until the next one is scheduled.
+        client.start_update(UPDATE_DEADLINE)
+
+        try:
+            # 1. List of handles of users of the organization and their information.
+            users_information = get_organization_users_information()
+            handles = [user.handle for user in users_information]
+            app.logger.info(
+                f"{len(handles)} HANDLES FOUND IN {environ.get('ORGANIZATION_NAME')} AND USERS' INFORMATION RETRIEVED."
+            )
+
+            # 2. Get the required information from the Codeforces API.
+
+            # List of all the contests.
+            contests = get_all_contests()
+            app.logger.info(f"{len(contests)} CONTESTS RETRIEVED.")
+
+            # List of all the problems.
+            problems = get_all_problems()
+            app.logger.info(f"{len(problems)} PROBLEMS RETRIEVED.")
+
+            # Obtain the contests statistics of the users. Participation only changes when
+            # a contest finishes, so for users who were already present, only the rating
+            # changes of new contests are fetched (one call per contest instead of per user).
+            if stored_contest_ids:
+                incremental_contests_handles = set(handles) & stored_handles
+            else:
+                incremental_contests_handles = set()
+
+            new_contest_ids = get_new_contest_ids(contests, stored_contest_ids)
+            if not incremental_contests_handles:
+                new_contest_ids = []
+
+            for _, contest_participants in get_organization_contests_participants(
+                new_contest_ids, incremental_contests_handles
+            ):
+                add_contest_participants_to_staging(contest_participants)
+
+            users_contests_handles = [
+                handle
+                for handle in handles
+                if handle not in incremental_contests_handles
+            ]
+            for _, user_contests in get_organization_users_contests(
+                users_contests_handles
+            ):
+                add_contest_participants_to_staging(user_contests)
+
+            app.logger.info(
+                f"{len(users_contests_handles)} USERS' CONTESTS AND {len(new_contest_ids)} NEW CONTESTS' PARTICIPANTS RETRIEVED."
+            )
+
+            # Obtain the problems statistics of the users. Users with a watermark only have
+            # their new submissions fetched.
+            incremental_problems_handles = set(handles) & set(submission_watermarks)
+            new_submission_watermarks = {}
+
+            for (
+                handle,
+                user_problems,
+                newest_submission_id,
+            ) in get_organization_users_problems(handles, submission_watermarks):
+                add_problems_solved_to_staging(user_problems)
+
+                # Users who have not made any submissions do not get a watermark.
+                if newest_submission_id is not None:
+                    new_submission_watermarks[handle] = newest_submission_id
+
+            app.logger.info(
+                f"{len(handles)} USERS' PROBLEMS RETRIEVED ({len(incremental_problems_handles)} INCREMENTALLY)."
+            )
+        except Exception as e:
+            app.logger.exception(
+                f"ERROR OCCURRED DURING CODEFORCES DATA RETRIEVAL: {e}"
+            )
+            db.session.rollback()
+            drop_staging_tables()
+            return
+        finally:
+            client.finish_update()
+            request_statistics = client.statistics.summary()
+            app.logger.info(
+                f"{request_statistics['calls']} CODEFORCES API CALLS MADE, "
+                f"{request_statistics['cache_hits']} SERVED FROM CACHE, "
+                f"{request_statistics['bytes']} BYTES RECEIVED, "
+                f"AVERAGE LATENCY {request_statistics['average_latency']:.3f}s, "
+                f"MAX LATENCY {request_statistics['max_latency']:.3f}s."
+            )
+
+        # 3. Update the database with the retrieved and staged data. In the partitioned
+        # storage mode, the partitions of the new month are created first.
+        init_partitions(app)
+        update_db(
+            app,
+            contests,
+            problems,
+            users_information,
+            new_submission_watermarks,
+            incremental_contests_handles,
+            incremental_problems_handles,
         )
 
-        # 2. Get the required information from the Codeforces API.
-
-        # List of all the contests.
-        contests = get_all_contests()
-        app.logger.info(f"{len(contests)} CONTESTS RETRIEVED.")
-
-        # List of all the problems.
-        problems = get_all_problems()
-        app.logger.info(f"{len(problems)} PROBLEMS RETRIEVED.")
-
-        # Obtain the contests statistics of the users.
-        users_contests = get_organization_users_contests(handles)
-        app.logger.info(f"{len(users_contests)} USERS' CONTESTS RETRIEVED.")
-
-        # Obtain the problems statistics of the users.
-        users_problems = get_organization_users_problems(handles)
-        app.logger.info(f"{len(users_problems)} USERS' PROBLEMS RETRIEVED.")
-    except Exception as e:
-        app.logger.exception(f"ERROR OCCURRED DURING CODEFORCES DATA RETRIEVAL: {e}")
-        return
-
-    # 3. Update the database with the retrieved data.
-    update_db(
-        app,
-        contests,
-        problems,
-        users_information,
-        users_contests,
-        users_problems,
-    )
+
+def perform_ratings_refresh(app: Flask):
+    """
+    Refreshes the ratings and ranks of the users already in the database. Unlike
+    perform_update, the full list of rated users is not downloaded, so this is cheap
+    enough to run much more often.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    with update_lock:
+        with app.app_context():
+            handles = [user.handle for user in User.query.all()]
+
+        client.start_update(UPDATE_DEADLINE)
+
+        try:
+            users_information = get_users_information(handles)
+            app.logger.info(f"{len(users_information)} USERS' RATINGS RETRIEVED.")
+        except Exception as e:
+            app.logger.exception(
+                f"ERROR OCCURRED DURING CODEFORCES DATA RETRIEVAL: {e}"
+            )
+            return
+        finally:
+            client.finish_update()
+
+        update_users_ratings(app, users_information)
 
 
 def register_error_handlers(app: Flask):
@@ -155,14 +297,14 @@ def init_sentry():
 
 def init_db(app: Flask):
     """
-    Initializes the database and creates the tables.
+    Initializes the database. The tables are created by run_migrations (see
+    application/migrations.py).
 
     Arguments:
     * app - The Flask application.
     """
 
     db.init_app(app)
-    db.create_all(app=app)
 
 
 def init_scheduler(app: Flask):
@@ -179,8 +321,31 @@ def init_scheduler(app: Flask):
         args=[app],
         trigger="interval",
         hours=int(environ.get("UPDATE_INTERVAL", "12")),
+        # Runs that were missed while an update was in progress are merged into one,
+        # instead of piling up behind it.
+        coalesce=True,
         # next_run_time=datetime.now(),
     )
+    # Incremental updates can miss changes to old submissions (eg. rejudges, or problem
+    # ratings and tags assigned after a contest), so the full submission history is
+    # periodically refetched.
+    scheduler.add_job(
+        func=perform_update,
+        args=[app],
+        kwargs={"full_resync": True},
+        trigger="interval",
+        hours=int(environ.get("FULL_RESYNC_INTERVAL", "168")),
+        coalesce=True,
+    )
+    # Ratings change after every contest, so they are refreshed more often than the rest
+    # of the data.
+    scheduler.add_job(
+        func=perform_ratings_refresh,
+        args=[app],
+        trigger="interval",
+        hours=int(environ.get("RATINGS_REFRESH_INTERVAL", "1")),
+        coalesce=True,
+    )
     scheduler.start()
 
     # Shut down the scheduler when exiting the app.
@@ -222,12 +387,24 @@ def create_app(config_class: str):
     # Makes app treat route URLs with and without trailing slashes the same.
     app.url_map.strict_slashes = False
 
+    # Encodes the responses with orjson if it is installed.
+    app.json_encoder = JSONEncoder
+
     # Application configuration.
     init_logger()
     register_error_handlers(app)
     init_sentry()
     register_blueprints(app)
     init_db(app)
+    # The migrations are only applied here, and not by every worker process (see
+    # gunicorn.conf.py), so that they are never applied concurrently.
+    run_migrations(app)
+    init_partitions(app)
+    # Statistics that were never built (eg. after the statistics tables were added) or
+    # whose rebuild failed are rebuilt.
+    with app.app_context():
+        rebuild_outdated_statistics(app)
+    init_response_cache(app)
     init_scheduler(app)
 
     return app
@@ -0,0 +1,114 @@
+"""
+Contains the aggregation of the problem statistics in the database. Instead of loading
+every problem solved and counting them in Python (see extract_problems_information in
+application/helpers/problems.py), the problems solved are counted with GROUP BY queries,
+one per statistic and period. The statistics have the same shape as those returned by
+get_problems_statistics.
+"""
+
+from collections import defaultdict
+
+from application.models.orm import db
+from application.models.models import Language, ProblemSolved, Tag
+from application.helpers.problems import extract_problems_information
+from application.utils.common import get_period_ranges
+from application.utils.constants import STATISTICS_PERIODS, TAG_MASK_BITS
+
+
+def get_period_conditions():
+    """
+    Returns a dictionary mapping the statistics periods to the conditions on the time the
+    problems were solved in them (None for all-time).
+
+    The conditions are applied in the WHERE clause of the queries of each period, so that
+    the queries for the recent periods only read the recent problems solved, through the
+    (handle, solved_time) index or, if the table is partitioned, the partition of the
+    current month (see application/partitioning.py).
+    """
+
+    period_ranges = get_period_ranges()
+
+    return {"all_time": None} | {
+        period: db.and_(
+            ProblemSolved.solved_time >= period_ranges[period][0],
+            ProblemSolved.solved_time < period_ranges[period][1],
+        )
+        for period in STATISTICS_PERIODS[1:]
+    }
+
+
+def get_dimension_queries():
+    """
+    Returns a dictionary mapping each statistic (eg. "tags") to a query of the problems
+    solved, grouped by the handle and the value counted by the statistic.
+    """
+
+    # Bit tag.id of the tag mask of a problem solved is set if it has the tag.
+    has_tag = (
+        ProblemSolved.tag_mask.op("&")(db.cast(1, db.BigInteger).op("<<")(Tag.id)) != 0
+    )
+    # Only the first letter of the index matters to us, eg. "A1" is counted as "A".
+    index_letter = db.func.substr(ProblemSolved.index, 1, 1)
+
+    return {
+        "tags": (
+            db.session.query(ProblemSolved.handle, Tag.name)
+            .join(Tag, db.and_(Tag.id < TAG_MASK_BITS, has_tag))
+            .group_by(ProblemSolved.handle, Tag.name)
+        ),
+        "indexes": (
+            db.session.query(ProblemSolved.handle, index_letter).group_by(
+                ProblemSolved.handle, index_letter
+            )
+        ),
+        # Rating is 0 if the rating of the problem is not specified in the Codeforces API.
+        "ratings": (
+            db.session.query(ProblemSolved.handle, ProblemSolved.rating)
+            .filter(ProblemSolved.rating != 0)
+            .group_by(ProblemSolved.handle, ProblemSolved.rating)
+        ),
+        "languages": (
+            db.session.query(ProblemSolved.handle, Language.name)
+            .join(Language, Language.id == ProblemSolved.language_id)
+            .group_by(ProblemSolved.handle, Language.name)
+        ),
+    }
+
+
+def aggregate_problems_statistics(handle: str = None):
+    """
+    Returns a dictionary mapping the handle of each user who solved problems to the
+    problems statistics (all-time, this month, this week, today) of the user.
+
+    Arguments:
+    * handle - The handle of the user whose statistics are aggregated. If None, the
+    statistics of every user are aggregated.
+    """
+
+    def filter_query(query, condition):
+        if handle is not None:
+            query = query.filter(ProblemSolved.handle == handle)
+        if condition is not None:
+            query = query.filter(condition)
+
+        return query.add_columns(db.func.count())
+
+    statistics = defaultdict(
+        lambda: {
+            period: extract_problems_information([], {}, {})
+            for period in STATISTICS_PERIODS
+        }
+    )
+
+    for period, condition in get_period_conditions().items():
+        for user_handle, count in filter_query(
+            db.session.query(ProblemSolved.handle).group_by(ProblemSolved.handle),
+            condition,
+        ):
+            statistics[user_handle][period]["total_problems"] = count
+
+        for dimension, query in get_dimension_queries().items():
+            for user_handle, key, count in filter_query(query, condition):
+                statistics[user_handle][period][dimension][key] = count
+
+    return dict(statistics)
@@ -0,0 +1,201 @@
+"""
+Contains the optional on-disk cache of raw Codeforces API responses, used by the client
+(see application/codeforces/client.py).
+
+Responses are stored gzip-compressed, keyed by the API method and its parameters, and are
+served from the cache until they are older than API_CACHE_TTL seconds. This way, an update
+that is retried or restarted after a crash does not download everything again. Expired
+responses are removed when responses are written, at most once every
+API_CACHE_CLEANUP_INTERVAL seconds, so that the cache does not grow without bound.
+
+In replay mode (API_CACHE_REPLAY=true), every response is served from the cache regardless
+of its age and nothing is requested from the Codeforces API, which allows updates to be
+replayed deterministically and offline, eg. for profiling and benchmarking.
+
+The cache is disabled if API_CACHE_DIR is empty.
+"""
+
+import gzip
+from glob import glob
+from hashlib import sha256
+from json import dumps
+from os import environ, makedirs, path, remove, replace
+from tempfile import NamedTemporaryFile
+from time import time
+from typing import Iterable, Iterator
+
+from application.utils.constants import (
+    API_CACHE_CLEANUP_INTERVAL,
+    API_STREAM_CHUNK_SIZE,
+)
+
+# Time (see time.time) at which the expired responses were last removed.
+last_cleanup_time = 0.0
+
+
+class CacheMissError(Exception):
+    """
+    Raised in replay mode when a response is not in the cache.
+    """
+
+
+def is_enabled():
+    """
+    Returns whether the cache is enabled.
+    """
+
+    return bool(environ.get("API_CACHE_DIR", ""))
+
+
+def is_replay():
+    """
+    Returns whether the cache is in replay mode.
+    """
+
+    return is_enabled() and environ.get("API_CACHE_REPLAY", "false") == "true"
+
+
+def get_ttl():
+    """
+    Returns the time in seconds for which cached responses are served.
+    """
+
+    return int(environ.get("API_CACHE_TTL", "3600"))
+
+
+def get_cache_path(method: str, params: dict = None):
+    """
+    Returns the path of the cache file of a request.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    """
+
+    key = dumps(params or {}, sort_keys=True, default=str)
+    return path.join(
+        environ.get("API_CACHE_DIR", ""),
+        f"{method}-{sha256(key.encode()).hexdigest()[:32]}.json.gz",
+    )
+
+
+def read(method: str, params: dict = None):
+    """
+    Returns an iterator over the chunks of the cached response body of a request, or None
+    if the response is not cached or has expired. In replay mode, CacheMissError is raised
+    instead of returning None.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    """
+
+    if not is_enabled():
+        return None
+
+    cache_path = get_cache_path(method, params)
+    if path.exists(cache_path) and (
+        is_replay() or time() - path.getmtime(cache_path) < get_ttl()
+    ):
+        return read_chunks(cache_path)
+
+    if is_replay():
+        raise CacheMissError(f"{method} with parameters {params} is not cached.")
+
+    return None
+
+
+def read_chunks(cache_path: str):
+    """
+    Yields the decompressed contents of a cache file chunk by chunk.
+
+    Arguments:
+    * cache_path - The path of the cache file.
+    """
+
+    with gzip.open(cache_path, "rb") as file:
+        while chunk := file.read(API_STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+def write(method: str, params: dict, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Yields the given chunks of a response body unchanged, while writing them to the cache.
+    The response is only stored once all chunks have been consumed, so that an incomplete
+    response is never cached.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    * chunks - The chunks of the response body.
+    """
+
+    if not is_enabled():
+        yield from chunks
+        return
+
+    cache_path = get_cache_path(method, params)
+    makedirs(path.dirname(cache_path), exist_ok=True)
+
+    # The response is written to a temporary file first and then moved in place, so that
+    # concurrent readers never see a partially written file.
+    temporary_file = NamedTemporaryFile(
+        dir=path.dirname(cache_path), suffix=".tmp", delete=False
+    )
+    committed = False
+
+    try:
+        with gzip.GzipFile(fileobj=temporary_file, mode="wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                yield chunk
+
+        temporary_file.close()
+        replace(temporary_file.name, cache_path)
+        committed = True
+    finally:
+        if not committed:
+            temporary_file.close()
+            remove(temporary_file.name)
+
+    remove_expired()
+
+
+def store(method: str, params: dict, content: bytes):
+    """
+    Stores a complete response body in the cache.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    * content - The response body.
+    """
+
+    for _ in write(method, params, [content]):
+        pass
+
+
+def remove_expired():
+    """
+    Removes the expired responses from the cache, along with the temporary files left by
+    interrupted writes, unless they were removed less than API_CACHE_CLEANUP_INTERVAL
+    seconds ago. Nothing is removed in replay mode, where expired responses are served.
+    """
+
+    global last_cleanup_time
+
+    if is_replay() or time() - last_cleanup_time < API_CACHE_CLEANUP_INTERVAL:
+        return
+
+    last_cleanup_time = time()
+    directory = environ.get("API_CACHE_DIR", "")
+
+    for cache_path in glob(path.join(directory, "*.json.gz")) + glob(
+        path.join(directory, "*.tmp")
+    ):
+        # Another thread or process may have removed the file already.
+        try:
+            if time() - path.getmtime(cache_path) >= get_ttl():
+                remove(cache_path)
+        except FileNotFoundError:
+            pass
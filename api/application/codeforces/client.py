@@ -0,0 +1,518 @@
+"""
+Contains the HTTP client used for all requests made to the Codeforces API.
+
+All requests share a single pooled keep-alive session and a process-wide rate limiter,
+so that the worker threads used during updates (see application/codeforces/organization.py)
+can never exceed the request rate allowed by the Codeforces API together.
+
+Failed requests are retried with exponential backoff, up to a maximum number of attempts
+and never past the deadline of the current update. If the Codeforces API keeps failing,
+a circuit breaker opens and all further requests fail immediately, aborting the update.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from codecs import getincrementaldecoder
+from json import loads
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+
+from application.codeforces import cache
+from application.utils.common import iterate_json_array
+from application.utils.constants import (
+    API_BASE_URL,
+    API_REQUESTS_PER_SECOND,
+    API_REQUEST_TIMEOUT,
+    API_STREAM_CHUNK_SIZE,
+    API_MAX_ATTEMPTS,
+    API_RETRY_BASE_DELAY,
+    API_RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_COOLDOWN,
+    MAX_WORKER_THREADS,
+)
+
+
+"""
+Exceptions raised by the client.
+"""
+
+
+class CodeforcesAPIError(Exception):
+    """
+    Raised when a request to the Codeforces API fails.
+    """
+
+
+class RequestRejectedError(CodeforcesAPIError):
+    """
+    Raised when the Codeforces API rejects a request (eg. a handle that does not exist).
+    Such requests are not retried, since they would fail again.
+    """
+
+
+class CircuitOpenError(CodeforcesAPIError):
+    """
+    Raised when a request is not sent because the circuit breaker is open.
+    """
+
+
+class UpdateDeadlineExceeded(CodeforcesAPIError):
+    """
+    Raised when a request cannot be completed before the deadline of the current update.
+    """
+
+
+"""
+Request policies.
+"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Arguments:
+        * rate - Number of tokens added to the bucket per second.
+        * capacity - Maximum number of tokens the bucket can hold (i.e. the maximum burst size).
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill_time = monotonic()
+        self.lock = Lock()
+
+    def acquire(self):
+        """
+        Takes a token from the bucket, blocking until one is available.
+        """
+
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill_time) * self.rate,
+                )
+                self.last_refill_time = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                # Time until the next token is added to the bucket.
+                wait_time = (1 - self.tokens) / self.rate
+
+            sleep(wait_time)
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker. Opens after a number of consecutive failures and rejects
+    requests until the cooldown has passed. After the cooldown, requests are let through
+    again, but a single failure reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        """
+        Arguments:
+        * failure_threshold - Number of consecutive failures after which the circuit opens.
+        * cooldown - Time in seconds for which the circuit stays open.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = Lock()
+
+    def check(self):
+        """
+        Raises CircuitOpenError if the circuit is open.
+        """
+
+        with self.lock:
+            if self.opened_at is None:
+                return
+
+            if monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpenError(
+                    f"Circuit open after {self.consecutive_failures} consecutive failures."
+                )
+
+            # The cooldown has passed. The next failure opens the circuit again.
+            self.opened_at = None
+            self.consecutive_failures = self.failure_threshold - 1
+
+    def record_success(self):
+        """
+        Records a successful request, closing the circuit.
+        """
+
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """
+        Records a failed request, opening the circuit if the threshold is reached.
+        """
+
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = monotonic()
+
+    def reset(self):
+        """
+        Closes the circuit and clears the failure count.
+        """
+
+        self.record_success()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by a maximum number of attempts and
+    an optional deadline.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        """
+        Arguments:
+        * max_attempts - Maximum number of attempts for a request.
+        * base_delay - Delay in seconds before the first retry (before jitter).
+        * max_delay - Maximum delay in seconds between two attempts (before jitter).
+        """
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = None
+
+    def set_deadline(self, timeout: float = None):
+        """
+        Sets the deadline after which no more attempts are made.
+
+        Arguments:
+        * timeout - Time in seconds from now. If None, the deadline is removed.
+        """
+
+        self.deadline = None if timeout is None else monotonic() + timeout
+
+    def check_deadline(self):
+        """
+        Raises UpdateDeadlineExceeded if the deadline has passed.
+        """
+
+        if self.deadline is not None and monotonic() >= self.deadline:
+            raise UpdateDeadlineExceeded("The deadline of the update was exceeded.")
+
+    def backoff(self, attempt: int):
+        """
+        Returns the delay in seconds before the next attempt, never past the deadline.
+
+        Arguments:
+        * attempt - Number of attempts made so far.
+        """
+
+        delay = uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+        if self.deadline is not None:
+            delay = min(delay, max(self.deadline - monotonic(), 0))
+
+        return delay
+
+
+class RequestStatistics:
+    """
+    Thread-safe counters of the requests made to the Codeforces API.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Resets all the counters.
+        """
+
+        with self.lock:
+            self.calls = 0
+            self.cache_hits = 0
+            self.bytes = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def record(self, response_bytes: int, latency: float):
+        """
+        Records a completed request.
+
+        Arguments:
+        * response_bytes - Size of the response body in bytes.
+        * latency - Time taken by the request in seconds.
+        """
+
+        with self.lock:
+            self.calls += 1
+            self.bytes += response_bytes
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_cache_hit(self):
+        """
+        Records a request that was served from the cache.
+        """
+
+        with self.lock:
+            self.cache_hits += 1
+
+    def record_bytes(self, response_bytes: int):
+        """
+        Records bytes of a streamed response received after the request was recorded.
+
+        Arguments:
+        * response_bytes - Number of bytes received.
+        """
+
+        with self.lock:
+            self.bytes += response_bytes
+
+    def summary(self):
+        """
+        Returns the current counters as a dictionary.
+        """
+
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "bytes": self.bytes,
+                "average_latency": self.total_latency / self.calls
+                if self.calls
+                else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+
+# Shared by all threads. The connection pool holds one connection per worker thread.
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKER_THREADS),
+)
+
+rate_limiter = TokenBucket(API_REQUESTS_PER_SECOND)
+retry_policy = RetryPolicy(API_MAX_ATTEMPTS, API_RETRY_BASE_DELAY, API_RETRY_MAX_DELAY)
+circuit_breaker = CircuitBreaker(
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN
+)
+statistics = RequestStatistics()
+
+
+"""
+Update lifecycle functions.
+"""
+
+
+def start_update(deadline: float = None):
+    """
+    Prepares the client for a new update: resets the statistics and the circuit breaker
+    and sets the deadline of the update.
+
+    Arguments:
+    * deadline - Time in seconds the update may take. If None, there is no deadline.
+    """
+
+    statistics.reset()
+    circuit_breaker.reset()
+    retry_policy.set_deadline(deadline)
+
+
+def finish_update():
+    """
+    Removes the deadline of the finished update.
+    """
+
+    retry_policy.set_deadline(None)
+
+
+"""
+Request functions.
+"""
+
+
+def is_retryable(error: Exception):
+    """
+    Returns whether a failed request should be retried. Connection errors, timeouts, rate
+    limiting, server errors and bodies which are not JSON are retried. Other client errors
+    (eg. a handle that does not exist) are not, since they would fail again.
+
+    Arguments:
+    * error - The exception raised by the request.
+    """
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+
+    return True
+
+
+def get(method: str, params: dict = None, stream: bool = False):
+    """
+    Sends a request to the given Codeforces API method and returns a tuple of the response
+    and its decoded JSON body (None if the response is streamed). Blocks until the request
+    is allowed by the rate limiter. Failed requests are retried according to the retry
+    policy.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    * stream - Boolean flag indicating whether to return as soon as the headers are received,
+    without downloading the body. The caller must close the response.
+    """
+
+    attempt = 0
+
+    while True:
+        retry_policy.check_deadline()
+        circuit_breaker.check()
+        rate_limiter.acquire()
+        attempt += 1
+
+        try:
+            start_time = monotonic()
+            response = session.get(
+                f"{API_BASE_URL}{method}",
+                params=params,
+                timeout=API_REQUEST_TIMEOUT,
+                stream=stream,
+            )
+            statistics.record(
+                0 if stream else len(response.content), monotonic() - start_time
+            )
+            response.raise_for_status()
+
+            # The body is decoded here, so that a successful response whose body is not
+            # JSON (eg. an error page of a proxy) is retried like a server error.
+            body = None if stream else loads(response.content)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Release the connection of a failed streamed response.
+            if getattr(e, "response", None) is not None:
+                e.response.close()
+
+            if not is_retryable(e):
+                raise RequestRejectedError(f"{method} failed: {e}") from e
+
+            circuit_breaker.record_failure()
+
+            if attempt >= retry_policy.max_attempts:
+                raise CodeforcesAPIError(
+                    f"{method} failed after {attempt} attempts: {e}"
+                ) from e
+
+            sleep(retry_policy.backoff(attempt))
+            continue
+
+        circuit_breaker.record_success()
+        return response, body
+
+
+def call(method: str, params: dict = None):
+    """
+    Calls the given Codeforces API method and returns its result. The response is served
+    from the on-disk cache if available (see application/codeforces/cache.py).
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.status".
+    * params - The query parameters of the request.
+    """
+
+    cached_chunks = cache.read(method, params)
+
+    if cached_chunks is not None:
+        statistics.record_cache_hit()
+        content = b"".join(cached_chunks)
+        body = loads(content)
+    else:
+        response, body = get(method, params)
+        content = response.content
+
+    if body["status"] != "OK":
+        raise CodeforcesAPIError(f"{method} failed: {body.get('comment')}")
+
+    if cached_chunks is None:
+        cache.store(method, params, content)
+
+    return body["result"]
+
+
+def stream(method: str, params: dict = None):
+    """
+    Calls the given Codeforces API method and yields the items of its result (which must
+    be a list) one by one as the response is received. Unlike call, the whole response is
+    never held in memory, which matters for very large results such as user.ratedList.
+    The response is served from the on-disk cache if available.
+
+    Errors while the body is being received are not retried, since some of the items
+    may already have been consumed.
+
+    Arguments:
+    * method - The Codeforces API method, eg. "user.ratedList".
+    * params - The query parameters of the request.
+    """
+
+    chunks = cache.read(method, params)
+    response = None
+
+    if chunks is not None:
+        statistics.record_cache_hit()
+    else:
+        response, _ = get(method, params, stream=True)
+        chunks = cache.write(method, params, iterate_response_chunks(response))
+
+    def decoded_chunks():
+        """
+        Yields the body of the response as text, chunk by chunk.
+        """
+
+        decoder = getincrementaldecoder("utf-8")()
+
+        for chunk in chunks:
+            yield decoder.decode(chunk)
+
+        yield decoder.decode(b"", final=True)
+
+    try:
+        yield from iterate_json_array(decoded_chunks(), "result")
+
+        # Consume the rest of the body after the result, so that the response is cached.
+        for _ in chunks:
+            pass
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise CodeforcesAPIError(f"{method} failed: {e}") from e
+    finally:
+        # Discards the partially written cache file if the response was not fully consumed.
+        if response is not None:
+            chunks.close()
+            response.close()
+
+
+def iterate_response_chunks(response: requests.Response):
+    """
+    Yields the body of a streamed response chunk by chunk, counting the bytes received.
+
+    Arguments:
+    * response - The streamed response.
+    """
+
+    for chunk in response.iter_content(chunk_size=API_STREAM_CHUNK_SIZE):
+        statistics.record_bytes(len(chunk))
+        yield chunk
@@ -2,11 +2,12 @@
 Contains methods for obtaining information about a Codeforces contest.
 """
 
-import requests
-from time import sleep
+from datetime import datetime, timedelta
 
-from application.utils.constants import API_BASE_URL
+from application.codeforces import client
+from application.models.records import ContestRecord, RatingChangeRecord
 from application.utils.common import convert_timestamp_to_datetime
+from application.utils.constants import RATING_CHANGES_LOOKBACK_DAYS
 
 
 def get_all_contests():
@@ -14,19 +15,11 @@ def get_all_contests():
     Obtains information about all Codeforces contests.
     """
 
-    url = f"{API_BASE_URL}contest.list"
-    response = None
-
-    # Send the request to the Codeforces API and retry if it fails.
-    while not response:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-        except requests.exceptions.RequestException:
-            sleep(1)
+    # Send the request to the Codeforces API (retried by the client if it fails).
+    result = client.call("contest.list")
 
     # Filtering out the contests that have not finished.
-    result = filter(lambda x: x["phase"] == "FINISHED", response.json()["result"])
+    result = filter(lambda x: x["phase"] == "FINISHED", result)
 
     contests = []  # List of contests.
 
@@ -35,12 +28,79 @@ def get_all_contests():
         contest_time = convert_timestamp_to_datetime(contest["startTimeSeconds"])
 
         contests.append(
-            {
-                "contest_id": contest["id"],
-                "name": contest["name"],
-                "date": contest_time,
-                "duration": contest["durationSeconds"],
-            }
+            ContestRecord(
+                contest_id=contest["id"],
+                name=contest["name"],
+                date=contest_time,
+                duration=contest["durationSeconds"],
+            )
         )
 
     return contests
+
+
+def get_new_contest_ids(contests: list[ContestRecord], stored_contest_ids: set[int]):
+    """
+    Returns the IDs of the finished contests whose rating changes may not have been stored
+    yet. These are the contests that are not in the database yet, as well as the contests
+    that took place in the last RATING_CHANGES_LOOKBACK_DAYS days, since ratings are only
+    updated some time after a contest has finished.
+
+    Arguments:
+    * contests - List of all the finished contests.
+    * stored_contest_ids - Set of IDs of the contests stored in the database.
+    """
+
+    lookback_date = datetime.now() - timedelta(days=RATING_CHANGES_LOOKBACK_DAYS)
+
+    return [
+        contest.contest_id
+        for contest in contests
+        if contest.contest_id not in stored_contest_ids or contest.date >= lookback_date
+    ]
+
+
+def get_contest_participants(contest_id: int, handles: set[str]):
+    """
+    Obtains the rating changes of the given users in a contest. Returns an empty list if
+    the contest is unrated or its ratings have not been updated yet.
+
+    Arguments:
+    * contest_id - The ID of the contest.
+    * handles - Set of handles of the users.
+    """
+
+    payload = {"contestId": contest_id}
+
+    try:
+        # The rating changes of every participant of the contest are returned, so the
+        # response is parsed incrementally and only the given users are kept.
+        result = [
+            rating_change
+            for rating_change in client.stream("contest.ratingChanges", params=payload)
+            if rating_change["handle"] in handles
+        ]
+    except client.RequestRejectedError:
+        # Rating changes are unavailable for unrated contests.
+        return []
+
+    contest_participants = []
+
+    for rating_change in result:
+        # Obtaining rating update time in DateTime format.
+        rating_update_time = convert_timestamp_to_datetime(
+            rating_change["ratingUpdateTimeSeconds"]
+        )
+
+        contest_participants.append(
+            RatingChangeRecord(
+                handle=rating_change["handle"],
+                contest_id=rating_change["contestId"],
+                rank=rating_change["rank"],
+                old_rating=rating_change["oldRating"],
+                new_rating=rating_change["newRating"],
+                rating_update_time=rating_update_time,
+            )
+        )
+
+    return contest_participants
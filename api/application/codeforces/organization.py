@@ -3,43 +3,83 @@ Contains methods for obtaining information about an organization and its users.
 """
 
 from os import environ
-import requests
-from time import sleep
 from concurrent.futures import ThreadPoolExecutor
 
+from application.codeforces import client
+from application.codeforces.contests import get_contest_participants
 from application.codeforces.users import get_user_problems, get_user_contests
-from application.utils.common import convert_timestamp_to_datetime
-from application.utils.constants import MAX_WORKER_THREADS, API_BASE_URL
-
-
-def get_organization_users_problems(handles: list[str]):
+from application.models.records import UserRecord
+from application.utils.common import (
+    convert_timestamp_to_datetime,
+    iterate_concurrently,
+)
+from application.utils.constants import (
+    MAX_WORKER_THREADS,
+    PIPELINE_QUEUE_SIZE,
+    USER_INFO_BATCH_SIZE,
+)
+
+
+def get_organization_users_problems(
+    handles: list[str], submission_watermarks: dict[str, int] = None
+):
     """
-    Obtains information about an organization's users' solved problems.
+    Obtains information about an organization's users' solved problems. Yields a tuple of
+    (handle, list of the user's solved problems, ID of the user's newest submission) for
+    each user as soon as it has been retrieved.
 
     Arguments:
     * handles - List of handles of the organization's users.
+    * submission_watermarks - Dictionary mapping handles to the ID of the newest submission
+    seen during the previous update. Only newer submissions are fetched for these handles.
     """
 
-    # Initialize the thread pool.
-    with ThreadPoolExecutor(max_workers=MAX_WORKER_THREADS) as executor:
-        users_problems = list(executor.map(get_user_problems, handles))
+    if submission_watermarks is None:
+        submission_watermarks = {}
 
-    return users_problems
+    for handle, (problems, newest_submission_id) in iterate_concurrently(
+        lambda handle: get_user_problems(handle, submission_watermarks.get(handle)),
+        handles,
+        MAX_WORKER_THREADS,
+        PIPELINE_QUEUE_SIZE,
+    ):
+        yield handle, problems, newest_submission_id
 
 
 def get_organization_users_contests(handles: list[str]):
     """
-    Obtains information about an organization's users' contests.
+    Obtains information about an organization's users' contests. Yields a tuple of
+    (handle, list of the user's contests participated in) for each user as soon as it
+    has been retrieved.
 
     Arguments:
     * handles - List of handles of the organization's users.
     """
 
-    # Initialize the thread pool.
-    with ThreadPoolExecutor(max_workers=MAX_WORKER_THREADS) as executor:
-        users_contests = list(executor.map(get_user_contests, handles))
+    yield from iterate_concurrently(
+        get_user_contests, handles, MAX_WORKER_THREADS, PIPELINE_QUEUE_SIZE
+    )
 
-    return users_contests
+
+def get_organization_contests_participants(contest_ids: list[int], handles: list[str]):
+    """
+    Obtains the participation of an organization's users in the given contests. Yields a
+    tuple of (contest ID, list of contest participation statistics) for each contest as
+    soon as it has been retrieved.
+
+    Arguments:
+    * contest_ids - List of IDs of the contests.
+    * handles - List of handles of the organization's users.
+    """
+
+    handles = set(handles)
+
+    yield from iterate_concurrently(
+        lambda contest_id: get_contest_participants(contest_id, handles),
+        contest_ids,
+        MAX_WORKER_THREADS,
+        PIPELINE_QUEUE_SIZE,
+    )
 
 
 def get_organization_users_information():
@@ -51,7 +91,6 @@ def get_organization_users_information():
     # gives us a method to obtain all users of the organization in one go, while it
     # does not do this for contests or problems. Therefore, we use this method to
     # obtain all the handles in this method and use that in the other methods.
-    url = f"{API_BASE_URL}user.ratedList"
 
     # We include all-time users, not just those who have been active recently.
     # Therefore we set the parameters "activeOnly" to false and "includeRetired" to false.
@@ -59,45 +98,99 @@ def get_organization_users_information():
         "activeOnly": "false",
         "includeRetired": "true",
     }
-    response = None
-
-    # Send the request to the Codeforces API and retry if it fails.
-    while not response:
-        try:
-            response = requests.get(url, params=payload)
-            response.raise_for_status()
-        except requests.exceptions.RequestException:
-            sleep(1)
-
-    # We filter the users belonging to the organization.
-    result = filter(
-        lambda x: "organization" in x
-        and x["organization"] == environ.get("ORGANIZATION_NAME", ""),
-        response.json()["result"],
-    )
 
-    users_information = []
+    organization_name = environ.get("ORGANIZATION_NAME", "")
+
+    # The response contains every rated user on Codeforces, so it is parsed incrementally
+    # and only the users belonging to the organization are kept.
+    result = (
+        user
+        for user in client.stream("user.ratedList", params=payload)
+        if user.get("organization") == organization_name
+    )
 
     # The result contains a list of dictionaries containing information about the users
     # belonging to the organization. We extract the relevant information required by the model
     # and return it.
-    for user in result:
-        # If the user is unrated (i.e. has not given a contest yet), the rating is 0.
-        rating = user.get("rating", 0)
-        max_rating = user.get("maxRating", 0)
-        rank = user.get("rank", "Unrated")
-
-        # Obtaining account creation time in DateTime format.
-        creation_date = convert_timestamp_to_datetime(user["registrationTimeSeconds"])
-
-        users_information.append(
-            {
-                "handle": user["handle"],
-                "creation_date": creation_date,
-                "rating": rating,
-                "max_rating": max_rating,
-                "rank": rank,
-            }
-        )
+    users_information = [extract_user_information(user) for user in result]
 
     return users_information
+
+
+def get_users_information(handles: list[str]):
+    """
+    Obtains up-to-date information about the given Codeforces users with batched user.info
+    calls. Much cheaper than get_organization_users_information, but only covers users that
+    are already known.
+
+    Arguments:
+    * handles - List of handles of the users.
+    """
+
+    batches = [
+        handles[i : i + USER_INFO_BATCH_SIZE]
+        for i in range(0, len(handles), USER_INFO_BATCH_SIZE)
+    ]
+
+    # Initialize the thread pool.
+    with ThreadPoolExecutor(max_workers=MAX_WORKER_THREADS) as executor:
+        results = list(executor.map(get_users_information_batch, batches))
+
+    return [
+        extract_user_information(user)
+        for batch_result in results
+        for user in batch_result
+    ]
+
+
+def get_users_information_batch(handles: list[str]):
+    """
+    Obtains information about the given Codeforces users with a single user.info call.
+
+    user.info rejects the whole batch if any of the handles does not exist (eg. if the user
+    changed their handle). In this case, the batch is split in halves until the offending
+    handles are isolated and skipped.
+
+    Arguments:
+    * handles - List of handles of the users.
+    """
+
+    if not handles:
+        return []
+
+    try:
+        # Send the request to the Codeforces API (retried by the client if it fails).
+        return client.call("user.info", params={"handles": ";".join(handles)})
+    except client.RequestRejectedError:
+        if len(handles) == 1:
+            return []
+
+        middle = len(handles) // 2
+        return get_users_information_batch(
+            handles[:middle]
+        ) + get_users_information_batch(handles[middle:])
+
+
+def extract_user_information(user: dict):
+    """
+    Extracts the information required by the User model from a Codeforces user object.
+
+    Arguments:
+    * user - The user object returned by the Codeforces API.
+    """
+
+    # If the user is unrated (i.e. has not given a contest yet), the rating is 0.
+    rating = user.get("rating", 0)
+    max_rating = user.get("maxRating", 0)
+    rank = user.get("rank", "Unrated")
+
+    # Obtaining account creation time in DateTime format.
+    creation_date = convert_timestamp_to_datetime(user["registrationTimeSeconds"])
+
+    return UserRecord(
+        handle=user["handle"],
+        creation_date=creation_date,
+        rating=rating,
+        max_rating=max_rating,
+        rank=rank,
+    )
@@ -2,10 +2,8 @@
 Contains methods for obtaining information about a Codeforces problem.
 """
 
-import requests
-from time import sleep
-
-from application.utils.constants import API_BASE_URL
+from application.codeforces import client
+from application.models.records import ProblemRecord
 
 
 def get_all_problems():
@@ -13,18 +11,8 @@ def get_all_problems():
     Obtains information about all Codeforces problems.
     """
 
-    url = f"{API_BASE_URL}problemset.problems"
-    response = None
-
-    # Send the request to the Codeforces API and retry if it fails.
-    while not response:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-        except requests.exceptions.RequestException:
-            sleep(1)
-
-    result = response.json()["result"]["problems"]
+    # Send the request to the Codeforces API (retried by the client if it fails).
+    result = client.call("problemset.problems")["problems"]
 
     problems = []  # List of problems.
 
@@ -36,13 +24,13 @@ def get_all_problems():
         tags = ";".join(problem.get("tags", []))
 
         problems.append(
-            {
-                "contest_id": problem["contestId"],
-                "index": problem["index"],
-                "name": problem["name"],
-                "rating": rating,
-                "tags": tags,
-            }
+            ProblemRecord(
+                contest_id=problem["contestId"],
+                index=problem["index"],
+                name=problem["name"],
+                rating=rating,
+                tags=tags,
+            )
         )
 
     return problems
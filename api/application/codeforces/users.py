@@ -2,33 +2,96 @@
 Contains methods for obtaining information about a Codeforces user of the organization.
 """
 
-import requests
-from time import sleep
 from datetime import datetime
 
-from application.utils.constants import API_BASE_URL
+from application.codeforces import client
+from application.models.records import RatingChangeRecord, SubmissionRecord
+from application.utils.constants import SUBMISSIONS_PAGE_SIZE
 from application.utils.common import convert_timestamp_to_datetime
 
 
-def get_user_problems(handle: str):
+def get_user_submissions(handle: str, start: int = None, count: int = None):
     """
-    Obtains information about a user's solved problems.
+    Obtains a user's submissions, from newest to oldest.
 
     Arguments:
     * handle - The handle of the user.
+    * start - 1-based index of the first submission to return. Defaults to the newest submission.
+    * count - Number of submissions to return. Defaults to all submissions.
     """
 
-    url = f"{API_BASE_URL}user.status"
     payload = {"handle": handle}
-    response = None
+    if start is not None and count is not None:
+        payload["from"] = start
+        payload["count"] = count
 
-    # Send the request to the Codeforces API and retry if it fails.
-    while not response:
-        try:
-            response = requests.get(url, params=payload)
-            response.raise_for_status()
-        except requests.exceptions.RequestException:
-            sleep(1)
+    # Send the request to the Codeforces API (retried by the client if it fails).
+    return client.call("user.status", params=payload)
+
+
+def get_user_new_submissions(handle: str, last_submission_id: int):
+    """
+    Obtains the submissions a user made after the given submission, from newest to oldest.
+
+    user.status is paged through with "from" and "count" until a submission that was already
+    seen (i.e. with an ID not greater than last_submission_id) is reached.
+
+    Arguments:
+    * handle - The handle of the user.
+    * last_submission_id - ID of the newest submission seen during the previous update.
+    """
+
+    submissions = []
+    start = 1
+
+    while True:
+        page = get_user_submissions(handle, start, SUBMISSIONS_PAGE_SIZE)
+        new_submissions = [x for x in page if x["id"] > last_submission_id]
+        submissions.extend(new_submissions)
+
+        # We stop once the watermark is reached or there are no more submissions.
+        if len(new_submissions) < len(page) or len(page) < SUBMISSIONS_PAGE_SIZE:
+            break
+
+        start += SUBMISSIONS_PAGE_SIZE
+
+    return submissions
+
+
+def get_user_problems(handle: str, last_submission_id: int = None):
+    """
+    Obtains information about a user's solved problems. Returns a tuple of the list
+    of problems solved and the ID of the user's newest submission with a final verdict,
+    older than any submission still being judged (None if the user has not made any
+    submissions).
+
+    If last_submission_id is supplied, only the problems solved in submissions newer than
+    it are returned. Otherwise, the user's entire submission history is processed.
+
+    Arguments:
+    * handle - The handle of the user.
+    * last_submission_id - ID of the newest submission seen during the previous update.
+    """
+
+    if last_submission_id is None:
+        submissions = get_user_submissions(handle)
+    else:
+        submissions = get_user_new_submissions(handle, last_submission_id)
+
+    # The newest submission seen becomes the watermark for the next update, unless a
+    # submission is still being judged (without a verdict while its contest is undergoing
+    # system testing, or with the "TESTING" verdict). The watermark is then kept below the
+    # oldest such submission, so that it is fetched again once it has its final verdict.
+    # The accepted submissions fetched again do not change the problems already stored.
+    pending_submission_ids = [
+        x["id"] for x in submissions if x.get("verdict", "TESTING") == "TESTING"
+    ]
+    if pending_submission_ids:
+        newest_submission_id = min(pending_submission_ids) - 1
+    else:
+        newest_submission_id = max(
+            (x["id"] for x in submissions), default=last_submission_id
+        )
 
     # Filter out submissions that are not solved problems and sorting them by
     # the time of submission (from oldest to newest, so that we count only the
@@ -37,7 +100,7 @@ def get_user_problems(handle: str):
     # undergoing system testing.
     result = filter(
         lambda x: "verdict" in x and x["verdict"] == "OK",
-        response.json()["result"][::-1],
+        submissions[::-1],
     )
 
     # Ensuring that if the user has solved the same problem twice, the second
@@ -62,24 +125,24 @@ def get_user_problems(handle: str):
         already_solved[problem_id] = True
 
         rating = problem["problem"].get("rating", 0)
-        tags = ";".join(problem["problem"].get("tags", []))
+        tags = tuple(problem["problem"].get("tags", []))
 
-        # Obtaining contest creation time in DateTime format.
+        # Obtaining submission time in DateTime format.
         solved_time = convert_timestamp_to_datetime(problem["creationTimeSeconds"])
 
         problems.append(
-            {
-                "handle": handle,
-                "contest_id": problem["problem"]["contestId"],
-                "index": problem["problem"]["index"],
-                "rating": rating,
-                "tags": tags,
-                "language": problem["programmingLanguage"],
-                "solved_time": solved_time,
-            }
+            SubmissionRecord(
+                handle=handle,
+                contest_id=problem["problem"]["contestId"],
+                index=problem["problem"]["index"],
+                rating=rating,
+                tags=tags,
+                language=problem["programmingLanguage"],
+                solved_time=solved_time,
+            )
         )
 
-    return problems
+    return problems, newest_submission_id
 
 
 def get_user_contests(handle: str):
@@ -90,19 +153,10 @@ def get_user_contests(handle: str):
     * handle - The handle of the user.
     """
 
-    url = f"{API_BASE_URL}user.rating?handle={handle}"
     payload = {"handle": handle}
-    response = None
-
-    # Send the request to the Codeforces API and retry if it fails.
-    while not response:
-        try:
-            response = requests.get(url, params=payload)
-            response.raise_for_status()
-        except requests.exceptions.RequestException:
-            sleep(1)
 
-    result = response.json()["result"]
+    # Send the request to the Codeforces API (retried by the client if it fails).
+    result = client.call("user.rating", params=payload)
 
     # Before May 23, 2020, the initial rating of users was 1500, after which
     # it changed to the current initial rating of 0. For accounts that gave their
@@ -121,14 +175,14 @@ def get_user_contests(handle: str):
         )
 
         contests.append(
-            {
-                "handle": handle,
-                "contest_id": contest["contestId"],
-                "rank": contest["rank"],
-                "old_rating": contest["oldRating"],
-                "new_rating": contest["newRating"],
-                "rating_update_time": rating_update_time,
-            }
+            RatingChangeRecord(
+                handle=handle,
+                contest_id=contest["contestId"],
+                rank=contest["rank"],
+                old_rating=contest["oldRating"],
+                new_rating=contest["newRating"],
+                rating_update_time=rating_update_time,
+            )
         )
 
     return contests
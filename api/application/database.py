@@ -1,119 +1,841 @@
+import csv
 from flask import Flask
 from datetime import datetime
+from io import StringIO
+from typing import Iterable, NamedTuple
+from sqlalchemy.dialects import postgresql, sqlite
 from os import environ
-from pytz import timezone
+from pytz import timezone, utc
 
 from application.utils.common import (
-    convert_datestring_to_datetime,
+    compute_digest,
     convert_datetime_to_datestring,
+    get_tag_mask,
+    iterate_rows_by_handle,
 )
+from application.helpers.contests import (
+    get_contest_statistics,
+    get_contest_statistics_rows,
+)
+from application.helpers.problems import get_problems_statistics_rows
+from application.aggregation import aggregate_problems_statistics
 from application.models.orm import db
 from application.models.models import (
     Contest,
     Problem,
     ProblemSolved,
+    ProblemTag,
     User,
     ContestParticipant,
+    SubmissionWatermark,
+    Tag,
+    Language,
     Metadata,
+    UserContestStat,
+    UserProblemStat,
+)
+from application.models.records import (
+    ContestRecord,
+    ProblemRecord,
+    ProblemSolvedRecord,
+    ProblemTagRecord,
+    RatingChangeRecord,
+    SubmissionRecord,
+    UserRecord,
+)
+from application.partitioning import get_partition_column, is_partitioned
+from application.models.staging import (
+    get_staging_name,
+    staging_metadata,
+    contest_participant_staging,
+    problem_solved_staging,
+)
+from application.utils.constants import (
+    COPY_NULL,
+    SWAP_MIN_ROW_RATIO,
+    TAG_MASK_BITS,
 )
 
 
+class StagingValidationError(Exception):
+    """
+    Raised when a staging table does not look complete enough to replace its application table.
+    """
+
+
 """
-Database deletion functions.
+Database synchronization functions.
 """
 
 
-def clear_db_tables():
+def get_insert(table: db.Table):
     """
-    Clears all tables in the database (except Metadata).
+    Returns an INSERT statement for the table that supports the ON CONFLICT clause of the
+    database's dialect (PostgreSQL in production, SQLite in development and testing).
+
+    Arguments:
+    * table - The table to insert into.
     """
 
-    Contest.query.delete()
-    Problem.query.delete()
-    User.query.delete()
-    ContestParticipant.query.delete()
-    ProblemSolved.query.delete()
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+
+    return sqlite.insert(table)
+
+
+def get_upsert(table: db.Table, natural_key: list[str], columns: list[str]):
+    """
+    Returns an INSERT ... ON CONFLICT statement for the table, which updates the stored row
+    if a row with the same natural key already exists.
+
+    Arguments:
+    * table - The table to insert into.
+    * natural_key - Names of the columns identifying a row, eg. ["handle", "contest_id"].
+    * columns - Names of the columns inserted.
+    """
+
+    statement = get_insert(table)
+
+    # Rows of tables without columns outside of the natural key never change.
+    if set(columns) <= set(natural_key):
+        return statement.on_conflict_do_nothing(index_elements=natural_key)
+
+    return statement.on_conflict_do_update(
+        index_elements=natural_key,
+        set_={
+            column: statement.excluded[column]
+            for column in columns
+            if column not in natural_key
+        },
+    )
+
+
+def sync_table(table: db.Table, records: list[NamedTuple], natural_key: list[str]):
+    """
+    Synchronizes the table with the given records: records that are not stored yet or
+    differ from the stored rows are upserted, and stored rows that are not among the given
+    records are deleted. Rows that did not change are not touched. Returns a tuple of the
+    number of rows upserted and deleted.
+
+    Arguments:
+    * table - The table to synchronize.
+    * records - List of all the records the table should contain, with fields named after
+    the columns of the table (see application/models/records.py).
+    * natural_key - Names of the columns identifying a row, eg. ["contest_id", "index"].
+    """
+
+    columns = [column.name for column in table.columns]
+
+    stored_rows = {
+        tuple(row._mapping[column] for column in natural_key): tuple(row)
+        for row in db.session.execute(db.select([table.c[c] for c in columns]))
+    }
+
+    def get_key(record):
+        return tuple(getattr(record, column) for column in natural_key)
+
+    changed_records = [
+        record
+        for record in records
+        if stored_rows.get(get_key(record))
+        != tuple(getattr(record, column) for column in columns)
+    ]
+    deleted_keys = stored_rows.keys() - {get_key(record) for record in records}
+
+    if changed_records:
+        db.session.execute(
+            get_upsert(table, natural_key, columns),
+            [record._asdict() for record in changed_records],
+        )
+
+    if deleted_keys:
+        db.session.execute(
+            table.delete().where(
+                db.tuple_(*[table.c[column] for column in natural_key]).in_(
+                    deleted_keys
+                )
+            )
+        )
+
+    return len(changed_records), len(deleted_keys)
 
 
 """
-Database addition functions.
+Dictionary-related functions.
 """
 
 
-def add_users_to_db(users: list[dict]):
+def get_dictionary(model: db.Model, names: Iterable[str] = ()):
+    """
+    Returns a dictionary mapping the names stored in a dictionary table (eg. Tag) to their
+    IDs. The given names that are not stored yet are added to the table, with the next
+    consecutive IDs.
+
+    Arguments:
+    * model - The model of the dictionary table, eg. Tag or Language.
+    * names - Names that must be in the dictionary.
+    """
+
+    dictionary = {entry.name: entry.id for entry in model.query.all()}
+
+    for name in sorted(set(names) - dictionary.keys()):
+        dictionary[name] = len(dictionary)
+        db.session.add(model(id=dictionary[name], name=name))
+
+    return dictionary
+
+
+def encode_problems_solved(problems_solved: list[SubmissionRecord]):
     """
-    Add the users to the database.
+    Returns the problems solved with their tags encoded as a bitmask and their language
+    encoded as an ID (see the Tag and Language models).
 
     Arguments:
-    * users - List of users to add to the database.
+    * problems_solved - List of problems solved statistics.
     """
 
-    for user in users:
-        # Convert the datestring to datetime object.
-        user["creation_date"] = convert_datestring_to_datetime(user["creation_date"])
-        db.session.add(User(**user))
+    tag_ids = get_dictionary(
+        Tag, (tag for problem in problems_solved for tag in problem.tags)
+    )
+    language_ids = get_dictionary(
+        Language, (problem.language for problem in problems_solved)
+    )
+
+    return [
+        ProblemSolvedRecord(
+            handle=problem.handle,
+            contest_id=problem.contest_id,
+            index=problem.index,
+            rating=problem.rating,
+            tag_mask=get_tag_mask(tag_ids[tag] for tag in problem.tags),
+            language_id=language_ids[problem.language],
+            solved_time=problem.solved_time,
+        )
+        for problem in problems_solved
+    ]
 
 
-def add_contests_to_db(contests: list[dict]):
+def get_problem_tags(problems: list[ProblemRecord]):
     """
-    Add the contests to the database.
+    Returns the tags of the problems, with the tags encoded as IDs (see the ProblemTag and
+    Tag models).
 
     Arguments:
-    * contests - List of contests to add to the database.
+    * problems - List of all the problems.
     """
 
-    for contest in contests:
-        # Convert the datestring to datetime object.
-        contest["date"] = convert_datestring_to_datetime(contest["date"])
-        db.session.add(Contest(**contest))
+    # The tags of a problem are stored as a string separated by semicolons.
+    problems_tags = [
+        (problem, [tag for tag in problem.tags.split(";") if tag])
+        for problem in problems
+    ]
+
+    tag_ids = get_dictionary(Tag, (tag for _, tags in problems_tags for tag in tags))
 
+    return [
+        ProblemTagRecord(
+            tag_id=tag_ids[tag], contest_id=problem.contest_id, index=problem.index
+        )
+        for problem, tags in problems_tags
+        for tag in set(tags)
+    ]
 
-def add_contest_participants_to_db(contest_participants: list[list[dict]]):
+
+def refresh_problems_solved():
     """
-    Add the contest participants to the database.
+    Updates the rating and the tags of the stored problems solved that differ from those
+    of the problems, in the transaction of the current session. Returns the number of rows
+    updated.
+
+    Codeforces rates and tags problems some time after their contest ends, while a problem
+    solved is only fetched once (see get_user_problems in application/codeforces/users.py),
+    so problems solved during a contest are stored without rating and tags at first.
+    """
+
+    table = ProblemSolved.__table__
+
+    rating = (
+        db.select([Problem.rating])
+        .where(Problem.contest_id == table.c.contest_id, Problem.index == table.c.index)
+        .scalar_subquery()
+    )
+
+    # The bits of the tags are distinct, so their sum is the tag mask (see get_tag_mask).
+    tag_mask = (
+        db.select(
+            [
+                db.cast(
+                    db.func.coalesce(
+                        db.func.sum(
+                            db.cast(1, db.BigInteger).op("<<")(ProblemTag.tag_id)
+                        ),
+                        0,
+                    ),
+                    db.BigInteger,
+                )
+            ]
+        )
+        .where(
+            ProblemTag.contest_id == table.c.contest_id,
+            ProblemTag.index == table.c.index,
+            ProblemTag.tag_id < TAG_MASK_BITS,
+        )
+        .scalar_subquery()
+    )
+
+    return db.session.execute(
+        table.update()
+        .where(
+            db.or_(table.c.rating != rating, table.c.tag_mask != tag_mask),
+            # Problems solved outside of the stored problems are kept as they are.
+            rating.isnot(None),
+        )
+        .values(rating=rating, tag_mask=tag_mask)
+    ).rowcount
+
+
+"""
+Bulk loading functions.
+"""
+
+
+def bulk_insert(table: db.Table, records: list[NamedTuple]):
+    """
+    Inserts the records into the table with the fastest method supported by the database:
+    COPY FROM STDIN on PostgreSQL, and a single executemany INSERT otherwise. Unlike
+    adding ORM objects to the session, neither creates an object per row.
 
     Arguments:
-    * contest_participants - List of contest participation statistics to add to the database.
+    * table - The table to insert into.
+    * records - List of the records to insert, with fields named after the columns of the
+    table (see application/models/records.py). Missing columns (eg. the surrogate "id" key)
+    get their default values.
     """
 
-    # contest_participants is a list of contest participation statistics dictionaries
-    # Each list corresponds to a user.
-    for contest_participant in contest_participants:
-        for contest in contest_participant:
-            # Convert the datestring to datetime object.
-            contest["rating_update_time"] = convert_datestring_to_datetime(
-                contest["rating_update_time"]
-            )
-            db.session.add(ContestParticipant(**contest))
+    if not records:
+        return
+
+    if db.engine.dialect.name == "postgresql":
+        copy_records(table, records)
+    else:
+        db.session.execute(table.insert(), [record._asdict() for record in records])
 
 
-def add_problems_to_db(problems: list[dict]):
+def copy_records(table: db.Table, records: list[NamedTuple]):
     """
-    Add the problems to the database.
+    Inserts the records into the table with PostgreSQL's COPY FROM STDIN, in the
+    transaction of the current session.
 
     Arguments:
-    * problems - List of problems to add to the database.
+    * table - The table to insert into.
+    * records - List of the records to insert, with fields named after the columns of the table.
     """
 
-    for problem in problems:
-        db.session.add(Problem(**problem))
+    preparer = db.engine.dialect.identifier_preparer
+
+    statement = (
+        f"COPY {preparer.format_table(table)} "
+        f"({', '.join(preparer.quote(column) for column in records[0]._fields)}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+    # The raw psycopg2 connection is used, since SQLAlchemy does not support COPY.
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(statement, format_copy_records(records))
+    finally:
+        cursor.close()
 
 
-def add_problems_solved_to_db(problems_solved: list[dict]):
+def format_copy_records(records: list[tuple]):
     """
-    Add the problems statistics to the database.
+    Returns a file-like object containing the records in the CSV format read by COPY.
 
     Arguments:
-    * problems_solved - List of problems solved statistics to add to the database.
+    * records - List of the records.
     """
 
-    for problem_solved in problems_solved:
-        for problem in problem_solved:
-            # Convert the datestring to datetime object.
-            problem["solved_time"] = convert_datestring_to_datetime(
-                problem["solved_time"]
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    for record in records:
+        writer.writerow([COPY_NULL if value is None else value for value in record])
+
+    buffer.seek(0)
+    return buffer
+
+
+"""
+Staging table-related functions.
+"""
+
+
+def prepare_staging_tables():
+    """
+    Creates empty staging tables, replacing the ones left over by a previous update.
+    """
+
+    staging_metadata.drop_all(bind=db.session.connection())
+    staging_metadata.create_all(bind=db.session.connection())
+    db.session.commit()
+
+
+def drop_staging_tables():
+    """
+    Drops the staging tables.
+    """
+
+    staging_metadata.drop_all(bind=db.session.connection())
+    db.session.commit()
+
+
+def add_contest_participants_to_staging(contest_participants: list[RatingChangeRecord]):
+    """
+    Add the contest participants of a user (or a contest) to the staging table. The rows
+    are committed immediately, so that they do not have to be kept in memory.
+
+    Arguments:
+    * contest_participants - List of contest participation statistics to add to the staging table.
+    """
+
+    bulk_insert(contest_participant_staging, contest_participants)
+    db.session.commit()
+
+
+def add_problems_solved_to_staging(problems_solved: list[SubmissionRecord]):
+    """
+    Add the problems solved by a user to the staging table, with their tags and language
+    encoded. The rows are committed immediately, so that they do not have to be kept in memory.
+
+    Arguments:
+    * problems_solved - List of problems solved statistics to add to the staging table.
+    """
+
+    bulk_insert(problem_solved_staging, encode_problems_solved(problems_solved))
+    db.session.commit()
+
+
+def sync_table_from_staging(
+    table: db.Table,
+    staging_table: db.Table,
+    natural_key: list[str],
+    incremental_handles: set[str] = frozenset(),
+    update_incremental: bool = True,
+):
+    """
+    Synchronizes a per-user table with the rows of its staging table, without loading
+    either into memory. Staged rows that are not stored yet or differ from the stored ones
+    are upserted with a single INSERT ... SELECT ... ON CONFLICT statement, and stored rows
+    that were not staged are deleted, except those of incrementally updated users (whose
+    staging rows only contain the data retrieved since the previous update). Returns a
+    tuple of the number of rows upserted and deleted.
+
+    Arguments:
+    * table - The application table.
+    * staging_table - The staging table.
+    * natural_key - Names of the columns identifying a row, eg. ["handle", "contest_id"].
+    * incremental_handles - Handles of the users whose data was fetched incrementally.
+    * update_incremental - Boolean flag indicating whether the stored rows of incrementally
+    updated users are updated with the staged rows. If not, they are kept as they are.
+    """
+
+    columns = [column.name for column in staging_table.columns if column.name != "id"]
+
+    # The unique index of a partitioned table includes the partition column, so rows are
+    # upserted and deleted by their natural key and partition column (see
+    # application/partitioning.py). The stored rows of incrementally updated users are not
+    # updated in the partitioned table, so their partition column never changes.
+    partition_column = get_partition_column(table)
+    conflict_key = natural_key + ([partition_column] if partition_column else [])
+
+    def matches(compared_columns):
+        return db.and_(
+            *[table.c[column] == staging_table.c[column] for column in compared_columns]
+        )
+
+    # Staged rows identical to a stored row are skipped.
+    changed_rows = db.select([staging_table.c[column] for column in columns]).where(
+        ~db.select([table.c.id]).where(matches(columns)).exists()
+    )
+
+    if not update_incremental and incremental_handles:
+        changed_rows = changed_rows.where(
+            ~db.and_(
+                staging_table.c.handle.in_(incremental_handles),
+                db.select([table.c.id]).where(matches(natural_key)).exists(),
             )
-            db.session.add(ProblemSolved(**problem))
+        )
+
+    upserted = db.session.execute(
+        get_upsert(table, conflict_key, columns).from_select(columns, changed_rows)
+    ).rowcount
+
+    deleted = db.session.execute(
+        table.delete().where(
+            table.c.handle.notin_(incremental_handles),
+            ~db.select([staging_table.c.handle]).where(matches(conflict_key)).exists(),
+        )
+    ).rowcount
+
+    return upserted, deleted
+
+
+def prepare_staging_table_swap(
+    table: db.Table,
+    staging_table: db.Table,
+    natural_key: list[str],
+    incremental_handles: set[str] = frozenset(),
+    update_incremental: bool = True,
+):
+    """
+    Completes a staging table so that it can replace its application table: the stored
+    rows of incrementally updated users, which were not fetched again, are copied into it.
+    Raises StagingValidationError if the staging table has far fewer rows than the
+    application table, which indicates that the retrieved data is incomplete. Returns the
+    number of rows in the staging table.
+
+    Arguments:
+    * table - The application table.
+    * staging_table - The staging table.
+    * natural_key - Names of the columns identifying a row, eg. ["handle", "contest_id"].
+    * incremental_handles - Handles of the users whose data was fetched incrementally.
+    * update_incremental - Boolean flag indicating whether the stored rows of incrementally
+    updated users are replaced by the staged rows. If not, they are kept as they are.
+    """
+
+    columns = [column.name for column in staging_table.columns if column.name != "id"]
+
+    def is_stored():
+        return (
+            db.select([table.c.id])
+            .where(
+                db.and_(
+                    *[
+                        table.c[column] == staging_table.c[column]
+                        for column in natural_key
+                    ]
+                )
+            )
+            .exists()
+        )
+
+    if not update_incremental:
+        db.session.execute(
+            staging_table.delete().where(
+                staging_table.c.handle.in_(incremental_handles), is_stored()
+            )
+        )
+
+    db.session.execute(
+        staging_table.insert().from_select(
+            columns,
+            db.select([table.c[column] for column in columns]).where(
+                table.c.handle.in_(incremental_handles),
+                ~db.select([staging_table.c.id])
+                .where(
+                    db.and_(
+                        *[
+                            staging_table.c[column] == table.c[column]
+                            for column in natural_key
+                        ]
+                    )
+                )
+                .exists(),
+            ),
+        )
+    )
+
+    stored_count = db.session.query(db.func.count()).select_from(table).scalar()
+    staged_count = db.session.query(db.func.count()).select_from(staging_table).scalar()
+
+    if staged_count < stored_count * SWAP_MIN_ROW_RATIO:
+        raise StagingValidationError(
+            f"{staging_table.name} has {staged_count} rows, {table.name} has {stored_count}."
+        )
+
+    return staged_count
+
+
+def swap_staging_table(table: db.Table, staging_table: db.Table):
+    """
+    Replaces the application table with its staging table, in the transaction of the
+    current session. Readers keep using the old table until the transaction is committed,
+    and are only blocked while it is being committed.
+
+    Arguments:
+    * table - The application table.
+    * staging_table - The staging table.
+    """
+
+    quote = db.engine.dialect.identifier_preparer.quote
+
+    statements = [
+        f"DROP TABLE {quote(table.name)}",
+        f"ALTER TABLE {quote(staging_table.name)} RENAME TO {quote(table.name)}",
+    ]
+
+    if db.engine.dialect.name == "postgresql":
+        # The sequence, primary key and indexes keep their names when the table is renamed,
+        # so they are renamed as well (those of the dropped table were dropped with it).
+        statements += [
+            f"ALTER SEQUENCE {quote(f'{staging_table.name}_id_seq')} RENAME TO {quote(f'{table.name}_id_seq')}",
+            f"ALTER INDEX {quote(f'{staging_table.name}_pkey')} RENAME TO {quote(f'{table.name}_pkey')}",
+        ]
+        statements += [
+            f"ALTER INDEX {quote(get_staging_name(index.name))} RENAME TO {quote(index.name)}"
+            for index in table.indexes
+        ]
+    else:
+        # SQLite cannot rename indexes, so they are recreated under their original names.
+        statements += [
+            f"DROP INDEX {quote(get_staging_name(index.name))}"
+            for index in table.indexes
+        ]
+
+    for statement in statements:
+        db.session.execute(db.text(statement))
+
+    if db.engine.dialect.name != "postgresql":
+        for index in table.indexes:
+            index.create(bind=db.session.connection())
+
+
+"""
+Database retrieval functions.
+"""
+
+
+def get_stored_handles():
+    """
+    Returns the set of handles of the users stored in the database.
+    """
+
+    return {handle for (handle,) in db.session.query(User.handle)}
+
+
+def get_stored_contest_ids():
+    """
+    Returns the set of IDs of the contests stored in the database.
+    """
+
+    return {contest_id for (contest_id,) in db.session.query(Contest.contest_id)}
+
+
+# Dates of the stored contests, keyed by the digest of the contests they were read for
+# (see get_contest_dates). Only the dates of the current digest are kept.
+contest_dates_cache = {}
+
+
+def get_contest_dates():
+    """
+    Returns a dictionary mapping the IDs of the stored contests to their dates.
+
+    The contests only change during updates, along with their digest (see update_db), so
+    the dictionary is built once per digest and shared by the requests, which then only
+    read the digest from the database.
+    """
+
+    contests_digest = Metadata.query.get("contests_digest")
+    version = None if contests_digest is None else contests_digest.value
+
+    contest_dates = contest_dates_cache.get(version)
+    if contest_dates is not None:
+        return contest_dates
+
+    contest_dates = dict(db.session.query(Contest.contest_id, Contest.date))
+
+    # Without a digest, the contests were not stored by an update, so they are not cached.
+    if version is not None:
+        contest_dates_cache.clear()
+        contest_dates_cache[version] = contest_dates
+
+    return contest_dates
+
+
+"""
+Database modification functions.
+"""
+
+
+def update_users_ratings(app: Flask, users_information: list[UserRecord]):
+    """
+    Updates the rating, maximum rating and rank of the users already in the database.
+    Users that are not in the database are ignored.
+
+    Arguments:
+    * app - The Flask application.
+    * users_information - List of the users' information.
+    """
+
+    users_information = {user.handle: user for user in users_information}
+
+    with app.app_context():
+        # Statistics left outdated by a previous update are rebuilt first.
+        rebuild_outdated_statistics(app)
+
+        # The statistics do not depend on the ratings, so they remain up to date.
+        statistics_up_to_date = get_statistics_generation() == get_data_generation()
+
+        for user in User.query.filter(User.handle.in_(users_information)):
+            user_information = users_information[user.handle]
+            user.rating = user_information.rating
+            user.max_rating = user_information.max_rating
+            user.rank = user_information.rank
+
+        bump_data_generation()
+        if statistics_up_to_date:
+            store_statistics_generation()
+
+        try:
+            db.session.commit()
+            app.logger.info(f"UPDATED RATINGS OF {len(users_information)} USERS.")
+        except Exception as e:
+            app.logger.exception(f"ERROR OCCURRED DURING RATINGS UPDATION: {e}")
+            db.session.rollback()
+
+
+"""
+Statistics-related functions.
+"""
+
+
+def rebuild_statistics():
+    """
+    Recomputes the problem and contest statistics of every user for every period from the
+    stored data, and replaces the rows of the UserProblemStat and UserContestStat tables
+    with them, in the transaction of the current session. Returns a tuple of the number
+    of rows of problem and contest statistics written.
+    """
+
+    # Periods that start after this time are empty (see get_stale_periods).
+    computed_time = datetime.now()
+
+    contest_dates = get_contest_dates()
+
+    problem_stats, contest_stats = [], []
+
+    # The problems statistics are aggregated in the database.
+    for handle, statistics in aggregate_problems_statistics().items():
+        problem_stats += get_problems_statistics_rows(handle, statistics)
+
+    for handle, contests_participated in iterate_rows_by_handle(
+        ContestParticipant.query
+    ):
+        contest_stats += get_contest_statistics_rows(
+            handle, get_contest_statistics(contest_dates, contests_participated)
+        )
+
+    UserProblemStat.query.delete()
+    UserContestStat.query.delete()
+
+    if problem_stats:
+        db.session.execute(UserProblemStat.__table__.insert(), problem_stats)
+    if contest_stats:
+        db.session.execute(UserContestStat.__table__.insert(), contest_stats)
+
+    db.session.merge(Metadata(key="statistics_time", value=computed_time.isoformat()))
+
+    return len(problem_stats), len(contest_stats)
+
+
+def get_statistics_generation():
+    """
+    Returns the data generation the statistics were built for (see update_statistics), or
+    None if they were never built.
+    """
+
+    statistics_generation = Metadata.query.get("statistics_generation")
+
+    return None if statistics_generation is None else int(statistics_generation.value)
+
+
+def store_statistics_generation():
+    """
+    Records that the statistics are built for the current data generation, in the
+    transaction of the current session.
+    """
+
+    db.session.merge(
+        Metadata(key="statistics_generation", value=str(get_data_generation()))
+    )
+
+
+def update_statistics(app: Flask):
+    """
+    Rebuilds the statistics (see rebuild_statistics) in a transaction of their own, and
+    records the data generation they are built for. If the rebuild fails, the statistics
+    of the previous update are kept, and are rebuilt before the next update (see
+    rebuild_outdated_statistics). Must be called within the application context.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    try:
+        problem_stats_count, contest_stats_count = rebuild_statistics()
+
+        # The responses cached with the previous statistics are no longer served.
+        bump_data_generation()
+        store_statistics_generation()
+
+        db.session.commit()
+        app.logger.info(
+            f"STATISTICS REBUILT: {problem_stats_count} PROBLEM STATISTICS, "
+            f"{contest_stats_count} CONTEST STATISTICS."
+        )
+    except Exception as e:
+        app.logger.exception(f"ERROR OCCURRED DURING STATISTICS REBUILD: {e}")
+        db.session.rollback()
+
+
+def rebuild_outdated_statistics(app: Flask):
+    """
+    Rebuilds the statistics if they were not built for the current data generation, eg.
+    because their rebuild failed after the previous update. Must be called within the
+    application context.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    if get_statistics_generation() == get_data_generation():
+        return
+
+    app.logger.info("STATISTICS OUTDATED, REBUILDING.")
+    update_statistics(app)
+
+
+"""
+Submission watermark-related functions.
+"""
+
+
+def get_submission_watermarks():
+    """
+    Returns a dictionary mapping each handle to the ID of the newest submission of
+    the user seen during the previous update.
+    """
+
+    return {
+        watermark.handle: watermark.last_submission_id
+        for watermark in SubmissionWatermark.query.all()
+    }
+
+
+def store_submission_watermarks(submission_watermarks: dict[str, int]):
+    """
+    Stores the ID of the newest submission seen for each user.
+
+    Arguments:
+    * submission_watermarks - Dictionary mapping handles to the ID of the newest submission.
+    """
+
+    SubmissionWatermark.query.delete()
+
+    for handle, last_submission_id in submission_watermarks.items():
+        db.session.add(
+            SubmissionWatermark(handle=handle, last_submission_id=last_submission_id)
+        )
 
 
 """
@@ -145,51 +867,259 @@ def store_last_update_time():
         )
 
 
+def get_data_generation():
+    """
+    Returns the data generation, a number incremented whenever the data served by the
+    routes changes (see application/response_cache.py).
+    """
+
+    data_generation = Metadata.query.get("data_generation")
+
+    return 0 if data_generation is None else int(data_generation.value)
+
+
+def get_data_version():
+    """
+    Returns a tuple of the data generation (see get_data_generation) and the time (in UTC)
+    at which it was last incremented (None if it was never incremented), read in a single
+    query.
+    """
+
+    values = dict(
+        db.session.query(Metadata.key, Metadata.value).filter(
+            Metadata.key.in_(["data_generation", "data_modified_time"])
+        )
+    )
+
+    data_generation = int(values.get("data_generation", 0))
+    data_modified_time = values.get("data_modified_time")
+
+    if data_modified_time is not None:
+        data_modified_time = datetime.fromisoformat(data_modified_time)
+
+    return data_generation, data_modified_time
+
+
+def bump_data_generation():
+    """
+    Increments the data generation and records the time of the change, in the transaction
+    of the current session.
+    """
+
+    db.session.merge(
+        Metadata(key="data_generation", value=str(get_data_generation() + 1))
+    )
+    db.session.merge(
+        Metadata(
+            key="data_modified_time",
+            value=datetime.now(utc).isoformat(timespec="seconds"),
+        )
+    )
+
+
+def update_digest(key: str, data: list[NamedTuple]):
+    """
+    Stores the digest of the given data in the metadata under the given key. Returns
+    whether the digest differs from the one stored previously, i.e. whether the data changed.
+
+    Arguments:
+    * key - The metadata key, eg. "contests_digest".
+    * data - The data to compute the digest of.
+    """
+
+    digest = compute_digest(data)
+    metadata_digest = Metadata.query.get(key)
+
+    # If the metadata doesn't exist, create it.
+    if metadata_digest is None:
+        db.session.add(Metadata(key=key, value=digest))
+        return True
+
+    if metadata_digest.value == digest:
+        return False
+
+    metadata_digest.value = digest
+    return True
+
+
 """
 General database-related functions.
 """
 
 
+def log_sync(app: Flask, table_name: str, upserted: int, deleted: int):
+    """
+    Logs the number of rows written during the synchronization of a table.
+
+    Arguments:
+    * app - The Flask application.
+    * table_name - The name of the table, eg. "USER".
+    * upserted - The number of rows inserted or updated.
+    * deleted - The number of rows deleted.
+    """
+
+    app.logger.info(
+        f"{table_name} TABLE SYNCHRONIZED: {upserted} ROWS INSERTED OR UPDATED, {deleted} ROWS DELETED."
+    )
+
+
 def update_db(
     app: Flask,
-    contests: list[dict],
-    problems: list[dict],
-    users_information: list[dict],
-    users_contests: list[list[dict]],
-    users_problems: list[dict],
+    contests: list[ContestRecord],
+    problems: list[ProblemRecord],
+    users_information: list[UserRecord],
+    submission_watermarks: dict[str, int],
+    incremental_contests_handles: set[str] = frozenset(),
+    incremental_problems_handles: set[str] = frozenset(),
 ):
     """
-    Updates the database with the latest data from the Codeforces API.
+    Updates the database with the latest data from the Codeforces API. The users' contests
+    participated in and problems solved are read from the staging tables, which are filled
+    while the data is being retrieved (see perform_update in application/__init__.py).
 
     Arguments:
     * app - The Flask application.
     * contests - List of all the contests.
     * problems - List of all the problems.
     * users_information - List of all the users' information.
-    * users_contests - List of all the users' contests participated in.
-    * users_problems - List of all the users' solved problems.
+    * submission_watermarks - Dictionary mapping handles to the ID of the user's newest submission.
+    * incremental_contests_handles - Handles of the users for whom only the contests
+    participated in since the previous update were fetched.
+    * incremental_problems_handles - Handles of the users for whom only the problems solved
+    since the previous update were fetched.
     """
 
     with app.app_context():
-        # Clear all database tables.
-        clear_db_tables()
-
-        # Add the updated information to the database.
-        add_contests_to_db(contests)
-        add_problems_to_db(problems)
-        add_users_to_db(users_information)
-        add_contest_participants_to_db(users_contests)
-        add_problems_solved_to_db(users_problems)
-
-        # Update the last database update time.
-        store_last_update_time()
-
-        # Commit the changes to the database, and rollback if an error occurs.
-        # Essentiallly, if there is any error, the database is not updated, ensuring
-        # that the database state remains consistent and some data is not lost.
+        # The per-user tables, with their staging tables, natural keys, the handles of the
+        # users updated incrementally, and whether the stored rows of these users are
+        # updated with the staged rows. A problem solved again in a newer submission does
+        # not change when it was first solved, so those stored rows are kept as they are.
+        staged_tables = [
+            (
+                ContestParticipant.__table__,
+                contest_participant_staging,
+                ["handle", "contest_id"],
+                incremental_contests_handles,
+                True,
+            ),
+            (
+                ProblemSolved.__table__,
+                problem_solved_staging,
+                ["handle", "contest_id", "index"],
+                incremental_problems_handles,
+                False,
+            ),
+        ]
+
+        # With the "swap" strategy, the staging tables replace the per-user tables instead
+        # of being synchronized into them, so that readers are not slowed down by the
+        # writes. The staging tables are completed and validated beforehand, so that the
+        # transaction swapping them stays short.
+        swap_tables = environ.get("UPDATE_STRATEGY", "sync") == "swap"
+
+        # The staging tables are not partitioned, so partitioned tables are synchronized.
+        if swap_tables and is_partitioned():
+            app.logger.info("TABLES ARE PARTITIONED, SYNCING INSTEAD OF SWAPPING.")
+            swap_tables = False
+
+        if swap_tables:
+            try:
+                for table, staging_table, *arguments in staged_tables:
+                    staged_count = prepare_staging_table_swap(
+                        table, staging_table, *arguments
+                    )
+                    app.logger.info(
+                        f"{table.name.upper()} STAGING TABLE PREPARED WITH {staged_count} ROWS."
+                    )
+                db.session.commit()
+            except Exception as e:
+                app.logger.exception(
+                    f"ERROR OCCURRED DURING STAGING TABLE PREPARATION: {e}"
+                )
+                db.session.rollback()
+                drop_staging_tables()
+                return
+
+        # The contests and problems rarely change between updates, so their tables are
+        # only rewritten if the retrieved data differs from the data of the previous update.
+        contests_changed = update_digest("contests_digest", contests)
+        problems_changed = update_digest("problems_digest", problems)
+
+        if not contests_changed:
+            app.logger.info("CONTESTS UNCHANGED, SKIPPED UPDATING CONTEST TABLE.")
+        if not problems_changed:
+            app.logger.info("PROBLEMS UNCHANGED, SKIPPED UPDATING PROBLEM TABLE.")
+
+        # Only the rows that changed since the previous update are written, so that the
+        # tables are not rewritten (and locked) as a whole. If there is any error, the
+        # transaction is rolled back, ensuring that the database state remains consistent
+        # and some data is not lost.
         try:
+            if contests_changed:
+                log_sync(
+                    app,
+                    "CONTEST",
+                    *sync_table(Contest.__table__, contests, ["contest_id"]),
+                )
+            if problems_changed:
+                log_sync(
+                    app,
+                    "PROBLEM",
+                    *sync_table(Problem.__table__, problems, ["contest_id", "index"]),
+                )
+                log_sync(
+                    app,
+                    "PROBLEM TAG",
+                    *sync_table(
+                        ProblemTag.__table__,
+                        get_problem_tags(problems),
+                        ["tag_id", "contest_id", "index"],
+                    ),
+                )
+            log_sync(
+                app, "USER", *sync_table(User.__table__, users_information, ["handle"])
+            )
+
+            for table, staging_table, *arguments in staged_tables:
+                if swap_tables:
+                    swap_staging_table(table, staging_table)
+                    app.logger.info(f"{table.name.upper()} TABLE SWAPPED.")
+                else:
+                    log_sync(
+                        app,
+                        table.name.upper(),
+                        *sync_table_from_staging(table, staging_table, *arguments),
+                    )
+
+            # The rating and the tags of problems solved are those of the problems when
+            # they were fetched, so they are updated when the problems change.
+            if problems_changed:
+                app.logger.info(
+                    f"{refresh_problems_solved()} PROBLEMS SOLVED RATINGS AND TAGS REFRESHED."
+                )
+
+            store_submission_watermarks(submission_watermarks)
+
+            # Update the last database update time.
+            store_last_update_time()
+
+            # The responses cached for the previous data are no longer served.
+            bump_data_generation()
+
             db.session.commit()
             app.logger.info("UPDATED DATABASE.")
         except Exception as e:
             app.logger.exception(f"ERROR OCCURRED DURING DATABASE UPDATION: {e}")
             db.session.rollback()
+            drop_staging_tables()
+            return
+
+        # The staged data is no longer needed.
+        drop_staging_tables()
+
+        # The users' statistics are computed once per update, rather than on every
+        # request. They are computed in a separate transaction, after the data is
+        # committed, so that the locks taken by the update (eg. by the swap of the tables)
+        # are not held while they are computed. Until then, the statistics of the previous
+        # update are served.
+        update_statistics(app)
@@ -7,6 +7,8 @@ helpers/contests.py contains contest-related helper functions.
 
 from datetime import datetime
 
+from application.utils.constants import STATISTICS_PERIODS
+
 
 def extract_contests_information(
     contests_participated: list[dict], rating_history: bool
@@ -81,7 +83,7 @@ def extract_contests_information(
 
 
 def get_contest_statistics(
-    contests: list[dict],
+    contest_dates: dict[int, datetime],
     contests_participated: list[dict],
     rating_history: bool = False,
 ):
@@ -90,7 +92,7 @@ def get_contest_statistics(
     the given list of contests participated.
 
     Arguments:
-    * contests - List of contests.
+    * contest_dates - Dictionary mapping contest IDs to the dates of the contests.
     * contests_participated - List of contests participated.
     * rating_history - Boolean flag indicating whether to extract the rating history.
     """
@@ -100,13 +102,11 @@ def get_contest_statistics(
     for contest_participated in contests_participated:
         all_time.append(contest_participated)
 
-        contest_date = next(
-            (
-                contest["date"]
-                for contest in contests
-                if contest["contest_id"] == contest_participated["contest_id"]
-            )
-        )
+        contest_date = contest_dates.get(contest_participated["contest_id"])
+
+        # Contests that are not stored (yet) are only counted in the all-time statistics.
+        if contest_date is None:
+            continue
 
         # If the contest took place this year.
         if contest_date.year == datetime.now().year:
@@ -132,6 +132,49 @@ def get_contest_statistics(
     return statistics
 
 
+def get_contest_statistics_rows(handle: str, statistics: dict):
+    """
+    Returns the rows of the UserContestStat table storing the given contest statistics.
+
+    Arguments:
+    * handle - The handle of the user.
+    * statistics - The contest statistics of the user, without the rating history (see
+    get_contest_statistics).
+    """
+
+    return [
+        {"handle": handle, "period": period, **period_statistics}
+        for period, period_statistics in statistics.items()
+    ]
+
+
+def get_stored_contest_statistics(contest_stats: list[dict], stale_periods: set[str]):
+    """
+    Returns the contest statistics (all-time, this month, this week, today) stored in the
+    given rows of the UserContestStat table.
+
+    Arguments:
+    * contest_stats - List of the rows of the user.
+    * stale_periods - Set of the periods that started after the statistics were computed,
+    whose statistics are empty.
+    """
+
+    statistics = {
+        period: extract_contests_information([], rating_history=False)
+        for period in STATISTICS_PERIODS
+    }
+
+    for contest_stat in contest_stats:
+        if contest_stat["period"] in stale_periods:
+            continue
+
+        statistics[contest_stat["period"]] = {
+            key: contest_stat[key] for key in statistics[contest_stat["period"]]
+        }
+
+    return statistics
+
+
 def sort_contest_participants(contest_participants: list[dict]):
     """
     Sorts, formats and returns the list of contest participants in order of
@@ -8,8 +8,15 @@ helpers/problems.py contains problem-related helper functions.
 from collections import defaultdict
 from datetime import datetime
 
+from application.utils.common import get_tag_ids
+from application.utils.constants import STATISTICS_PERIODS
 
-def extract_problems_information(problems_solved: list[dict]):
+
+def extract_problems_information(
+    problems_solved: list[dict],
+    tag_names: dict[int, str],
+    language_names: dict[int, str],
+):
     """
     Given a list of problems solved, returns:
     * The total number of problems solved.
@@ -20,8 +27,14 @@ def extract_problems_information(problems_solved: list[dict]):
 
     Arguments:
     * problems_solved - List of problems solved.
+    * tag_names - Dictionary mapping tag IDs to tag names (see the Tag model).
+    * language_names - Dictionary mapping language IDs to language names (see the Language model).
     """
 
+    # Tags and languages are counted by ID, and only the counts are mapped to names.
+    tag_counts = defaultdict(int)
+    language_counts = defaultdict(int)
+
     statistics = {
         "total_problems": 0,
         "tags": defaultdict(int),
@@ -33,9 +46,8 @@ def extract_problems_information(problems_solved: list[dict]):
     for problem_solved in problems_solved:
         statistics["total_problems"] += 1
 
-        for tag in problem_solved["tags"].split(";"):
-            if tag != "":
-                statistics["tags"][tag] += 1
+        for tag_id in get_tag_ids(problem_solved["tag_mask"]):
+            tag_counts[tag_id] += 1
 
         # Only the first letter of the index matters to us.
         # eg. "A1" is considered to be and counted as "A".
@@ -46,18 +58,29 @@ def extract_problems_information(problems_solved: list[dict]):
         if problem_solved["rating"] != 0:
             statistics["ratings"][problem_solved["rating"]] += 1
 
-        statistics["languages"][problem_solved["language"]] += 1
+        language_counts[problem_solved["language_id"]] += 1
+
+    for tag_id, count in tag_counts.items():
+        statistics["tags"][tag_names[tag_id]] = count
+    for language_id, count in language_counts.items():
+        statistics["languages"][language_names[language_id]] = count
 
     return statistics
 
 
-def get_problems_statistics(problems_solved: list[dict]):
+def get_problems_statistics(
+    problems_solved: list[dict],
+    tag_names: dict[int, str],
+    language_names: dict[int, str],
+):
     """
     Returns the problems statistics (all-time, this month, this week, today) from
     the given list of problems solved.
 
     Arguments:
     * problems_solved - List of problems solved.
+    * tag_names - Dictionary mapping tag IDs to tag names (see the Tag model).
+    * language_names - Dictionary mapping language IDs to language names (see the Language model).
     """
 
     all_time, this_month, this_week, today = [], [], [], []
@@ -83,10 +106,84 @@ def get_problems_statistics(problems_solved: list[dict]):
                         today.append(problem_solved)
 
     statistics = {
-        "all_time": extract_problems_information(all_time),
-        "this_month": extract_problems_information(this_month),
-        "this_week": extract_problems_information(this_week),
-        "today": extract_problems_information(today),
+        "all_time": extract_problems_information(all_time, tag_names, language_names),
+        "this_month": extract_problems_information(
+            this_month, tag_names, language_names
+        ),
+        "this_week": extract_problems_information(this_week, tag_names, language_names),
+        "today": extract_problems_information(today, tag_names, language_names),
     }
 
     return statistics
+
+
+def get_problems_statistics_rows(handle: str, statistics: dict):
+    """
+    Returns the rows of the UserProblemStat table storing the given problems statistics.
+
+    Arguments:
+    * handle - The handle of the user.
+    * statistics - The problems statistics of the user (see get_problems_statistics).
+    """
+
+    rows = []
+
+    for period, period_statistics in statistics.items():
+        rows.append(
+            {
+                "handle": handle,
+                "period": period,
+                "dimension": "total_problems",
+                "key": "",
+                "count": period_statistics["total_problems"],
+            }
+        )
+
+        for dimension in ("tags", "indexes", "ratings", "languages"):
+            for key, count in period_statistics[dimension].items():
+                rows.append(
+                    {
+                        "handle": handle,
+                        "period": period,
+                        "dimension": dimension,
+                        "key": str(key),
+                        "count": count,
+                    }
+                )
+
+    return rows
+
+
+def get_stored_problems_statistics(problem_stats: list[dict], stale_periods: set[str]):
+    """
+    Returns the problems statistics (all-time, this month, this week, today) stored in the
+    given rows of the UserProblemStat table.
+
+    Arguments:
+    * problem_stats - List of the rows of the user.
+    * stale_periods - Set of the periods that started after the statistics were computed,
+    whose statistics are empty.
+    """
+
+    statistics = {
+        period: extract_problems_information([], {}, {})
+        for period in STATISTICS_PERIODS
+    }
+
+    for problem_stat in problem_stats:
+        if problem_stat["period"] in stale_periods:
+            continue
+
+        period_statistics = statistics[problem_stat["period"]]
+
+        if problem_stat["dimension"] == "total_problems":
+            period_statistics["total_problems"] = problem_stat["count"]
+        else:
+            # Ratings are counted as integers (see extract_problems_information).
+            key = problem_stat["key"]
+            if problem_stat["dimension"] == "ratings":
+                key = int(key)
+
+            period_statistics[problem_stat["dimension"]][key] = problem_stat["count"]
+
+    return statistics
@@ -0,0 +1,239 @@
+"""
+Contains the schema migrations. db.create_all only creates the tables that do not exist
+yet, so changes to the models (eg. new columns or indexes) are applied to existing
+databases by the migrations instead. New databases are created from the models directly.
+
+The migrations are applied in order, and the number of migrations applied so far (the
+schema version) is recorded in the metadata. New migrations must be appended to MIGRATIONS.
+
+Each migration is a frozen step which does not depend on the models, since the models
+describe the latest schema, while a migration must apply the same change whenever it is
+applied.
+"""
+
+from flask import Flask
+
+from application.database import store_statistics_generation
+from application.models.orm import db
+from application.models.models import Metadata
+
+
+"""
+Schema version-related functions.
+"""
+
+
+def get_schema_version():
+    """
+    Returns the schema version of the database, i.e. the number of migrations applied.
+    """
+
+    schema_version = Metadata.query.get("schema_version")
+
+    return 0 if schema_version is None else int(schema_version.value)
+
+
+def set_schema_version(version: int):
+    """
+    Records the schema version of the database.
+
+    Arguments:
+    * version - The number of migrations applied.
+    """
+
+    db.session.merge(Metadata(key="schema_version", value=str(version)))
+
+
+"""
+Migrations.
+"""
+
+
+def create_index(
+    name: str,
+    table_name: str,
+    columns: list[str],
+    unique: bool = False,
+    postgresql_ops: dict[str, str] = None,
+):
+    """
+    Creates an index, unless an index with the same name exists already (eg. if the table
+    was created with it).
+
+    Arguments:
+    * name - The name of the index.
+    * table_name - The name of the table.
+    * columns - The names of the indexed columns.
+    * unique - Boolean flag indicating whether the index is unique.
+    * postgresql_ops - Dictionary mapping column names to their operator classes on
+    PostgreSQL, eg. {"name": "text_pattern_ops"}.
+    """
+
+    quote = db.engine.dialect.identifier_preparer.quote
+
+    if postgresql_ops is None or db.engine.dialect.name != "postgresql":
+        postgresql_ops = {}
+
+    indexed_columns = ", ".join(
+        f"{quote(column)} {postgresql_ops[column]}"
+        if column in postgresql_ops
+        else quote(column)
+        for column in columns
+    )
+
+    db.session.execute(
+        db.text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {quote(name)} "
+            f"ON {quote(table_name)} ({indexed_columns})"
+        )
+    )
+
+
+def store_problem_solved_dictionary_ids():
+    """
+    Recreates the problem_solved table with the tags and the language of the problems
+    solved stored as dictionary IDs (the tag_mask and language_id columns), instead of the
+    tags and language columns storing strings.
+
+    The table only contains data retrieved from Codeforces, so it is recreated empty rather
+    than converted, and refilled during the next update. The submission watermarks are
+    removed, so that the entire submission history of every user is fetched again.
+    """
+
+    connection = db.session.connection()
+    inspector = db.inspect(connection)
+
+    columns = {column["name"] for column in inspector.get_columns("problem_solved")}
+    if "tags" not in columns:
+        return
+
+    problem_solved = db.Table(
+        "problem_solved",
+        db.MetaData(),
+        db.Column("id", db.Integer, primary_key=True),
+        db.Column("handle", db.String(100), nullable=False),
+        db.Column("contest_id", db.Integer, nullable=False),
+        db.Column("index", db.String(5), nullable=False),
+        db.Column("rating", db.Integer, nullable=False),
+        db.Column("tag_mask", db.BigInteger, nullable=False),
+        db.Column("language_id", db.Integer, nullable=False),
+        db.Column("solved_time", db.DateTime, nullable=False),
+    )
+
+    problem_solved.drop(bind=connection)
+    problem_solved.create(bind=connection)
+
+    if inspector.has_table("submission_watermark"):
+        db.session.execute(db.text("DELETE FROM submission_watermark"))
+
+
+def add_per_user_table_indexes():
+    """
+    Creates the natural key indexes of the per-user tables, used to synchronize them during
+    updates, and the indexes on the columns they are queried by: (handle, solved_time),
+    (handle, rating_update_time) and (contest_id, rank).
+    """
+
+    create_index(
+        "ix_problem_solved_handle_contest_id_index",
+        "problem_solved",
+        ["handle", "contest_id", "index"],
+        unique=True,
+    )
+    create_index(
+        "ix_problem_solved_handle_solved_time",
+        "problem_solved",
+        ["handle", "solved_time"],
+    )
+    create_index(
+        "ix_contest_participant_handle_contest_id",
+        "contest_participant",
+        ["handle", "contest_id"],
+        unique=True,
+    )
+    create_index(
+        "ix_contest_participant_handle_rating_update_time",
+        "contest_participant",
+        ["handle", "rating_update_time"],
+    )
+    create_index(
+        "ix_contest_participant_contest_id_rank",
+        "contest_participant",
+        ["contest_id", "rank"],
+    )
+
+
+def add_problem_and_contest_filter_indexes():
+    """
+    Creates the indexes on the columns the problems and the contests are filtered and
+    paginated by: (rating), (date, contest_id) and (name).
+    """
+
+    create_index("ix_problem_rating", "problem", ["rating"])
+    create_index("ix_contest_date_contest_id", "contest", ["date", "contest_id"])
+    create_index(
+        "ix_contest_name",
+        "contest",
+        ["name"],
+        postgresql_ops={"name": "text_pattern_ops"},
+    )
+
+
+def refill_problem_tags():
+    """
+    Removes the digest of the problems stored during the previous update, so that the next
+    update rewrites the problems and fills the problem_tag table with their tags.
+    """
+
+    db.session.execute(db.text("DELETE FROM metadata WHERE key = 'problems_digest'"))
+
+
+# The migrations, in the order they are applied. Migrations are never removed, reordered
+# or changed once released, since the schema version is the number of migrations applied.
+MIGRATIONS = [
+    store_problem_solved_dictionary_ids,
+    add_per_user_table_indexes,
+    add_problem_and_contest_filter_indexes,
+    refill_problem_tags,
+]
+
+
+"""
+General migration-related functions.
+"""
+
+
+def run_migrations(app: Flask):
+    """
+    Creates the tables of a new database, or applies the migrations that have not been
+    applied to an existing database yet and creates the tables added since.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    with app.app_context():
+        # A new database is created from the models, which already include the changes of
+        # every migration.
+        if not db.inspect(db.engine).has_table(Metadata.__tablename__):
+            db.create_all()
+            set_schema_version(len(MIGRATIONS))
+            # Without data, the empty statistics are up to date.
+            store_statistics_generation()
+            db.session.commit()
+            app.logger.info("DATABASE CREATED.")
+            return
+
+        schema_version = get_schema_version()
+
+        for version, migration in enumerate(
+            MIGRATIONS[schema_version:], schema_version + 1
+        ):
+            app.logger.info(f"APPLYING MIGRATION {version}: {migration.__name__}.")
+
+            migration()
+            set_schema_version(version)
+            db.session.commit()
+
+        # The tables of new models are created once the existing tables are migrated.
+        db.create_all()
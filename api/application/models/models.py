@@ -46,6 +46,17 @@ class Contest(db.Model):
     """
 
     __tablename__ = "contest"
+    __table_args__ = (
+        # Pages of contests are retrieved in the order of the dates, filtered by date.
+        db.Index("ix_contest_date_contest_id", "date", "contest_id"),
+        # Contests are filtered by the prefix of their name. On PostgreSQL, the operator
+        # class makes the index usable for prefix matching (LIKE 'prefix%').
+        db.Index(
+            "ix_contest_name",
+            "name",
+            postgresql_ops={"name": "text_pattern_ops"},
+        ),
+    )
 
     # Codeforces contest ID.
     contest_id = db.Column(db.Integer, primary_key=True)
@@ -69,6 +80,23 @@ class ContestParticipant(db.Model):
     """
 
     __tablename__ = "contest_participant"
+    __table_args__ = (
+        # The natural key of the relation, used to synchronize the table during updates.
+        db.Index(
+            "ix_contest_participant_handle_contest_id",
+            "handle",
+            "contest_id",
+            unique=True,
+        ),
+        # A user's contests are retrieved in the order of the rating updates.
+        db.Index(
+            "ix_contest_participant_handle_rating_update_time",
+            "handle",
+            "rating_update_time",
+        ),
+        # The standings of a contest are retrieved in the order of the ranks.
+        db.Index("ix_contest_participant_contest_id_rank", "contest_id", "rank"),
+    )
 
     # Unique ID assigned to the relation.
     id = db.Column(db.Integer, primary_key=True)
@@ -95,6 +123,10 @@ class Problem(db.Model):
     """
 
     __tablename__ = "problem"
+    __table_args__ = (
+        # Problems are filtered by rating.
+        db.Index("ix_problem_rating", "rating"),
+    )
 
     # ID of the contest in which the problem is present.
     contest_id = db.Column(db.Integer, primary_key=True)
@@ -114,12 +146,44 @@ class Problem(db.Model):
         return f"{PROBLEM_BASE_URL}{self.contest_id}/{self.index}"
 
 
+class ProblemTag(db.Model):
+    """
+    Model describing a tag of a problem. Problems are filtered by tag through this table.
+    """
+
+    __tablename__ = "problem_tag"
+
+    # ID of the tag (see the Tag model). The primary key starts with it, so the problems
+    # with a tag are read from the primary key index, in the order of the problems.
+    tag_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # ID of the contest in which the problem is present.
+    contest_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Index of the problem in the contest.
+    index = db.Column(db.String(5), primary_key=True)
+
+    def __repr__(self):
+        return f"<ProblemTag: {self.contest_id}-{self.index} - {self.tag_id}>"
+
+
 class ProblemSolved(db.Model):
     """
     Model describing a problem solved by a user.
     """
 
     __tablename__ = "problem_solved"
+    __table_args__ = (
+        # The natural key of the relation, used to synchronize the table during updates.
+        db.Index(
+            "ix_problem_solved_handle_contest_id_index",
+            "handle",
+            "contest_id",
+            "index",
+            unique=True,
+        ),
+        # A user's problems solved are retrieved by the time they were solved in (eg.
+        # this month, this week).
+        db.Index("ix_problem_solved_handle_solved_time", "handle", "solved_time"),
+    )
 
     # Unique ID assigned to the relation.
     id = db.Column(db.Integer, primary_key=True)
@@ -131,10 +195,10 @@ class ProblemSolved(db.Model):
     index = db.Column(db.String(5), nullable=False)
     # Problem rating.
     rating = db.Column(db.Integer, nullable=False)
-    # Tags of the problem (stored as a string to store in the database).
-    tags = db.Column(db.String(200), nullable=False)
-    # Programming language the problem was solved in.
-    language = db.Column(db.String(100), nullable=False)
+    # Tags of the problem, as a bitmask of the IDs of the tags (see the Tag model).
+    tag_mask = db.Column(db.BigInteger, nullable=False)
+    # ID of the programming language the problem was solved in (see the Language model).
+    language_id = db.Column(db.Integer, nullable=False)
     # Problem solved time.
     solved_time = db.Column(db.DateTime, nullable=False)
 
@@ -142,6 +206,107 @@ class ProblemSolved(db.Model):
         return f"<ProblemSolved: {self.handle} - {self.contest_id}-{self.index}>"
 
 
+class Tag(db.Model):
+    """
+    Dictionary of the problem tags. Problems solved store their tags as a bitmask, in
+    which bit i is set if the problem has the tag with ID i.
+    """
+
+    __tablename__ = "tag"
+
+    # ID of the tag (its position in the bitmask).
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Name of the tag, eg. "greedy".
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Tag: {self.id} - {self.name}>"
+
+
+class Language(db.Model):
+    """
+    Dictionary of the programming languages problems were solved in.
+    """
+
+    __tablename__ = "language"
+
+    # ID of the language.
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Name of the language, eg. "GNU C++17".
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<Language: {self.id} - {self.name}>"
+
+
+class UserProblemStat(db.Model):
+    """
+    Model describing a count in the problem statistics of a user for a period, eg. the
+    number of problems with the tag "math" solved this month. The statistics are
+    computed once per update (see application/database.py), so that they are not
+    recomputed on every request.
+    """
+
+    __tablename__ = "user_problem_stat"
+
+    # Codeforces handle of the user.
+    handle = db.Column(db.String(100), primary_key=True)
+    # Period of the statistics, eg. "this_month".
+    period = db.Column(db.String(20), primary_key=True)
+    # Statistic counted, eg. "tags" ("total_problems" for the number of problems solved).
+    dimension = db.Column(db.String(20), primary_key=True)
+    # Value counted, eg. "math" (empty for "total_problems").
+    key = db.Column(db.String(100), primary_key=True)
+    # Number of problems solved.
+    count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<UserProblemStat: {self.handle} - {self.period} - {self.dimension} - {self.key}>"
+
+
+class UserContestStat(db.Model):
+    """
+    Model describing the contest statistics of a user for a period. The statistics are
+    computed once per update (see application/database.py), so that they are not
+    recomputed on every request.
+    """
+
+    __tablename__ = "user_contest_stat"
+
+    # Codeforces handle of the user.
+    handle = db.Column(db.String(100), primary_key=True)
+    # Period of the statistics, eg. "this_month".
+    period = db.Column(db.String(20), primary_key=True)
+    # Number of contests given.
+    total_contests = db.Column(db.Integer, nullable=False)
+    # Best and worst ranks (None if no contest was given).
+    best_rank = db.Column(db.Integer, nullable=True)
+    worst_rank = db.Column(db.Integer, nullable=True)
+    # Highest rating increase and decrease.
+    highest_rating_increase = db.Column(db.Integer, nullable=False)
+    highest_rating_decrease = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<UserContestStat: {self.handle} - {self.period}>"
+
+
+class SubmissionWatermark(db.Model):
+    """
+    Model storing the newest submission of a user seen during the previous update. Used
+    to fetch only newer submissions during incremental updates.
+    """
+
+    __tablename__ = "submission_watermark"
+
+    # Codeforces handle of the user.
+    handle = db.Column(db.String(100), primary_key=True)
+    # ID of the newest submission of the user.
+    last_submission_id = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<SubmissionWatermark: {self.handle} - {self.last_submission_id}>"
+
+
 """
 Metadata for the application (not directly used in the application).
 """
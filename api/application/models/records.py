@@ -0,0 +1,101 @@
+"""
+Contains the records passed from the Codeforces fetchers (see application/codeforces) to the
+database functions (see application/database.py) during an update.
+
+The records are named tuples rather than dictionaries, which keeps them compact when a
+large number of them is retrieved, and their times are datetime objects, so that they can
+be written to the database as they are. Except for SubmissionRecord, the fields of a record
+are named after the columns of the corresponding model.
+"""
+
+from datetime import datetime
+from typing import NamedTuple
+
+
+class UserRecord(NamedTuple):
+    """
+    Information about a Codeforces user (see the User model).
+    """
+
+    handle: str
+    creation_date: datetime
+    rating: int
+    max_rating: int
+    rank: str
+
+
+class ContestRecord(NamedTuple):
+    """
+    A finished Codeforces contest (see the Contest model).
+    """
+
+    contest_id: int
+    name: str
+    date: datetime
+    duration: int
+
+
+class ProblemRecord(NamedTuple):
+    """
+    A Codeforces problem (see the Problem model).
+    """
+
+    contest_id: int
+    index: str
+    name: str
+    rating: int
+    tags: str
+
+
+class RatingChangeRecord(NamedTuple):
+    """
+    The rating change of a user in a contest (see the ContestParticipant model).
+    """
+
+    handle: str
+    contest_id: int
+    rank: int
+    old_rating: int
+    new_rating: int
+    rating_update_time: datetime
+
+
+class SubmissionRecord(NamedTuple):
+    """
+    The first accepted submission of a user for a problem, as retrieved from Codeforces.
+    Encoded into a ProblemSolvedRecord before it is stored (see application/database.py).
+    """
+
+    handle: str
+    contest_id: int
+    index: str
+    rating: int
+    tags: tuple[str, ...]
+    language: str
+    solved_time: datetime
+
+
+class ProblemSolvedRecord(NamedTuple):
+    """
+    A submission record with its tags and language replaced by their IDs in the
+    dictionary tables (see the ProblemSolved, Tag and Language models).
+    """
+
+    handle: str
+    contest_id: int
+    index: str
+    rating: int
+    tag_mask: int
+    language_id: int
+    solved_time: datetime
+
+
+class ProblemTagRecord(NamedTuple):
+    """
+    A tag of a Codeforces problem, by its ID in the Tag dictionary table (see the
+    ProblemTag and Tag models).
+    """
+
+    tag_id: int
+    contest_id: int
+    index: str
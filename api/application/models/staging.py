@@ -0,0 +1,70 @@
+"""
+Contains the staging tables. During an update, the data retrieved from the Codeforces API
+is written to the staging tables as soon as it arrives, and is then applied to the
+application tables in a single short transaction (see application/database.py).
+
+A staging table has the same schema as its application table, with "__next" appended to
+the names of the table and its indexes, so that it can either be synchronized into the
+application table or swapped into its place.
+
+The staging tables are not part of the application models' metadata, so they are not
+created by db.create_all. They are created at the start of every update instead.
+"""
+
+from application.models.orm import db
+from application.models.models import ContestParticipant, ProblemSolved
+
+
+staging_metadata = db.MetaData()
+
+
+def get_staging_name(name: str):
+    """
+    Returns the name of the staging counterpart of a table or an index.
+
+    Arguments:
+    * name - The name of the table or the index.
+    """
+
+    return f"{name}__next"
+
+
+def create_staging_table(table: db.Table):
+    """
+    Returns a staging table with the same columns and indexes as the given table.
+
+    Arguments:
+    * table - The application table.
+    """
+
+    staging_table = db.Table(
+        get_staging_name(table.name),
+        staging_metadata,
+        *[
+            db.Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+            )
+            for column in table.columns
+        ],
+    )
+
+    for index in table.indexes:
+        db.Index(
+            get_staging_name(index.name),
+            *[staging_table.c[column.name] for column in index.columns],
+            unique=index.unique,
+        )
+
+    return staging_table
+
+
+"""
+Staging tables.
+"""
+
+
+contest_participant_staging = create_staging_table(ContestParticipant.__table__)
+problem_solved_staging = create_staging_table(ProblemSolved.__table__)
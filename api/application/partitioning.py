@@ -0,0 +1,287 @@
+"""
+Contains the functions for the partitioned storage mode. With PARTITIONED_TABLES=true on
+PostgreSQL, the problem_solved table is range-partitioned by month on the time a problem
+was solved. The queries of the problems statistics of the recent periods filter on that
+time (see application/aggregation.py), so they only read the partition of the current
+month.
+
+The contest_participant table is not partitioned, since the contest statistics of the
+periods are based on the dates of the contests, which it does not store.
+
+On other databases (eg. SQLite in development and testing), the setting is ignored and
+the tables are not partitioned.
+
+PostgreSQL requires the unique indexes of a partitioned table to include the partition
+column, so in this mode, the partition column is part of the key the rows are
+synchronized on (see application/database.py).
+"""
+
+from datetime import date, datetime
+from os import environ
+from flask import Flask
+
+from application.models.orm import db
+from application.models.models import ProblemSolved
+from application.utils.constants import PARTITIONS_START_YEAR
+
+
+# The partitioned tables and their partition columns.
+PARTITION_COLUMNS = {
+    ProblemSolved.__tablename__: "solved_time",
+}
+
+
+"""
+Partition-related functions.
+"""
+
+
+def is_partitioned():
+    """
+    Returns whether the partitioned storage mode is enabled and supported by the database.
+    """
+
+    return (
+        environ.get("PARTITIONED_TABLES", "false") == "true"
+        and db.engine.dialect.name == "postgresql"
+    )
+
+
+def get_partition_column(table: db.Table):
+    """
+    Returns the partition column of the table in the partitioned storage mode, or None if
+    the table is not partitioned.
+
+    Arguments:
+    * table - The table.
+    """
+
+    if not is_partitioned():
+        return None
+
+    return PARTITION_COLUMNS.get(table.name)
+
+
+def get_next_month(day: date):
+    """
+    Returns the first day of the month following the month of a date.
+
+    Arguments:
+    * day - The date.
+    """
+
+    return (
+        date(day.year + 1, 1, 1)
+        if day.month == 12
+        else date(day.year, day.month + 1, 1)
+    )
+
+
+def get_monthly_ranges(start: date, end: date):
+    """
+    Returns a list of tuples of (suffix, start date, end date) of the monthly partitions
+    from the month of the start date to the month of the end date, excluded.
+
+    Arguments:
+    * start - The first day of the first month.
+    * end - The first day of the month following the last month.
+    """
+
+    ranges = []
+
+    while start < end:
+        ranges.append((f"{start.year}_{start.month:02}", start, get_next_month(start)))
+        start = get_next_month(start)
+
+    return ranges
+
+
+def get_partition_ranges(until: date, monthly_years: set[int] = frozenset()):
+    """
+    Returns a list of tuples of (suffix, start date, end date) of the partitions: yearly
+    partitions from PARTITIONS_START_YEAR to the year preceding the given date, and monthly
+    partitions from January of the year of the given date to the month following it.
+
+    Arguments:
+    * until - The date whose following month is the last partitioned.
+    * monthly_years - The years preceding the year of the given date which are partitioned
+    by month rather than by year, since they already have monthly partitions.
+    """
+
+    ranges = []
+
+    for year in range(PARTITIONS_START_YEAR, until.year):
+        if year in monthly_years:
+            ranges += get_monthly_ranges(date(year, 1, 1), date(year + 1, 1, 1))
+        else:
+            ranges.append((f"{year}", date(year, 1, 1), date(year + 1, 1, 1)))
+
+    return ranges + get_monthly_ranges(
+        date(until.year, 1, 1), get_next_month(get_next_month(until))
+    )
+
+
+def get_monthly_years(table_name: str, parent_name: str):
+    """
+    Returns the set of the years which have monthly partitions in a partitioned table.
+
+    Arguments:
+    * table_name - The name of the table, which the names of the partitions are based on.
+    * parent_name - The name of the partitioned table.
+    """
+
+    partition_names = db.session.execute(
+        db.text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:name)"
+        ),
+        {"name": parent_name},
+    ).scalars()
+
+    # The suffixes of the monthly partitions are formatted as "2020_01".
+    suffixes = [name[len(f"{table_name}_") :] for name in partition_names]
+
+    return {
+        int(suffix[:4])
+        for suffix in suffixes
+        if len(suffix) == 7 and suffix[4] == "_" and suffix[:4].isdigit()
+    }
+
+
+def create_partitions(table_name: str, parent_name: str = None):
+    """
+    Creates the partitions of a partitioned table up to the next month (see
+    get_partition_ranges), and a default partition for the rows outside of them. Existing
+    partitions are kept.
+
+    Arguments:
+    * table_name - The name of the table, which the names of the partitions are based on.
+    * parent_name - The name of the partitioned table, if it differs from table_name (i.e.
+    while the table is being converted).
+    """
+
+    quote = db.engine.dialect.identifier_preparer.quote
+    parent_name = parent_name or table_name
+    parent = quote(parent_name)
+
+    # A yearly partition cannot overlap the monthly partitions created during that year.
+    monthly_years = get_monthly_years(table_name, parent_name)
+
+    for suffix, start, end in get_partition_ranges(
+        datetime.now().date(), monthly_years
+    ):
+        db.session.execute(
+            db.text(
+                f"CREATE TABLE IF NOT EXISTS {quote(f'{table_name}_{suffix}')} "
+                f"PARTITION OF {parent} FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+        )
+
+    db.session.execute(
+        db.text(
+            f"CREATE TABLE IF NOT EXISTS {quote(f'{table_name}_default')} "
+            f"PARTITION OF {parent} DEFAULT"
+        )
+    )
+
+
+def partition_table(table: db.Table):
+    """
+    Converts a table into a table partitioned by its partition column, keeping its rows.
+    The unique indexes and the primary key are extended with the partition column.
+
+    Arguments:
+    * table - The table to convert.
+    """
+
+    quote = db.engine.dialect.identifier_preparer.quote
+    partition_column = PARTITION_COLUMNS[table.name]
+    partitioned_name = f"{table.name}__partitioned"
+
+    statements = [
+        f"CREATE TABLE {quote(partitioned_name)} "
+        f"(LIKE {quote(table.name)} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE ({quote(partition_column)})",
+        f"ALTER TABLE {quote(partitioned_name)} "
+        f"ADD PRIMARY KEY (id, {quote(partition_column)})",
+        # The sequence of the "id" column is owned by the table being dropped.
+        f"ALTER SEQUENCE {quote(f'{table.name}_id_seq')} "
+        f"OWNED BY {quote(partitioned_name)}.id",
+    ]
+
+    for statement in statements:
+        db.session.execute(db.text(statement))
+
+    create_partitions(table.name, partitioned_name)
+
+    statements = [
+        f"INSERT INTO {quote(partitioned_name)} SELECT * FROM {quote(table.name)}",
+        f"DROP TABLE {quote(table.name)}",
+        f"ALTER TABLE {quote(partitioned_name)} RENAME TO {quote(table.name)}",
+        f"ALTER INDEX {quote(f'{partitioned_name}_pkey')} "
+        f"RENAME TO {quote(f'{table.name}_pkey')}",
+    ]
+
+    for statement in statements:
+        db.session.execute(db.text(statement))
+
+    # The indexes of the dropped table are recreated on the partitioned table.
+    for index in table.indexes:
+        columns = [quote(column.name) for column in index.columns]
+        if index.unique and partition_column not in [c.name for c in index.columns]:
+            columns.append(quote(partition_column))
+
+        db.session.execute(
+            db.text(
+                f"CREATE {'UNIQUE ' if index.unique else ''}INDEX {quote(index.name)} "
+                f"ON {quote(table.name)} ({', '.join(columns)})"
+            )
+        )
+
+
+def is_table_partitioned(table: db.Table):
+    """
+    Returns whether the table is partitioned in the database.
+
+    Arguments:
+    * table - The table.
+    """
+
+    return (
+        db.session.execute(
+            db.text(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"
+            ),
+            {"name": table.name},
+        ).first()
+        is not None
+    )
+
+
+"""
+General partitioning-related functions.
+"""
+
+
+def init_partitions(app: Flask):
+    """
+    In the partitioned storage mode, converts the tables that are not partitioned yet, and
+    creates the partitions up to the next month. Does nothing otherwise.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    with app.app_context():
+        if not is_partitioned():
+            return
+
+        for table in (ProblemSolved.__table__,):
+            if is_table_partitioned(table):
+                create_partitions(table.name)
+            else:
+                app.logger.info(f"PARTITIONING {table.name.upper()} TABLE.")
+                partition_table(table)
+
+        db.session.commit()
@@ -0,0 +1,528 @@
+"""
+Contains the cache of the responses of the routes (see application/routes). The data only
+changes during updates, so a response is computed once and then served from the cache
+until the next update.
+
+Responses are keyed by the data generation (see get_data_generation in
+application/database.py), which is incremented whenever the data changes, the current
+date (since the statistics of the periods depend on it), and the path and query
+parameters of the request. Each process reads the data generation at most once every
+RESPONSE_DATA_VERSION_TTL seconds, so responses of the previous generation may be served
+for that long after an update. Only the query parameters read by the route are part of the key
+(see cached_response), so that other parameters do not create new cache entries. Responses
+of earlier generations are never served again.
+
+The cache has two tiers: an in-memory LRU cache in each process, and an optional on-disk
+cache in RESPONSE_CACHE_DIR shared by all processes (eg. the gunicorn workers), so that a
+response computed by one worker is served by all of them. The on-disk cache is disabled
+if RESPONSE_CACHE_DIR is empty. Both tiers are bounded, evicting the least recently used
+responses.
+
+The responses also carry a strong ETag derived from their key, and the time the data last
+changed as Last-Modified, so that clients revalidating a response (with If-None-Match or
+If-Modified-Since) are answered with 304 Not Modified before any data is read.
+
+Large response bodies are compressed once, when they are cached, with gzip and (if the
+brotli package is installed) brotli. Each request is served the encoding it accepts
+(see the Accept-Encoding header), without compressing anything per request.
+"""
+
+import gzip
+from collections import OrderedDict
+from datetime import date, datetime, time, timezone
+from functools import wraps
+from glob import glob
+from hashlib import sha256
+from os import environ, makedirs, path, remove, replace, utime
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import monotonic
+from urllib.parse import urlencode
+from flask import Flask, current_app, request
+
+from application.database import get_data_version
+from application.utils.constants import (
+    RESPONSE_BROTLI_QUALITY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_DATA_VERSION_TTL,
+    RESPONSE_DISK_CACHE_SIZE,
+    RESPONSE_COMPRESSION_MIN_SIZE,
+    RESPONSE_GZIP_LEVEL,
+)
+
+# Brotli is optional, responses are only compressed with gzip without it.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Extensions of the cache files of the encodings of a response body.
+ENCODING_EXTENSIONS = {"br": ".json.br", "gzip": ".json.gz", "identity": ".json"}
+
+# The in-memory tier, mapping keys to dictionaries mapping encodings to the response
+# bodies in these encodings, in the order of their last use.
+memory_cache = OrderedDict()
+memory_cache_lock = Lock()
+
+# The data generation of the responses in the cache.
+cached_generation = None
+
+# Tuple of the time (see time.monotonic) at which the data generation and the time the
+# data last changed were last read, and their values (see get_cached_data_version).
+data_version = None
+
+
+"""
+In-memory cache-related functions.
+"""
+
+
+def read_memory(key: str, encoding: str):
+    """
+    Returns the response body in the given encoding cached in memory under the key, or
+    None if it is not cached.
+
+    Arguments:
+    * key - The key of the response.
+    * encoding - The encoding of the response body, eg. "gzip".
+    """
+
+    with memory_cache_lock:
+        bodies = memory_cache.get(key)
+        if bodies is None:
+            return None
+
+        memory_cache.move_to_end(key)
+        return bodies.get(encoding)
+
+
+def write_memory(key: str, bodies: dict[str, bytes]):
+    """
+    Caches the encodings of a response body in memory under the key, along with those
+    already cached, evicting the least recently used response if the cache is full.
+
+    Arguments:
+    * key - The key of the response.
+    * bodies - Dictionary mapping encodings to the response body in these encodings.
+    """
+
+    with memory_cache_lock:
+        memory_cache[key] = {**memory_cache.get(key, {}), **bodies}
+        memory_cache.move_to_end(key)
+
+        if len(memory_cache) > RESPONSE_CACHE_SIZE:
+            memory_cache.popitem(last=False)
+
+
+"""
+On-disk cache-related functions.
+"""
+
+
+def get_cache_directory():
+    """
+    Returns the directory of the on-disk cache, or an empty string if it is disabled.
+    """
+
+    return environ.get("RESPONSE_CACHE_DIR", "")
+
+
+def get_cache_path(generation: int, key: str, encoding: str):
+    """
+    Returns the path of the cache file of a response body. The file name starts with the
+    data generation, so that the files of earlier generations can be found and removed.
+
+    Arguments:
+    * generation - The data generation of the response.
+    * key - The key of the response.
+    * encoding - The encoding of the response body, eg. "gzip".
+    """
+
+    return path.join(
+        get_cache_directory(),
+        f"{generation}-{sha256(key.encode()).hexdigest()[:32]}"
+        f"{ENCODING_EXTENSIONS[encoding]}",
+    )
+
+
+def read_disk(generation: int, key: str, encoding: str):
+    """
+    Returns the response body in the given encoding cached on disk under the key, or None
+    if it is not cached.
+
+    Arguments:
+    * generation - The data generation of the response.
+    * key - The key of the response.
+    * encoding - The encoding of the response body, eg. "gzip".
+    """
+
+    if not get_cache_directory():
+        return None
+
+    cache_path = get_cache_path(generation, key, encoding)
+
+    try:
+        with open(cache_path, "rb") as file:
+            body = file.read()
+
+        # The modification time of a cache file is the time of its last use (see
+        # trim_disk).
+        utime(cache_path)
+    except FileNotFoundError:
+        return None
+
+    return body
+
+
+def write_disk(generation: int, key: str, bodies: dict[str, bytes]):
+    """
+    Caches the encodings of a response body on disk under the key.
+
+    Arguments:
+    * generation - The data generation of the response.
+    * key - The key of the response.
+    * bodies - Dictionary mapping encodings to the response body in these encodings.
+    """
+
+    if not get_cache_directory():
+        return
+
+    makedirs(get_cache_directory(), exist_ok=True)
+
+    # The uncompressed body is written last, so that once it is cached, the compressed
+    # bodies are cached as well (see get_cached_body).
+    for encoding in sorted(bodies, key=lambda encoding: encoding == "identity"):
+        # The body is written to a temporary file first and then moved in place, so that
+        # other processes never read a partially written file.
+        with NamedTemporaryFile(
+            dir=get_cache_directory(), suffix=".tmp", delete=False
+        ) as temporary_file:
+            temporary_file.write(bodies[encoding])
+
+        replace(temporary_file.name, get_cache_path(generation, key, encoding))
+
+    trim_disk()
+
+
+def trim_disk():
+    """
+    Removes the least recently used responses cached on disk, along with their compressed
+    bodies, while more than RESPONSE_DISK_CACHE_SIZE responses are cached.
+    """
+
+    # Each response has a cache file of its uncompressed body.
+    cache_paths = []
+    for cache_path in glob(path.join(get_cache_directory(), "*.json")):
+        # Another process may have removed the file already.
+        try:
+            cache_paths.append((path.getmtime(cache_path), cache_path))
+        except FileNotFoundError:
+            pass
+
+    cache_paths.sort()
+    evicted_count = max(len(cache_paths) - RESPONSE_DISK_CACHE_SIZE, 0)
+
+    for _, cache_path in cache_paths[:evicted_count]:
+        for extension in ENCODING_EXTENSIONS.values():
+            try:
+                remove(cache_path[: -len(".json")] + extension)
+            except FileNotFoundError:
+                pass
+
+
+def remove_disk(generation: int = None):
+    """
+    Removes the responses cached on disk, except those of the given data generation.
+
+    Arguments:
+    * generation - The data generation whose responses are kept. If None, every response
+    is removed.
+    """
+
+    if not get_cache_directory():
+        return
+
+    for cache_path in glob(path.join(get_cache_directory(), "*.json*")):
+        if generation is None or not path.basename(cache_path).startswith(
+            f"{generation}-"
+        ):
+            # Another process may have removed the file already.
+            try:
+                remove(cache_path)
+            except FileNotFoundError:
+                pass
+
+
+"""
+General response cache-related functions.
+"""
+
+
+def clear():
+    """
+    Removes every cached response, from both tiers.
+    """
+
+    global cached_generation, data_version
+
+    with memory_cache_lock:
+        memory_cache.clear()
+        cached_generation = None
+        data_version = None
+
+    remove_disk()
+
+
+def get_response_key(parameters: tuple[str, ...]):
+    """
+    Returns the key of the response to the current request.
+
+    Arguments:
+    * parameters - The names of the query parameters read by the route. The values of the
+    other query parameters do not change the response, so they are not part of the key.
+    """
+
+    # Routes read the first value of a query parameter.
+    query = urlencode(
+        [
+            (name, request.args[name])
+            for name in sorted(parameters)
+            if name in request.args
+        ]
+    )
+
+    return f"{date.today()} {request.path}?{query}"
+
+
+def get_cached_data_version():
+    """
+    Returns a tuple of the data generation and the time (in UTC) at which the data last
+    changed (see get_data_version in application/database.py), read again only once
+    RESPONSE_DATA_VERSION_TTL seconds have passed since they were last read.
+    """
+
+    global data_version
+
+    # The tuple is replaced as a whole, so concurrent requests never see a partial one.
+    current_version = data_version
+    if (
+        current_version is None
+        or monotonic() - current_version[0] >= RESPONSE_DATA_VERSION_TTL
+    ):
+        current_version = (monotonic(), *get_data_version())
+        data_version = current_version
+
+    return current_version[1:]
+
+
+def get_last_modified(data_modified_time: datetime):
+    """
+    Returns the time (in UTC) at which the responses last changed: the time the data last
+    changed, or the start of the current day (when the statistics of the periods change)
+    if it is later.
+
+    Arguments:
+    * data_modified_time - The time at which the data last changed, or None if it never
+    changed.
+    """
+
+    day_start = datetime.combine(date.today(), time()).astimezone(timezone.utc)
+
+    if data_modified_time is None:
+        return day_start
+
+    return max(data_modified_time, day_start)
+
+
+def check_not_modified(etags: dict[str, str], last_modified: datetime):
+    """
+    Returns a tuple of whether the current request is conditional and the response it
+    revalidates is unchanged, and the encoding of that response if it was revalidated by
+    its ETag (None otherwise). If-None-Match takes precedence over If-Modified-Since.
+
+    Arguments:
+    * etags - Dictionary mapping encodings to the ETags of the current response in them.
+    * last_modified - The time at which the current response last changed.
+    """
+
+    if request.if_none_match:
+        for encoding, etag in etags.items():
+            if request.if_none_match.contains(etag):
+                return True, encoding
+
+        return False, None
+
+    return (
+        request.if_modified_since is not None
+        and last_modified.replace(microsecond=0) <= request.if_modified_since,
+        None,
+    )
+
+
+def get_accepted_encodings():
+    """
+    Returns the encodings of the response bodies accepted by the current request, in the
+    order of preference.
+    """
+
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    return [
+        encoding for encoding in encodings if request.accept_encodings[encoding] > 0
+    ] + ["identity"]
+
+
+def compress(body: bytes):
+    """
+    Returns a dictionary mapping encodings to the given response body in these encodings.
+    Small bodies are not compressed, since compression barely reduces their size.
+
+    Arguments:
+    * body - The uncompressed response body.
+    """
+
+    bodies = {"identity": body}
+
+    if len(body) < RESPONSE_COMPRESSION_MIN_SIZE:
+        return bodies
+
+    bodies["gzip"] = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+
+    return bodies
+
+
+def get_cached_body(generation: int, key: str, encodings: list[str]):
+    """
+    Returns a tuple of the encoding and the response body in that encoding cached under the
+    key, in the first of the given encodings that is cached, or None if the response is not
+    cached. If the uncompressed body is cached, the compressed bodies that are not cached
+    were not produced, since the body is small.
+
+    Arguments:
+    * generation - The current data generation.
+    * key - The key of the response.
+    * encodings - The accepted encodings, in the order of preference, ending with
+    "identity".
+    """
+
+    for encoding in encodings:
+        body = read_memory(key, encoding)
+
+        if body is None:
+            body = read_disk(generation, key, encoding)
+            if body is not None:
+                write_memory(key, {encoding: body})
+
+        if body is not None:
+            return encoding, body
+
+    return None
+
+
+def get_response(generation: int, key: str, view, *args, **kwargs):
+    """
+    Returns a tuple of the encoding of the response body and the response: the cached
+    response under the key, or the response of the view function if it is not cached,
+    caching it if it is successful.
+
+    Arguments:
+    * generation - The current data generation.
+    * key - The key of the response.
+    * view - The view function.
+    * args, kwargs - The arguments of the view function.
+    """
+
+    encodings = get_accepted_encodings()
+    cached_body = get_cached_body(generation, key, encodings)
+
+    if cached_body is None:
+        response = current_app.make_response(view(*args, **kwargs))
+
+        # Only successful responses are cached, eg. not the responses for unknown users.
+        if response.status_code != 200:
+            return "identity", response
+
+        bodies = compress(response.get_data())
+        write_memory(key, bodies)
+        write_disk(generation, key, bodies)
+
+        encoding = next(encoding for encoding in encodings if encoding in bodies)
+        cached_body = encoding, bodies[encoding]
+
+    encoding, body = cached_body
+    response = current_app.response_class(body, mimetype="application/json")
+
+    if encoding != "identity":
+        response.content_encoding = encoding
+
+    return encoding, response
+
+
+def cached_response(*parameters: str):
+    """
+    Returns a decorator caching the successful responses of a view function, and
+    answering conditional requests for unchanged responses with 304 Not Modified.
+
+    Arguments:
+    * parameters - The names of the query parameters read by the view function, eg.
+    "limit". The responses are cached per value of these parameters only.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def cached_view(*args, **kwargs):
+            global cached_generation
+
+            generation, data_modified_time = get_cached_data_version()
+            key = f"{generation} {get_response_key(parameters)}"
+
+            # The responses of earlier generations are never served again.
+            if generation != cached_generation:
+                with memory_cache_lock:
+                    memory_cache.clear()
+                    cached_generation = generation
+                remove_disk(generation)
+
+            # Each encoding of the response has its own ETag.
+            etags = {
+                encoding: sha256(f"{key} {encoding}".encode()).hexdigest()[:32]
+                for encoding in ENCODING_EXTENSIONS
+            }
+            last_modified = get_last_modified(data_modified_time)
+
+            not_modified, encoding = check_not_modified(etags, last_modified)
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                encoding, response = get_response(
+                    generation, key, view, *args, **kwargs
+                )
+
+            if response.status_code in (200, 304):
+                if encoding is not None:
+                    response.set_etag(etags[encoding])
+                response.last_modified = last_modified
+                response.vary.add("Accept-Encoding")
+
+            return response
+
+        return cached_view
+
+    return decorator
+
+
+def init_response_cache(app: Flask):
+    """
+    Clears the responses cached by a previous instance of the application, whose
+    responses may differ from those of this one.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    clear()
+    app.logger.info("RESPONSE CACHE CLEARED.")
@@ -3,23 +3,76 @@ Contains contest-related endpoints exposed externally. The endpoints are grouped
 under the /contests blueprint.
 """
 
-from flask import Blueprint, jsonify
+from datetime import timedelta
+from flask import Blueprint, jsonify, request
 
+from application.response_cache import cached_response
+from application.models.orm import db
 from application.models.models import Metadata, Contest, ContestParticipant
 from application.helpers.contests import sort_contest_participants
-from application.utils.common import get_all_rows_as_dict, row_to_dict
+from application.utils.common import (
+    convert_datestring_to_datetime,
+    get_all_rows_as_dict,
+    row_to_dict,
+)
+from application.utils.pagination import get_argument, get_page, get_page_arguments
 
 
 contests_routes = Blueprint("contests_routes", __name__)
 
 
+def filter_contests(query: db.Query):
+    """
+    Returns the query of the contests filtered by the query parameters of the current
+    request. Raises a ValueError if a parameter is invalid.
+    * start_date, end_date - The range of the dates of the contests (inclusive), of the
+    format "%Y-%m-%d".
+    * name_prefix - The prefix of the names of the contests.
+
+    Arguments:
+    * query - The query of the contests.
+    """
+
+    start_date = get_argument("start_date", convert_datestring_to_datetime)
+    if start_date is not None:
+        query = query.filter(Contest.date >= start_date)
+
+    # The contests of the end date are included, whatever their time.
+    end_date = get_argument("end_date", convert_datestring_to_datetime)
+    if end_date is not None:
+        query = query.filter(Contest.date < end_date + timedelta(days=1))
+
+    name_prefix = request.args.get("name_prefix")
+    if name_prefix is not None:
+        query = query.filter(Contest.name.startswith(name_prefix, autoescape=True))
+
+    return query
+
+
 @contests_routes.route("/", methods=["GET"])
+@cached_response("start_date", "end_date", "name_prefix", "limit", "cursor")
 def get_all_contests():
     """
-    Returns all contests.
+    Returns all contests, filtered by the query parameters (see filter_contests). With
+    the "limit" or "cursor" query parameters, returns a page of the contests in the order
+    of their date, and the cursor of the next page (see
+    application/utils/pagination.py).
     """
 
-    contests = get_all_rows_as_dict(Contest.query.all())
+    try:
+        query = filter_contests(Contest.query)
+        page_arguments = get_page_arguments()
+
+        if page_arguments is None:
+            contests = query.all()
+        else:
+            contests, next_cursor = get_page(
+                query, [Contest.date, Contest.contest_id], *page_arguments
+            )
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    contests = get_all_rows_as_dict(contests)
     last_update_time = Metadata.query.get("last_update_time")
 
     # If the database was not updated, last_update_time will not be set in the database.
@@ -29,18 +82,21 @@ def get_all_contests():
     else:
         last_update_time = "NONE"
 
-    return (
-        jsonify(
-            {
-                "last_update_time": last_update_time,
-                "contests": contests,
-            }
-        ),
-        200,
-    )
+    response = {
+        "last_update_time": last_update_time,
+        "contests": contests,
+    }
+
+    # Only paginated responses carry a cursor, so that the unpaginated responses are
+    # unchanged.
+    if page_arguments is not None:
+        response["next_cursor"] = next_cursor
+
+    return jsonify(response), 200
 
 
 @contests_routes.route("/<int:contest_id>", methods=["GET"])
+@cached_response()
 def get_contest(contest_id: int):
     """
     Returns the contest with the given id.
@@ -80,6 +136,7 @@ def get_contest(contest_id: int):
 
 
 @contests_routes.route("/<int:contest_id>/standings", methods=["GET"])
+@cached_response()
 def get_contest_standings(contest_id: int):
     """
     Returns the standings among the organization's users for the contest with the given id.
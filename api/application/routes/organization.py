@@ -7,6 +7,7 @@ from flask import Blueprint, jsonify
 from os import environ
 from dotenv import load_dotenv
 
+from application.response_cache import cached_response
 from application.models.models import Metadata
 
 
@@ -17,6 +18,7 @@ organization_routes = Blueprint("organization_routes", __name__)
 
 
 @organization_routes.route("/name", methods=["GET"])
+@cached_response()
 def get_organization_name():
     """
     Returns the organization name.
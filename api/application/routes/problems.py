@@ -3,22 +3,80 @@ Contains problem-related endpoints exposed externally. The endpoints are grouped
 under the /problems blueprint.
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 
-from application.models.models import Metadata, Problem
+from application.response_cache import cached_response
+from application.models.orm import db
+from application.models.models import Metadata, Problem, ProblemTag, Tag
 from application.utils.common import get_all_rows_as_dict
+from application.utils.pagination import get_argument, get_page, get_page_arguments
 
 
 problems_routes = Blueprint("problems_routes", __name__)
 
 
+def filter_problems(query: db.Query):
+    """
+    Returns the query of the problems filtered by the query parameters of the current
+    request. Raises a ValueError if a parameter is invalid.
+    * min_rating, max_rating - The range of the ratings of the problems (inclusive).
+    * tag - A tag of the problems.
+
+    Arguments:
+    * query - The query of the problems.
+    """
+
+    min_rating = get_argument("min_rating", int)
+    if min_rating is not None:
+        query = query.filter(Problem.rating >= min_rating)
+
+    max_rating = get_argument("max_rating", int)
+    if max_rating is not None:
+        query = query.filter(Problem.rating <= max_rating)
+
+    # The problems with the tag are read from the primary key index of the ProblemTag
+    # table, which starts with the ID of the tag.
+    tag = request.args.get("tag")
+    if tag is not None:
+        query = (
+            query.join(
+                ProblemTag,
+                db.and_(
+                    ProblemTag.contest_id == Problem.contest_id,
+                    ProblemTag.index == Problem.index,
+                ),
+            )
+            .join(Tag, Tag.id == ProblemTag.tag_id)
+            .filter(Tag.name == tag)
+        )
+
+    return query
+
+
 @problems_routes.route("/", methods=["GET"])
+@cached_response("min_rating", "max_rating", "tag", "limit", "cursor")
 def get_all_problems():
     """
-    Returns all problems.
+    Returns all problems, filtered by the query parameters (see filter_problems). With
+    the "limit" or "cursor" query parameters, returns a page of the problems in the order
+    of their contest ID and index, and the cursor of the next page (see
+    application/utils/pagination.py).
     """
 
-    problems = get_all_rows_as_dict(Problem.query.all())
+    try:
+        query = filter_problems(Problem.query)
+        page_arguments = get_page_arguments()
+
+        if page_arguments is None:
+            problems = query.all()
+        else:
+            problems, next_cursor = get_page(
+                query, [Problem.contest_id, Problem.index], *page_arguments
+            )
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    problems = get_all_rows_as_dict(problems)
     last_update_time = Metadata.query.get("last_update_time")
 
     # If the database was not updated, last_update_time will not be set in the database.
@@ -28,12 +86,14 @@ def get_all_problems():
     else:
         last_update_time = "NONE"
 
-    return (
-        jsonify(
-            {
-                "last_update_time": last_update_time,
-                "problems": problems,
-            }
-        ),
-        200,
-    )
+    response = {
+        "last_update_time": last_update_time,
+        "problems": problems,
+    }
+
+    # Only paginated responses carry a cursor, so that the unpaginated responses are
+    # unchanged.
+    if page_arguments is not None:
+        response["next_cursor"] = next_cursor
+
+    return jsonify(response), 200
@@ -3,29 +3,57 @@ Contains user-related endpoints exposed externally. The endpoints are grouped
 under the /users blueprint.
 """
 
+from datetime import datetime
 from flask import Blueprint, jsonify
 
+from application.response_cache import cached_response
 from application.models.models import (
     Metadata,
-    Contest,
-    ProblemSolved,
     User,
     ContestParticipant,
+    UserContestStat,
+    UserProblemStat,
+)
+from application.aggregation import aggregate_problems_statistics
+from application.database import get_contest_dates
+from application.helpers.contests import (
+    get_contest_statistics,
+    get_stored_contest_statistics,
+)
+from application.helpers.problems import get_stored_problems_statistics
+from application.utils.common import (
+    row_to_dict,
+    get_all_rows_as_dict,
+    get_stale_periods,
+    iterate_rows_by_handle,
 )
-from application.helpers.contests import get_contest_statistics
-from application.helpers.problems import get_problems_statistics
-from application.utils.common import row_to_dict, get_all_rows_as_dict
 
 
 users_routes = Blueprint("users_routes", __name__)
 
 
+def get_statistics_stale_periods():
+    """
+    Returns the set of periods whose stored statistics are outdated, i.e. that started
+    after the statistics were computed (see get_stale_periods).
+    """
+
+    statistics_time = Metadata.query.get("statistics_time")
+
+    # If the statistics were never computed, no statistics are stored.
+    if statistics_time is None:
+        return set()
+
+    return get_stale_periods(datetime.fromisoformat(statistics_time.value))
+
+
 """
 User information.
 """
 
 
 @users_routes.route("/", methods=["GET"])
+@cached_response()
 def get_all_users_information():
     """
     Returns information of all users in the organization.
@@ -53,6 +81,7 @@ def get_all_users_information():
 
 
 @users_routes.route("/<handle>", methods=["GET"])
+@cached_response()
 def get_user_information(handle: str):
     """
     Returns information of a specific user in the organization.
@@ -94,25 +123,29 @@ User contest participation statistics.
 
 
 @users_routes.route("/contests-participated", methods=["GET"])
+@cached_response()
 def get_all_users_contests_participated():
     """
     Returns statistics of contests given by all users in the organization.
     """
 
     users = get_all_rows_as_dict(User.query.all())
-    contests = get_all_rows_as_dict(Contest.query.all())
 
-    contest_statistics = {}
+    stale_periods = get_statistics_stale_periods()
 
-    for user in users:
-        # Finding the contests participated by the user.
-        contests_participated = get_all_rows_as_dict(
-            ContestParticipant.query.filter_by(handle=user["handle"]).all()
-        )
+    # Users without statistics (eg. added since the last update) get empty statistics.
+    contest_statistics = {
+        user["handle"]: get_stored_contest_statistics([], stale_periods)
+        for user in users
+    }
 
-        contest_statistics[user["handle"]] = get_contest_statistics(
-            contests, contests_participated
-        )
+    # The statistics are computed during the updates (see application/database.py), and
+    # are read in a single query.
+    for handle, contest_stats in iterate_rows_by_handle(UserContestStat.query):
+        if handle in contest_statistics:
+            contest_statistics[handle] = get_stored_contest_statistics(
+                contest_stats, stale_periods
+            )
 
     last_update_time = Metadata.query.get("last_update_time")
 
@@ -135,6 +168,7 @@ def get_all_users_contests_participated():
 
 
 @users_routes.route("/<handle>/contests-participated", methods=["GET"])
+@cached_response()
 def get_user_contests_participated(handle: str):
     """
     Returns statistics of contests given by a specific user.
@@ -150,7 +184,7 @@ def get_user_contests_participated(handle: str):
     else:
         user = row_to_dict(user)
 
-    contests = get_all_rows_as_dict(Contest.query.all())
+    contest_dates = get_contest_dates()
 
     # Obtaining contest participation statistics for the user from the database.
     contests_participated = get_all_rows_as_dict(
@@ -159,7 +193,7 @@ def get_user_contests_participated(handle: str):
 
     # For single users, we do require the rating history.
     contest_statistics = get_contest_statistics(
-        contests, contests_participated, rating_history=True
+        contest_dates, contests_participated, rating_history=True
     )
 
     last_update_time = Metadata.query.get("last_update_time")
@@ -188,6 +222,7 @@ User problem solved statistics.
 
 
 @users_routes.route("/problems-solved", methods=["GET"])
+@cached_response()
 def get_all_users_problems_solved():
     """
     Returns statistics of problems solved and submissions made by all users in the organization.
@@ -195,15 +230,21 @@ def get_all_users_problems_solved():
 
     users = get_all_rows_as_dict(User.query.all())
 
-    problem_statistics = {}
+    stale_periods = get_statistics_stale_periods()
 
-    for user in users:
-        # Finding the problems solved by the user.
-        problems_solved = get_all_rows_as_dict(
-            ProblemSolved.query.filter_by(handle=user["handle"]).all()
-        )
+    # Users without statistics (eg. added since the last update) get empty statistics.
+    problem_statistics = {
+        user["handle"]: get_stored_problems_statistics([], stale_periods)
+        for user in users
+    }
 
-        problem_statistics[user["handle"]] = get_problems_statistics(problems_solved)
+    # The statistics are computed during the updates (see application/database.py), and
+    # are read in a single query.
+    for handle, problem_stats in iterate_rows_by_handle(UserProblemStat.query):
+        if handle in problem_statistics:
+            problem_statistics[handle] = get_stored_problems_statistics(
+                problem_stats, stale_periods
+            )
 
     last_update_time = Metadata.query.get("last_update_time")
 
@@ -226,6 +267,7 @@ def get_all_users_problems_solved():
 
 
 @users_routes.route("/<handle>/problems-solved", methods=["GET"])
+@cached_response()
 def get_user_problems_solved(handle: str):
     """
     Returns statistics of problems solved and submissions made by a specific user.
@@ -241,13 +283,12 @@ def get_user_problems_solved(handle: str):
     else:
         user = row_to_dict(user)
 
-    # Obtaining problems solved by the user from the database.
-    problems_solved = get_all_rows_as_dict(
-        ProblemSolved.query.filter_by(handle=handle).all()
+    # Aggregating the problems solved by the user in the database. Users without problems
+    # solved are not returned by the aggregation.
+    problem_statistics = aggregate_problems_statistics(handle).get(
+        handle, get_stored_problems_statistics([], set())
     )
 
-    problem_statistics = get_problems_statistics(problems_solved)
-
     last_update_time = Metadata.query.get("last_update_time")
 
     # If the database was not updated, last_update_time will not be set in the database.
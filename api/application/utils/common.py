@@ -2,25 +2,30 @@
 Contains common utility functions required for the application.
 """
 
-from datetime import date, datetime
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from hashlib import sha256
+from itertools import groupby
+from json import JSONDecoder, JSONDecodeError, dumps
+from operator import attrgetter
+from queue import Full, Queue
+from threading import Event
+from typing import Callable, Iterable
 
 from application.models.orm import db
+from application.utils.constants import QUERY_BATCH_SIZE, TAG_MASK_BITS
 
 
 def convert_timestamp_to_datetime(timestamp: int):
     """
-    Converts a timestamp to DateTime format.
+    Converts a timestamp (in seconds since the epoch) to a datetime object.
 
     Arguments:
     * timestamp - Timestamp to convert.
     """
 
-    result_date = date.fromtimestamp(timestamp)
-
-    if isinstance(result_date, date):
-        result_date = result_date.isoformat()
-
-    return result_date
+    return datetime.fromtimestamp(timestamp)
 
 
 def convert_datestring_to_datetime(datestring: str, dateformat: str = "%Y-%m-%d"):
@@ -49,6 +54,45 @@ def convert_datetime_to_datestring(
     return datetimeobject.strftime(dateformat)
 
 
+def get_period_ranges():
+    """
+    Returns a dictionary mapping the current statistics periods (other than all-time) to
+    tuples of (start, end) times, the end being excluded.
+
+    The periods are those of the helpers (see application/helpers): this month, this week
+    within this month, and today.
+    """
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=7)
+
+    return {
+        "this_month": (month_start, month_end),
+        "this_week": (max(month_start, week_start), min(month_end, week_end)),
+        "today": (today, today + timedelta(days=1)),
+    }
+
+
+def get_stale_periods(computed_time: datetime):
+    """
+    Returns the set of statistics periods that started after the given time. Statistics
+    computed at that time for these periods are outdated, and since no data stored at
+    that time belongs to these periods, their statistics are empty.
+
+    Arguments:
+    * computed_time - The time at which the statistics were computed.
+    """
+
+    return {
+        period
+        for period, (start, _) in get_period_ranges().items()
+        if start > computed_time
+    }
+
+
 def row_to_dict(row: db.Model):
     """
     Converts an SQLAlchemy row/object to a dictionary.
@@ -67,3 +111,203 @@ def get_all_rows_as_dict(rows: list[db.Model]):
     * rows - The list of SQLAlchemy rows/objects to convert.
     """
     return [row_to_dict(row) for row in rows]
+
+
+def iterate_rows_by_handle(query: db.Query):
+    """
+    Yields a tuple of (handle, list of rows as dictionaries) for each handle in the rows of
+    the given query, in a single pass over them. The rows are streamed from the database
+    (through a server-side cursor on PostgreSQL) in batches of QUERY_BATCH_SIZE, so that
+    only the rows of one user are held in memory at once.
+
+    Arguments:
+    * query - The query of a model with a "handle" column.
+    """
+
+    model = query.column_descriptions[0]["entity"]
+
+    for handle, rows in groupby(
+        query.order_by(model.handle).yield_per(QUERY_BATCH_SIZE),
+        key=attrgetter("handle"),
+    ):
+        yield handle, get_all_rows_as_dict(rows)
+
+
+def get_tag_mask(tag_ids: Iterable[int]):
+    """
+    Returns the bitmask of the given tag IDs, in which bit i is set if i is one of the IDs.
+    IDs that do not fit in the bitmask are left out.
+
+    Arguments:
+    * tag_ids - Iterable of tag IDs (see the Tag model).
+    """
+
+    mask = 0
+
+    for tag_id in tag_ids:
+        if tag_id < TAG_MASK_BITS:
+            mask |= 1 << tag_id
+
+    return mask
+
+
+def get_tag_ids(tag_mask: int):
+    """
+    Yields the tag IDs set in the given bitmask, from lowest to highest.
+
+    Arguments:
+    * tag_mask - Bitmask of tag IDs, as returned by get_tag_mask.
+    """
+
+    while tag_mask:
+        # Isolate the lowest set bit.
+        lowest_bit = tag_mask & -tag_mask
+        yield lowest_bit.bit_length() - 1
+        tag_mask ^= lowest_bit
+
+
+def compute_digest(data: object):
+    """
+    Returns a stable SHA-256 digest (as a hexadecimal string) of JSON-serializable data.
+    Dictionary key order does not affect the digest.
+
+    Arguments:
+    * data - The data to compute the digest of.
+    """
+
+    serialized = dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return sha256(serialized.encode()).hexdigest()
+
+
+def iterate_json_array(chunks: Iterable[str], key: str):
+    """
+    Incrementally parses a JSON object received in chunks and yields the items of the
+    array stored under the given key one by one. Only the item being parsed and the
+    current chunk are held in memory, instead of the whole document.
+
+    Arguments:
+    * chunks - Iterable of consecutive pieces of the JSON document.
+    * key - The key of the array within the top-level object, eg. "result".
+    """
+
+    decoder = JSONDecoder()
+    array_start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    whitespace = " \t\n\r"
+
+    chunks = iter(chunks)
+    buffer = ""
+
+    def read_chunk():
+        """
+        Appends the next chunk to the buffer. Returns False if there are no more chunks.
+        """
+
+        nonlocal buffer
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+
+        buffer += chunk
+        return True
+
+    # Find the start of the array.
+    while True:
+        match = array_start.search(buffer)
+        if match is not None:
+            position = match.end()
+            break
+
+        if not read_chunk():
+            raise ValueError(f'Key "{key}" with an array value not found.')
+
+    while True:
+        # Skip the separators between items.
+        while position < len(buffer) and buffer[position] in whitespace + ",":
+            position += 1
+
+        if position == len(buffer):
+            buffer, position = "", 0
+            if not read_chunk():
+                raise ValueError("Unexpected end of JSON document.")
+            continue
+
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except JSONDecodeError:
+            end = None
+
+        # In a valid document, every item is followed by a separator. If it is not, the
+        # item was cut at the end of the buffer (eg. "2." of "2.5"), so we only accept it
+        # once more data has arrived.
+        if end is None or end == len(buffer) or buffer[end] not in whitespace + ",]":
+            # Drop the items that were already parsed before reading more data.
+            buffer, position = buffer[position:], 0
+            if not read_chunk():
+                raise ValueError("Unexpected end of JSON document.")
+            continue
+
+        yield item
+        position = end
+
+
+def iterate_concurrently(
+    function: Callable, arguments: Iterable, max_workers: int, max_pending: int
+):
+    """
+    Calls the function with each of the arguments in a thread pool and yields tuples of
+    (argument, result) in the order the calls complete. At most max_pending results that
+    have not been consumed yet are held in memory; the worker threads wait for the consumer
+    once the limit is reached. If a call raises an exception, it is raised to the consumer
+    and the remaining calls are cancelled.
+
+    Arguments:
+    * function - The function to call with each argument.
+    * arguments - Iterable of the arguments.
+    * max_workers - The number of worker threads.
+    * max_pending - The maximum number of results waiting to be consumed.
+    """
+
+    arguments = list(arguments)
+    results = Queue(maxsize=max_pending)
+    stopped = Event()
+
+    def work(argument):
+        """
+        Calls the function with the argument and puts the outcome in the results queue.
+        """
+
+        if stopped.is_set():
+            return
+
+        try:
+            outcome = (argument, function(argument), None)
+        except Exception as e:
+            outcome = (argument, None, e)
+
+        # Wait for space in the queue, unless the consumer has stopped consuming.
+        while not stopped.is_set():
+            try:
+                results.put(outcome, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        for argument in arguments:
+            executor.submit(work, argument)
+
+        for _ in arguments:
+            argument, result, error = results.get()
+            if error is not None:
+                raise error
+
+            yield argument, result
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -19,8 +19,110 @@ Application-specific constants.
 """
 
 
+# Maximum number of requests per second allowed by the Codeforces API. Enforced for
+# the whole process by the shared client (see application/codeforces/client.py).
+API_REQUESTS_PER_SECOND = 5
+
+# Timeout in seconds for connecting to and receiving data from the Codeforces API.
+API_REQUEST_TIMEOUT = 30
+
+# Size in bytes of the pieces in which large responses (eg. user.ratedList) are received
+# and parsed, so that they never have to be held in memory as a whole.
+API_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Minimum number of seconds between two removals of the expired responses from the
+# on-disk cache of Codeforces API responses (see application/codeforces/cache.py).
+API_CACHE_CLEANUP_INTERVAL = 600
+
+# Maximum number of attempts for a request to the Codeforces API before giving up.
+API_MAX_ATTEMPTS = 5
+
+# Delays in seconds used for the exponential backoff between attempts. The delay before
+# the n-th retry is chosen randomly between 0 and min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * 2^(n - 1)).
+API_RETRY_BASE_DELAY = 1
+API_RETRY_MAX_DELAY = 30
+
+# Number of consecutive failed requests after which the circuit breaker opens and all
+# requests to the Codeforces API fail immediately, and the time in seconds it stays open.
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 10
+CIRCUIT_BREAKER_COOLDOWN = 300
+
+# Maximum time in seconds the data retrieval of a single update may take.
+UPDATE_DEADLINE = 3600
+
 # Maximum number of worker threads for making requests to the Codeforces API.
 # Used in ThreadPoolExecutor (see application/codeforces/organization.py).
-# Affects the speed of the periodic database updates. Do not increase above 5
-# as the Codeforces API allows only <= 5 requests per second.
-MAX_WORKER_THREADS = 3
+# Affects the speed of the periodic database updates. Since all requests go through
+# the rate-limited client, more threads than API_REQUESTS_PER_SECOND do not speed
+# up the updates any further.
+MAX_WORKER_THREADS = 5
+
+# Maximum number of per-user (or per-contest) results retrieved from the Codeforces API
+# that may wait to be written to the staging tables during an update. Bounds the memory
+# used by an update, since the worker threads pause once it is reached.
+PIPELINE_QUEUE_SIZE = 20
+
+
+# Number of submissions requested per page from user.status during incremental updates.
+# Since only a handful of new submissions are usually made between two updates, the
+# first page is almost always enough (see application/codeforces/users.py).
+SUBMISSIONS_PAGE_SIZE = 100
+
+# Number of handles requested per user.info call when refreshing the users' ratings
+# (see application/codeforces/organization.py). Limited by the length of the URL.
+USER_INFO_BATCH_SIZE = 200
+
+# Number of days after a contest during which its rating changes are fetched again on
+# every update, since ratings are only updated some time after a contest has finished
+# (see application/codeforces/contests.py).
+RATING_CHANGES_LOOKBACK_DAYS = 3
+
+# Representation of NULL values in the CSV data loaded with PostgreSQL's COPY (see
+# application/database.py). Differs from the empty string, which is a valid value.
+COPY_NULL = "\\N"
+
+# Minimum number of rows a staging table must have, relative to the number of rows of
+# its application table, to be swapped into its place (see application/database.py).
+# Guards against replacing the stored data with incomplete data.
+SWAP_MIN_ROW_RATIO = 0.5
+
+# Number of bits of the bitmask in which the tags of a problem solved are stored (see
+# application/models/models.py). The bitmask is stored as a signed 64-bit integer, and
+# Codeforces currently uses about 40 tags.
+TAG_MASK_BITS = 63
+
+# Year of the first yearly partition of the partitioned tables (see
+# application/partitioning.py). Codeforces was launched in 2010, and older rows are
+# stored in the default partition.
+PARTITIONS_START_YEAR = 2010
+
+# Periods of the users' statistics (see application/helpers).
+STATISTICS_PERIODS = ["all_time", "this_month", "this_week", "today"]
+
+# Number of rows fetched from the database at once when the rows of all users are read
+# (see iterate_rows_by_handle in application/utils/common.py).
+QUERY_BATCH_SIZE = 1000
+
+# Maximum number of responses kept in memory by each process (see
+# application/response_cache.py).
+RESPONSE_CACHE_SIZE = 256
+
+# Maximum number of responses cached on disk, shared by all processes (see
+# application/response_cache.py).
+RESPONSE_DISK_CACHE_SIZE = 1024
+
+# Number of seconds for which each process reuses the data generation it last read, rather
+# than reading it again for every request (see application/response_cache.py).
+RESPONSE_DATA_VERSION_TTL = 5
+
+# Response bodies smaller than this (in bytes) are not compressed (see
+# application/response_cache.py). Compressed responses are produced once per data
+# generation, so the compression levels favour size over speed.
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+RESPONSE_GZIP_LEVEL = 9
+RESPONSE_BROTLI_QUALITY = 9
+
+# Number of rows in a page of the paginated routes when no limit is requested, and the
+# maximum limit (see application/utils/pagination.py).
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
@@ -0,0 +1,160 @@
+"""
+Contains the functions for the keyset (cursor) pagination of the routes listing the
+problems and the contests (see application/routes).
+
+The rows are ordered by columns identifying them (the keyset), eg. the contest ID and the
+index of the problems. A page is requested with the "limit" query parameter, and ends with
+a cursor encoding the keyset of its last row, which is passed as the "cursor" query
+parameter to request the next page. A page is read from an index on the keyset starting
+after the cursor, rather than by skipping the rows of the previous pages, so every page
+only reads its own rows. Requests without "limit" or "cursor" are not paginated.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Callable
+from flask import request
+
+from application.models.orm import db
+from application.utils.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+"""
+Query parameter-related functions.
+"""
+
+
+def get_argument(name: str, convert: Callable):
+    """
+    Returns the value of a query parameter of the current request converted with the
+    given function, or None if it is not given. Raises a ValueError if the value cannot
+    be converted.
+
+    Arguments:
+    * name - The name of the query parameter.
+    * convert - The function converting the value, eg. int.
+    """
+
+    value = request.args.get(name)
+    if value is None:
+        return None
+
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"Invalid value of {name}: {value}.")
+
+
+def get_page_arguments():
+    """
+    Returns a tuple of the limit and the cursor of the page requested by the current
+    request, or None if the request is not paginated. Raises a ValueError if the limit
+    is invalid.
+    """
+
+    limit = get_argument("limit", int)
+    cursor = request.args.get("cursor")
+
+    if limit is None and cursor is None:
+        return None
+
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    elif not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid value of limit: {limit}.")
+
+    return limit, cursor
+
+
+"""
+Cursor-related functions.
+"""
+
+
+def encode_cursor(values: list):
+    """
+    Returns the cursor encoding the keyset of a row.
+
+    Arguments:
+    * values - The values of the keyset columns of the row.
+    """
+
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value for value in values
+    ]
+
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: list[db.Column]):
+    """
+    Returns the values of the keyset columns encoded by a cursor (see encode_cursor).
+    Raises a ValueError if the cursor is invalid.
+
+    Arguments:
+    * cursor - The cursor.
+    * columns - The keyset columns.
+    """
+
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor.")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Invalid cursor.")
+
+    decoded_values = []
+
+    for value, column in zip(values, columns):
+        python_type = column.type.python_type
+
+        # Dates are encoded as ISO 8601 strings.
+        if python_type is datetime and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError("Invalid cursor.")
+
+        if not isinstance(value, python_type):
+            raise ValueError("Invalid cursor.")
+
+        decoded_values.append(value)
+
+    return decoded_values
+
+
+"""
+General pagination-related functions.
+"""
+
+
+def get_page(query: db.Query, columns: list[db.Column], limit: int, cursor: str = None):
+    """
+    Returns a tuple of the rows of a page of the query, ordered by the keyset columns, and
+    the cursor of the next page (None if this page is the last one). Raises a ValueError
+    if the cursor is invalid.
+
+    Arguments:
+    * query - The query of the rows.
+    * columns - The keyset columns, which identify the rows.
+    * limit - The maximum number of rows in the page.
+    * cursor - The cursor of the page, returned with the previous page. If None, the first
+    page is returned.
+    """
+
+    if cursor is not None:
+        query = query.filter(
+            db.tuple_(*columns) > db.tuple_(*decode_cursor(cursor, columns))
+        )
+
+    # One more row is read to know whether there is a next page.
+    rows = query.order_by(*columns).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+
+    return rows, encode_cursor([getattr(rows[-1], column.key) for column in columns])
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark comparing the JSON encoders of the API responses (see
+application/utils/json_encoder.py) on payloads shaped like the largest responses: the
+problems catalog, the contests, and the problems statistics of every user.
+
+To run the benchmark, run `python -m benchmarks.json_encoding` from the api directory.
+"""
+
+import json
+from datetime import datetime, timedelta
+from random import Random
+from timeit import repeat
+
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+from application.utils.json_encoder import JSONEncoder, orjson
+
+
+# Number of times each payload is encoded per measurement, and number of measurements.
+NUMBER = 5
+REPEAT = 5
+
+
+def get_payloads():
+    """
+    Returns a dictionary mapping the names of the payloads to the payloads, built from
+    random data of realistic sizes.
+    """
+
+    random = Random(0)
+    tags = [f"tag {i}" for i in range(40)]
+
+    problems = [
+        {
+            "contest_id": contest_id,
+            "index": index,
+            "name": f"Problem {contest_id}{index}",
+            "rating": random.randrange(800, 3600, 100),
+            "tags": ";".join(random.sample(tags, 3)),
+        }
+        for contest_id in range(1, 1501)
+        for index in "ABCDEF"
+    ]
+
+    contests = [
+        {
+            "contest_id": contest_id,
+            "name": f"Codeforces Round #{contest_id} (Div. 2)",
+            "date": datetime(2010, 1, 1) + timedelta(days=2 * contest_id),
+            "duration": 7200,
+        }
+        for contest_id in range(1, 1801)
+    ]
+
+    def get_statistics():
+        return {
+            "total_problems": random.randrange(1000),
+            "tags": {tag: random.randrange(100) for tag in random.sample(tags, 30)},
+            "indexes": {index: random.randrange(100) for index in "ABCDEFG"},
+            "ratings": {
+                rating: random.randrange(100) for rating in range(800, 3600, 100)
+            },
+            "languages": {f"language {i}": random.randrange(100) for i in range(5)},
+        }
+
+    problem_statistics = {
+        f"user_{i}": {
+            period: get_statistics()
+            for period in ["all_time", "this_month", "this_week", "today"]
+        }
+        for i in range(300)
+    }
+
+    return {
+        "problems": {"last_update_time": "NONE", "problems": problems},
+        "contests": {"last_update_time": "NONE", "contests": contests},
+        "problem_statistics": {
+            "last_update_time": "NONE",
+            "problem_statistics": problem_statistics,
+        },
+    }
+
+
+def encode(payload: dict, encoder: type):
+    """
+    Encodes a payload the way jsonify does outside of debug mode.
+
+    Arguments:
+    * payload - The payload to encode.
+    * encoder - The JSON encoder class.
+    """
+
+    return json.dumps(payload, cls=encoder, separators=(",", ":"), sort_keys=True)
+
+
+def main():
+    if orjson is None:
+        print("orjson is not installed, both encoders use the json module.")
+
+    for name, payload in get_payloads().items():
+        # Both encoders output the same bytes.
+        assert encode(payload, FlaskJSONEncoder) == encode(payload, JSONEncoder)
+
+        times = {
+            encoder.__module__: min(
+                repeat(lambda: encode(payload, encoder), number=NUMBER, repeat=REPEAT)
+            )
+            / NUMBER
+            for encoder in (FlaskJSONEncoder, JSONEncoder)
+        }
+        json_time, fast_time = times.values()
+
+        print(
+            f"{name}: {len(encode(payload, FlaskJSONEncoder)) / 1024:.0f} KiB, "
+            f"json {json_time * 1000:.1f} ms, "
+            f"{'orjson' if orjson else 'json'} {fast_time * 1000:.1f} ms "
+            f"({json_time / fast_time:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
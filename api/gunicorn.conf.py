@@ -20,7 +20,7 @@ preload_app = True
 
 def post_fork(server, worker):
     """
-    Initializes the database and creates the tables.
+    Initializes the database.
     """
 
     # If we use preload_app, the worker processes end up sharing the same database
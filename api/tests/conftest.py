@@ -4,7 +4,7 @@ Contains the necessary fixtures for pytest tests.
 
 import pytest
 
-from application import create_app
+from application import create_app, response_cache
 from application.models.orm import db
 from application.models.models import Metadata
 
@@ -34,11 +34,15 @@ def env_setup(monkeypatch):
 
 
 @pytest.fixture
-def app(env_setup):
+def app(env_setup, monkeypatch):
     """
     Creates the application and configures it in testing mode.
     """
 
+    # The data generation is read for every request, so that the data changed by a test
+    # is served immediately.
+    monkeypatch.setattr(response_cache, "RESPONSE_DATA_VERSION_TTL", 0)
+
     app = create_app("application.config.TestingConfig")
 
     # We add dummy metadata to the database as part of the initial setup. This
@@ -0,0 +1,119 @@
+"""
+Contains the testing functions for the aggregation of the problem statistics. Tests for the
+aggregation ensure:
+* The statistics aggregated in the database are the same as those computed in Python.
+* The queries of the recent periods only select the problems solved in these periods.
+
+To test this suite only, run `pytest -v tests/test_aggregation.py`.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from application.aggregation import aggregate_problems_statistics
+from application.helpers.problems import get_problems_statistics
+from application.models.orm import db
+from application.models.models import Language, ProblemSolved, Tag
+from application.utils.common import get_all_rows_as_dict
+
+
+@pytest.mark.usefixtures("app")
+class TestAggregation:
+    """
+    Tests for the aggregation of the problem statistics.
+    """
+
+    def test_aggregation(self, app):
+        """
+        * GIVEN problems solved by several users, at different times, with and without
+        ratings and tags
+        * WHEN the problems statistics are aggregated in the database
+        * THEN they are the same as the statistics computed from the problems solved
+        """
+
+        now = datetime.now()
+        problems_solved = [
+            ("user_1", "A", 800, 0b101, 0, now),
+            ("user_1", "A1", 0, 0b1, 1, now - timedelta(days=1)),
+            ("user_1", "B", 1200, 0, 0, now - timedelta(days=40)),
+            ("user_1", "C", 800, 0b110, 1, datetime(2020, 1, 1)),
+            ("user_2", "D", 1500, 0b1, 0, now),
+        ]
+
+        with app.app_context():
+            for tag_id in range(3):
+                db.session.add(Tag(id=tag_id, name=f"tag{tag_id}"))
+            db.session.add(Language(id=0, name="language0"))
+            db.session.add(Language(id=1, name="language1"))
+            for contest_id, (
+                handle,
+                index,
+                rating,
+                tag_mask,
+                language_id,
+                time,
+            ) in enumerate(problems_solved):
+                db.session.add(
+                    ProblemSolved(
+                        handle=handle,
+                        contest_id=contest_id,
+                        index=index,
+                        rating=rating,
+                        tag_mask=tag_mask,
+                        language_id=language_id,
+                        solved_time=time,
+                    )
+                )
+            db.session.commit()
+
+            tag_names = {tag.id: tag.name for tag in Tag.query}
+            language_names = {language.id: language.name for language in Language.query}
+
+            statistics = aggregate_problems_statistics()
+
+            assert set(statistics) == {"user_1", "user_2"}
+            for handle in statistics:
+                expected = get_problems_statistics(
+                    get_all_rows_as_dict(ProblemSolved.query.filter_by(handle=handle)),
+                    tag_names,
+                    language_names,
+                )
+                assert statistics[handle] == expected
+
+            assert aggregate_problems_statistics("user_2") == {
+                "user_2": statistics["user_2"]
+            }
+
+    def test_period_queries(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN the problems statistics are aggregated in the database
+        * THEN the queries of the recent periods filter on the time the problems were
+        solved, so that they only read the recent problems solved (or partitions)
+        """
+
+        statements = []
+
+        def record_statement(connection, cursor, statement, *args):
+            statements.append(statement)
+
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", record_statement)
+            try:
+                aggregate_problems_statistics()
+            finally:
+                event.remove(db.engine, "before_cursor_execute", record_statement)
+
+        where_clauses = [
+            statement.split("WHERE", 1)[1] if "WHERE" in statement else ""
+            for statement in statements
+        ]
+        period_clauses = [
+            clause
+            for clause in where_clauses
+            if "problem_solved.solved_time >=" in clause
+        ]
+
+        # One query per statistic (total and four dimensions) for each recent period.
+        assert len(period_clauses) == 5 * 3
@@ -0,0 +1,621 @@
+"""
+Contains the testing functions for the Codeforces API fetchers. Requests to the Codeforces
+API are replaced by canned responses, so these tests do not require network access.
+
+To test this suite only, run `pytest -v tests/test_codeforces.py`.
+"""
+
+import json
+from datetime import datetime
+import pytest
+import requests
+from os import listdir, path, utime
+from threading import Lock
+from time import monotonic, sleep
+
+from application.codeforces import cache, client, users
+from application.codeforces.contests import get_contest_participants
+from application.codeforces.organization import (
+    get_organization_users_information,
+    get_users_information_batch,
+)
+from application.utils.common import iterate_concurrently
+from application.utils.constants import SUBMISSIONS_PAGE_SIZE
+
+
+def make_response(status_code: int, body: dict = None):
+    """
+    Returns a response of the Codeforces API.
+
+    Arguments:
+    * status_code - The HTTP status code of the response.
+    * body - The JSON body of the response.
+    """
+
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode()
+    response._content_consumed = True
+
+    return response
+
+
+@pytest.fixture
+def api_responses(monkeypatch):
+    """
+    Replaces the requests sent by the client with the responses appended to the returned
+    list, in order. Backoff delays and rate limiting are disabled.
+    """
+
+    responses = []
+
+    monkeypatch.setattr(client.session, "get", lambda *args, **kwargs: responses.pop(0))
+    monkeypatch.setattr(client, "sleep", lambda seconds: None)
+    monkeypatch.setattr(client, "rate_limiter", client.TokenBucket(rate=10**6))
+    client.start_update()
+
+    yield responses
+
+    client.finish_update()
+
+
+def make_submission(submission_id: int, contest_id: int, index: str):
+    """
+    Returns an accepted submission as returned by user.status.
+
+    Arguments:
+    * submission_id - The ID of the submission.
+    * contest_id - The contest ID of the problem.
+    * index - The index of the problem in the contest.
+    """
+
+    return {
+        "id": submission_id,
+        "creationTimeSeconds": 1577836800 + submission_id,
+        "problem": {"contestId": contest_id, "index": index, "tags": []},
+        "programmingLanguage": "test_language",
+        "verdict": "OK",
+    }
+
+
+class TestUserProblems:
+    """
+    Tests for fetching a user's solved problems.
+    """
+
+    def test_incremental_fetch(self, monkeypatch):
+        """
+        * GIVEN a user with more submissions than fit in a page
+        * WHEN the user's problems are fetched with a watermark
+        * THEN pages are requested only until the watermark is reached
+        """
+
+        # Submissions from newest to oldest, as returned by user.status.
+        all_submissions = [
+            make_submission(submission_id, 1, f"P{submission_id}")
+            for submission_id in range(2 * SUBMISSIONS_PAGE_SIZE + 50, 0, -1)
+        ]
+        requested_pages = []
+
+        def get_user_submissions(handle, start=None, count=None):
+            requested_pages.append(start)
+            return all_submissions[start - 1 : start - 1 + count]
+
+        monkeypatch.setattr(users, "get_user_submissions", get_user_submissions)
+
+        watermark = SUBMISSIONS_PAGE_SIZE + 10
+        problems, newest_submission_id = users.get_user_problems("test_user", watermark)
+
+        assert requested_pages == [1, SUBMISSIONS_PAGE_SIZE + 1]
+        assert newest_submission_id == all_submissions[0]["id"]
+        assert len(problems) == len(all_submissions) - watermark
+
+    def test_incremental_fetch_without_new_submissions(self, monkeypatch):
+        """
+        * GIVEN a user without new submissions
+        * WHEN the user's problems are fetched with a watermark
+        * THEN no problems are returned and the watermark is unchanged
+        """
+
+        monkeypatch.setattr(
+            users,
+            "get_user_submissions",
+            lambda handle, start=None, count=None: [make_submission(5, 1, "A")],
+        )
+
+        problems, newest_submission_id = users.get_user_problems("test_user", 5)
+
+        assert problems == []
+        assert newest_submission_id == 5
+
+    def test_incremental_fetch_with_pending_submissions(self, monkeypatch):
+        """
+        * GIVEN a user with a submission still being judged, newer than an accepted one
+        * WHEN the user's problems are fetched again once it is accepted
+        * THEN the watermark is kept below the pending submission, and the problem it
+        solves is returned by the next fetch
+        """
+
+        pending_submission = make_submission(11, 1, "B")
+        del pending_submission["verdict"]
+        submissions = [pending_submission, make_submission(10, 1, "A")]
+
+        def get_user_submissions(handle, start=None, count=None):
+            return submissions
+
+        monkeypatch.setattr(users, "get_user_submissions", get_user_submissions)
+
+        problems, newest_submission_id = users.get_user_problems("test_user", 9)
+
+        assert [problem.index for problem in problems] == ["A"]
+        assert newest_submission_id == 10
+
+        # The submission is judged, and fetched again since it is above the watermark.
+        submissions = [make_submission(11, 1, "B"), make_submission(10, 1, "A")]
+
+        problems, newest_submission_id = users.get_user_problems(
+            "test_user", newest_submission_id
+        )
+
+        assert [problem.index for problem in problems] == ["B"]
+        assert newest_submission_id == 11
+
+
+class TestOrganizationUsers:
+    """
+    Tests for fetching the organization's users.
+    """
+
+    def test_streamed_rated_list(self, api_responses, monkeypatch):
+        """
+        * GIVEN a rated list received in small chunks
+        * WHEN the organization's users are fetched
+        * THEN only the users of the organization are returned
+        """
+
+        monkeypatch.setenv("ORGANIZATION_NAME", "Test Organization")
+        monkeypatch.setattr(client, "API_STREAM_CHUNK_SIZE", 7)
+
+        rated_list = [
+            {
+                "handle": f"user_{index}",
+                "registrationTimeSeconds": 1577836800,
+                "rating": 1000 + index,
+                "maxRating": 2000,
+                "rank": "test_rank",
+                "organization": organization,
+            }
+            for index, organization in enumerate(
+                ["Test Organization", "Other Organization", "Test Organization"]
+            )
+        ]
+        # Users without an organization do not have the "organization" key.
+        del rated_list[1]["organization"]
+
+        api_responses.append(make_response(200, {"status": "OK", "result": rated_list}))
+
+        users_information = get_organization_users_information()
+
+        assert [user.handle for user in users_information] == ["user_0", "user_2"]
+        assert users_information[1].rating == 1002
+        assert client.statistics.summary()["bytes"] > 0
+
+    def test_batch_with_unknown_handle(self, api_responses):
+        """
+        * GIVEN a batch of handles, one of which does not exist
+        * WHEN the users' information is fetched
+        * THEN the batch is split and the information of the other users is returned
+        """
+
+        def make_user(handle):
+            return {"handle": handle, "registrationTimeSeconds": 1577836800}
+
+        rejected = make_response(400, {"status": "FAILED", "comment": "not found"})
+        api_responses.extend(
+            [
+                # user_1;user_2;unknown
+                rejected,
+                # user_1
+                make_response(200, {"status": "OK", "result": [make_user("user_1")]}),
+                # user_2;unknown
+                rejected,
+                # user_2
+                make_response(200, {"status": "OK", "result": [make_user("user_2")]}),
+                # unknown
+                rejected,
+            ]
+        )
+
+        users_information = get_users_information_batch(["user_1", "user_2", "unknown"])
+
+        assert [user["handle"] for user in users_information] == ["user_1", "user_2"]
+        assert api_responses == []
+
+
+class TestContestParticipants:
+    """
+    Tests for fetching the participants of a contest.
+    """
+
+    def test_rating_changes(self, api_responses):
+        """
+        * GIVEN the rating changes of a contest
+        * WHEN the participants of the contest are fetched
+        * THEN only the given users are returned, with the exact rating update time
+        """
+
+        rating_changes = [
+            {
+                "contestId": 1,
+                "handle": handle,
+                "rank": rank,
+                "ratingUpdateTimeSeconds": 1577836800 + 3600,
+                "oldRating": 1500,
+                "newRating": 1600,
+            }
+            for rank, handle in enumerate(["user_1", "other_user", "user_2"], 1)
+        ]
+        api_responses.append(
+            make_response(200, {"status": "OK", "result": rating_changes})
+        )
+
+        contest_participants = get_contest_participants(1, {"user_1", "user_2"})
+
+        assert [
+            (participant.handle, participant.rank)
+            for participant in contest_participants
+        ] == [("user_1", 1), ("user_2", 3)]
+        assert contest_participants[0].rating_update_time == datetime.fromtimestamp(
+            1577836800 + 3600
+        )
+
+    def test_unrated_contest(self, api_responses):
+        """
+        * GIVEN an unrated contest
+        * WHEN the participants of the contest are fetched
+        * THEN no participants are returned
+        """
+
+        api_responses.append(
+            make_response(
+                400,
+                {
+                    "status": "FAILED",
+                    "comment": "contestId: Rating changes are unavailable for this contest",
+                },
+            )
+        )
+
+        assert get_contest_participants(1, {"user_1"}) == []
+
+
+class TestPipeline:
+    """
+    Tests for the concurrent retrieval of per-user results.
+    """
+
+    def test_bounded_results(self):
+        """
+        * GIVEN a function called concurrently for many arguments
+        * WHEN the results are consumed slowly
+        * THEN every result is yielded once, and the workers stop producing results once
+        the maximum number of pending results is reached
+        """
+
+        lock = Lock()
+        started = []
+
+        def function(argument):
+            with lock:
+                started.append(argument)
+            return argument * 2
+
+        results = iterate_concurrently(function, range(100), 2, 3)
+        first_argument, first_result = next(results)
+
+        # Give the workers time to fill the queue.
+        sleep(0.2)
+
+        # 3 results in the queue, 2 waiting to be put in it and the consumed one.
+        assert first_result == first_argument * 2
+        assert len(started) <= 6
+
+        remaining = dict(results)
+        assert len(remaining) == 99
+        assert all(result == argument * 2 for argument, result in remaining.items())
+
+    def test_error_propagation(self):
+        """
+        * GIVEN a function called concurrently that fails for one of the arguments
+        * WHEN the results are consumed
+        * THEN the error is raised to the consumer
+        """
+
+        def function(argument):
+            if argument == 5:
+                raise ValueError("Invalid argument.")
+            return argument
+
+        with pytest.raises(ValueError):
+            list(iterate_concurrently(function, range(10), 2, 3))
+
+
+class TestClient:
+    """
+    Tests for the shared Codeforces API client.
+    """
+
+    def test_token_bucket_rate(self):
+        """
+        * GIVEN a token bucket
+        * WHEN more tokens than its capacity are acquired
+        * THEN acquiring blocks so that the configured rate is not exceeded
+        """
+
+        bucket = client.TokenBucket(rate=50)
+
+        start_time = monotonic()
+        for _ in range(11):
+            bucket.acquire()
+
+        # The first token is available immediately, the next 10 take 1/50 s each.
+        assert monotonic() - start_time >= 0.19
+
+    def test_request_statistics(self):
+        """
+        * GIVEN request statistics
+        * WHEN requests are recorded
+        * THEN the calls, bytes and latencies are counted
+        """
+
+        statistics = client.RequestStatistics()
+        statistics.record(100, 0.5)
+        statistics.record(300, 1.5)
+
+        assert statistics.summary() == {
+            "calls": 2,
+            "cache_hits": 0,
+            "bytes": 400,
+            "average_latency": 1.0,
+            "max_latency": 1.5,
+        }
+
+    def test_retry_until_success(self, api_responses):
+        """
+        * GIVEN a Codeforces API that fails temporarily
+        * WHEN a method is called
+        * THEN the request is retried until it succeeds
+        """
+
+        api_responses.extend(
+            [
+                make_response(503),
+                make_response(502),
+                make_response(200, {"status": "OK", "result": [1, 2, 3]}),
+            ]
+        )
+
+        assert client.call("contest.list") == [1, 2, 3]
+        assert client.statistics.summary()["calls"] == 3
+
+    def test_retry_on_invalid_body(self, api_responses):
+        """
+        * GIVEN a Codeforces API returning a successful response whose body is not JSON
+        * WHEN a method is called
+        * THEN the request is retried like a server error
+        """
+
+        invalid_response = make_response(200)
+        invalid_response._content = (
+            b"<html>Codeforces is temporarily unavailable</html>"
+        )
+
+        api_responses.extend(
+            [
+                invalid_response,
+                make_response(200, {"status": "OK", "result": [1, 2, 3]}),
+            ]
+        )
+
+        assert client.call("contest.list") == [1, 2, 3]
+        assert client.statistics.summary()["calls"] == 2
+
+    def test_backoff_within_deadline(self):
+        """
+        * GIVEN a retry policy whose deadline is near
+        * WHEN the delay before the next attempt is computed
+        * THEN the delay does not extend past the deadline
+        """
+
+        retry_policy = client.RetryPolicy(max_attempts=5, base_delay=60, max_delay=60)
+        assert retry_policy.backoff(5) <= 60
+
+        retry_policy.set_deadline(1)
+        assert retry_policy.backoff(5) <= 1
+
+        retry_policy.set_deadline(0)
+        assert retry_policy.backoff(5) == 0
+
+    def test_retry_limit(self, api_responses):
+        """
+        * GIVEN a Codeforces API that keeps failing
+        * WHEN a method is called
+        * THEN the request is given up after the maximum number of attempts
+        """
+
+        api_responses.extend([make_response(503)] * client.retry_policy.max_attempts)
+
+        with pytest.raises(client.CodeforcesAPIError):
+            client.call("contest.list")
+
+        assert api_responses == []
+
+    def test_no_retry_on_client_error(self, api_responses):
+        """
+        * GIVEN a request the Codeforces API rejects (eg. a handle that does not exist)
+        * WHEN the method is called
+        * THEN the request is not retried
+        """
+
+        api_responses.extend(
+            [
+                make_response(
+                    400, {"status": "FAILED", "comment": "handle: not found"}
+                ),
+                make_response(200, {"status": "OK", "result": []}),
+            ]
+        )
+
+        with pytest.raises(client.CodeforcesAPIError):
+            client.call("user.rating", {"handle": "test_user"})
+
+        assert len(api_responses) == 1
+
+    def test_circuit_breaker(self, api_responses):
+        """
+        * GIVEN a Codeforces API that is down
+        * WHEN enough requests fail in a row
+        * THEN the circuit opens and further requests fail without being sent
+        """
+
+        failure_threshold = client.circuit_breaker.failure_threshold
+        api_responses.extend([make_response(503)] * failure_threshold)
+
+        # Every call fails after the maximum number of attempts, until the circuit opens.
+        with pytest.raises(client.CircuitOpenError):
+            while True:
+                try:
+                    client.call("contest.list")
+                except client.CircuitOpenError:
+                    raise
+                except client.CodeforcesAPIError:
+                    pass
+
+        assert client.statistics.summary()["calls"] == failure_threshold
+
+    def test_update_deadline(self, api_responses):
+        """
+        * GIVEN an update whose deadline has passed
+        * WHEN a method is called
+        * THEN the request fails without being sent
+        """
+
+        api_responses.append(make_response(200, {"status": "OK", "result": []}))
+        client.start_update(deadline=0)
+
+        with pytest.raises(client.UpdateDeadlineExceeded):
+            client.call("contest.list")
+
+        assert len(api_responses) == 1
+
+
+class TestCache:
+    """
+    Tests for the on-disk cache of Codeforces API responses.
+    """
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path, monkeypatch):
+        """
+        Enables the cache in a temporary directory.
+        """
+
+        monkeypatch.setenv("API_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("API_CACHE_TTL", "3600")
+
+        return tmp_path
+
+    def test_cached_call(self, api_responses, cache_dir):
+        """
+        * GIVEN an enabled cache
+        * WHEN the same method is called twice with the same parameters
+        * THEN the second response is served from the cache
+        """
+
+        api_responses.extend(
+            [
+                make_response(200, {"status": "OK", "result": [1]}),
+                make_response(200, {"status": "OK", "result": [2]}),
+            ]
+        )
+
+        assert client.call("user.rating", {"handle": "test_user"}) == [1]
+        assert client.call("user.rating", {"handle": "test_user"}) == [1]
+        assert client.call("user.rating", {"handle": "other_user"}) == [2]
+        assert client.statistics.summary()["cache_hits"] == 1
+
+    def test_cached_stream(self, api_responses, cache_dir):
+        """
+        * GIVEN an enabled cache
+        * WHEN the same streamed method is called twice
+        * THEN the second response is served from the cache
+        """
+
+        api_responses.append(make_response(200, {"status": "OK", "result": [1, 2]}))
+
+        assert list(client.stream("user.ratedList")) == [1, 2]
+        assert list(client.stream("user.ratedList")) == [1, 2]
+        assert client.statistics.summary()["cache_hits"] == 1
+
+    def test_expired_response(self, api_responses, cache_dir, monkeypatch):
+        """
+        * GIVEN an enabled cache whose responses expire immediately
+        * WHEN the same method is called twice
+        * THEN both responses are requested from the Codeforces API
+        """
+
+        monkeypatch.setenv("API_CACHE_TTL", "0")
+        api_responses.extend(
+            [
+                make_response(200, {"status": "OK", "result": [1]}),
+                make_response(200, {"status": "OK", "result": [2]}),
+            ]
+        )
+
+        assert client.call("contest.list") == [1]
+        assert client.call("contest.list") == [2]
+
+    def test_expired_responses_removed(self, api_responses, cache_dir, monkeypatch):
+        """
+        * GIVEN an enabled cache holding an expired response
+        * WHEN another response is written
+        * THEN the expired response is removed, and the written one is kept
+        """
+
+        api_responses.extend(
+            [
+                make_response(200, {"status": "OK", "result": [1]}),
+                make_response(200, {"status": "OK", "result": [2]}),
+            ]
+        )
+
+        client.call("contest.list")
+        expired_path = cache.get_cache_path("contest.list")
+        utime(expired_path, (0, 0))
+
+        # The previous write removed the expired responses already.
+        monkeypatch.setattr(cache, "last_cleanup_time", 0.0)
+        client.call("problemset.problems")
+
+        assert listdir(cache_dir) == [
+            path.basename(cache.get_cache_path("problemset.problems"))
+        ]
+
+    def test_replay(self, api_responses, cache_dir, monkeypatch):
+        """
+        * GIVEN a cache in replay mode
+        * WHEN methods are called
+        * THEN cached responses are served regardless of their age and uncached
+        responses are not requested from the Codeforces API
+        """
+
+        api_responses.append(make_response(200, {"status": "OK", "result": [1]}))
+        client.call("contest.list")
+
+        monkeypatch.setenv("API_CACHE_TTL", "0")
+        monkeypatch.setenv("API_CACHE_REPLAY", "true")
+
+        assert client.call("contest.list") == [1]
+
+        with pytest.raises(cache.CacheMissError):
+            client.call("problemset.problems")
@@ -0,0 +1,900 @@
+"""
+Contains the testing functions for the database update. Tests for the database update ensure:
+* Data retrieved from the Codeforces API is stored in the database correctly.
+* Incremental updates preserve previously stored data.
+
+To test this suite only, run `pytest -v tests/test_database.py`.
+"""
+
+import csv
+import pytest
+from datetime import datetime
+
+import application
+from application import database, perform_update
+from application.database import (
+    update_db,
+    format_copy_records,
+    prepare_staging_tables,
+    add_contest_participants_to_staging,
+    add_problems_solved_to_staging,
+    update_users_ratings,
+    get_submission_watermarks,
+    get_contest_dates,
+    bump_data_generation,
+    get_data_generation,
+    get_statistics_generation,
+)
+from application.models.orm import db
+from application.partitioning import (
+    get_partition_column,
+    get_partition_ranges,
+    init_partitions,
+    is_partitioned,
+)
+from application.models.records import (
+    ContestRecord,
+    ProblemRecord,
+    RatingChangeRecord,
+    SubmissionRecord,
+    UserRecord,
+)
+from application.models.models import (
+    Contest,
+    ContestParticipant,
+    ProblemSolved,
+    ProblemTag,
+    User,
+    Tag,
+    Language,
+    Metadata,
+    UserProblemStat,
+)
+
+
+def make_user(handle: str):
+    """
+    Returns a user record as returned by the Codeforces fetchers.
+
+    Arguments:
+    * handle - The handle of the user.
+    """
+
+    return UserRecord(
+        handle=handle,
+        creation_date=datetime(2020, 1, 1),
+        rating=1000,
+        max_rating=2000,
+        rank="test_rank",
+    )
+
+
+def make_problem_solved(handle: str, contest_id: int, index: str, solved_time: str):
+    """
+    Returns a submission record as returned by the Codeforces fetchers.
+
+    Arguments:
+    * handle - The handle of the user.
+    * contest_id - The contest ID of the problem.
+    * index - The index of the problem in the contest.
+    * solved_time - The date the problem was solved on, in ISO format.
+    """
+
+    return SubmissionRecord(
+        handle=handle,
+        contest_id=contest_id,
+        index=index,
+        rating=1000,
+        tags=("tag1", "tag2"),
+        language="test_language",
+        solved_time=datetime.fromisoformat(solved_time),
+    )
+
+
+def make_contest_participant(handle: str, contest_id: int):
+    """
+    Returns a rating change record as returned by the Codeforces fetchers.
+
+    Arguments:
+    * handle - The handle of the user.
+    * contest_id - The ID of the contest.
+    """
+
+    return RatingChangeRecord(
+        handle=handle,
+        contest_id=contest_id,
+        rank=1,
+        old_rating=1000,
+        new_rating=1100,
+        rating_update_time=datetime(2020, 1, 1),
+    )
+
+
+def run_update(
+    app,
+    contests: list[dict],
+    problems: list[dict],
+    users_information: list[dict],
+    users_contests: list[list[dict]],
+    users_problems: list[list[dict]],
+    submission_watermarks: dict[str, int],
+    **kwargs,
+):
+    """
+    Writes the users' contests and problems to the staging tables and updates the database,
+    like perform_update does.
+
+    Arguments:
+    * app - The Flask application.
+    * contests, problems, users_information - As passed to update_db.
+    * users_contests - List of lists of contests participated in, one per user or contest.
+    * users_problems - List of lists of problems solved, one per user.
+    * submission_watermarks - As passed to update_db.
+    * kwargs - Passed to update_db.
+    """
+
+    with app.app_context():
+        prepare_staging_tables()
+        for contest_participants in users_contests:
+            add_contest_participants_to_staging(contest_participants)
+        for problems_solved in users_problems:
+            add_problems_solved_to_staging(problems_solved)
+
+    update_db(
+        app, contests, problems, users_information, submission_watermarks, **kwargs
+    )
+
+
+@pytest.mark.usefixtures("app")
+class TestUpdateDB:
+    """
+    Tests for the database update, with both strategies of updating the per-user tables.
+    """
+
+    @pytest.fixture(autouse=True, params=["sync", "swap"])
+    def update_strategy(self, request, monkeypatch):
+        """
+        Sets the strategy of updating the per-user tables.
+        """
+
+        monkeypatch.setenv("UPDATE_STRATEGY", request.param)
+        return request.param
+
+    def test_full_update(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN the database is updated with the complete data of the users
+        * THEN the data and submission watermarks are stored in the database
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [[], []],
+            [
+                [make_problem_solved("user_1", 1, "A", "2020-01-01")],
+                [make_problem_solved("user_2", 1, "B", "2020-01-02")],
+            ],
+            {"user_1": 10, "user_2": 20},
+        )
+
+        with app.app_context():
+            assert User.query.count() == 2
+            assert ProblemSolved.query.count() == 2
+            assert get_submission_watermarks() == {"user_1": 10, "user_2": 20}
+
+    def test_incremental_update(self, app):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the database is updated with only the new problems solved of some users
+        * THEN the previously stored problems solved of those users are kept, problems solved
+        again are not duplicated and the problems solved of the other users are replaced
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [[], []],
+            [
+                [make_problem_solved("user_1", 1, "A", "2020-01-01")],
+                [make_problem_solved("user_2", 1, "B", "2020-01-02")],
+            ],
+            {"user_1": 10, "user_2": 20},
+        )
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [[], []],
+            [
+                [
+                    # Solved again in a newer submission.
+                    make_problem_solved("user_1", 1, "A", "2020-02-01"),
+                    make_problem_solved("user_1", 1, "C", "2020-02-01"),
+                ],
+                [make_problem_solved("user_2", 1, "D", "2020-02-02")],
+            ],
+            {"user_1": 15, "user_2": 25},
+            incremental_problems_handles={"user_1"},
+        )
+
+        with app.app_context():
+            user_1_problems = {
+                (problem.index, problem.solved_time.month)
+                for problem in ProblemSolved.query.filter_by(handle="user_1")
+            }
+            user_2_problems = {
+                problem.index
+                for problem in ProblemSolved.query.filter_by(handle="user_2")
+            }
+
+            assert user_1_problems == {("A", 1), ("C", 2)}
+            assert user_2_problems == {"D"}
+            assert get_submission_watermarks() == {"user_1": 15, "user_2": 25}
+
+    def test_incremental_contests_update(self, app):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the database is updated with only the participants of new contests
+        * THEN the previously stored contests participated in are kept and rating changes
+        fetched again are not duplicated
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [
+                [make_contest_participant("user_1", 1)],
+                [make_contest_participant("user_2", 1)],
+            ],
+            [[], []],
+            {},
+        )
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2"), make_user("user_3")],
+            [
+                # Participants of the recent contests 1 and 2.
+                [make_contest_participant("user_1", 1)],
+                [
+                    make_contest_participant("user_1", 2),
+                    make_contest_participant("user_2", 2),
+                ],
+                # Full history of the new user.
+                [make_contest_participant("user_3", 1)],
+            ],
+            [[], [], []],
+            {},
+            incremental_contests_handles={"user_1", "user_2"},
+        )
+
+        with app.app_context():
+            participations = {
+                (participant.handle, participant.contest_id)
+                for participant in ContestParticipant.query.all()
+            }
+
+            assert ContestParticipant.query.count() == 5
+            assert participations == {
+                ("user_1", 1),
+                ("user_1", 2),
+                ("user_2", 1),
+                ("user_2", 2),
+                ("user_3", 1),
+            }
+
+    def test_unchanged_contests_skipped(self, app):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the database is updated with the same contests
+        * THEN the Contest table is not rewritten, unless the contests changed
+        """
+
+        def make_contests():
+            return [
+                ContestRecord(
+                    contest_id=1,
+                    name="test_contest",
+                    date=datetime(2020, 1, 1),
+                    duration=100,
+                )
+            ]
+
+        run_update(app, make_contests(), [], [], [], [], {})
+
+        # Modify the stored contest, to detect whether the table is rewritten.
+        with app.app_context():
+            Contest.query.get(1).name = "modified_contest"
+            db.session.commit()
+
+        run_update(app, make_contests(), [], [], [], [], {})
+
+        with app.app_context():
+            assert Contest.query.get(1).name == "modified_contest"
+
+        changed_contests = make_contests()
+        changed_contests[0] = changed_contests[0]._replace(duration=200)
+        run_update(app, changed_contests, [], [], [], [], {})
+
+        with app.app_context():
+            assert Contest.query.get(1).name == "test_contest"
+            assert Contest.query.get(1).duration == 200
+
+    def test_diff_sync(self, app, update_strategy):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the database is updated with the complete data of the users again
+        * THEN unchanged rows are left untouched, changed rows are updated and the rows of
+        users who left the organization are deleted
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [[make_contest_participant("user_1", 1)], []],
+            [
+                [
+                    make_problem_solved("user_1", 1, "A", "2020-01-01"),
+                    make_problem_solved("user_1", 1, "B", "2020-01-01"),
+                ],
+                [make_problem_solved("user_2", 1, "A", "2020-01-01")],
+            ],
+            {},
+        )
+
+        with app.app_context():
+            problem_a_id = (
+                ProblemSolved.query.filter_by(handle="user_1", index="A").one().id
+            )
+
+        rejudged_problem = make_problem_solved("user_1", 1, "B", "2020-01-01")._replace(
+            language="other_language"
+        )
+        refreshed_participant = make_contest_participant("user_1", 1)._replace(
+            new_rating=1200
+        )
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [[refreshed_participant]],
+            [[make_problem_solved("user_1", 1, "A", "2020-01-01"), rejudged_problem]],
+            {},
+        )
+
+        with app.app_context():
+            assert User.query.count() == 1
+            assert ProblemSolved.query.filter_by(handle="user_2").count() == 0
+            # Swapped tables are rewritten as a whole.
+            if update_strategy == "sync":
+                assert (
+                    ProblemSolved.query.filter_by(handle="user_1", index="A").one().id
+                    == problem_a_id
+                )
+            rejudged_language_id = (
+                ProblemSolved.query.filter_by(handle="user_1", index="B")
+                .one()
+                .language_id
+            )
+            assert Language.query.get(rejudged_language_id).name == "other_language"
+            assert ContestParticipant.query.one().new_rating == 1200
+
+    def test_incomplete_staging_table(self, app, update_strategy):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the per-user tables are swapped with staging tables having far fewer rows
+        * THEN the update is aborted and the stored data is kept
+        """
+
+        if update_strategy != "swap":
+            pytest.skip("Staging tables are only validated when they are swapped.")
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [],
+            [
+                [
+                    make_problem_solved("user_1", 1, "A", "2020-01-01"),
+                    make_problem_solved("user_1", 1, "B", "2020-01-01"),
+                    make_problem_solved("user_1", 1, "C", "2020-01-01"),
+                ]
+            ],
+            {"user_1": 10},
+        )
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [],
+            [[make_problem_solved("user_1", 1, "A", "2020-01-01")]],
+            {"user_1": 20},
+        )
+
+        with app.app_context():
+            assert ProblemSolved.query.count() == 3
+            assert get_submission_watermarks() == {"user_1": 10}
+
+    def test_dictionary_encoding(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN problems solved with tags and languages are stored
+        * THEN the tags and languages are added to the dictionaries once and the problems
+        solved refer to them by ID
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [],
+            [
+                [make_problem_solved("user_1", 1, "A", "2020-01-01")],
+                [
+                    make_problem_solved("user_2", 1, "A", "2020-01-01")._replace(
+                        tags=("tag2", "tag3"), language="other_language"
+                    )
+                ],
+            ],
+            {},
+        )
+
+        with app.app_context():
+            tag_ids = {tag.name: tag.id for tag in Tag.query.all()}
+            assert sorted(tag_ids.values()) == [0, 1, 2]
+            assert Language.query.count() == 2
+
+            problem_solved = ProblemSolved.query.filter_by(handle="user_2").one()
+            assert problem_solved.tag_mask == (1 << tag_ids["tag2"]) | (
+                1 << tag_ids["tag3"]
+            )
+
+    def test_statistics(self, app, client):
+        """
+        * GIVEN a Flask application
+        * WHEN the database is updated
+        * THEN the statistics of every user are computed and served by the all-users
+        routes, and the statistics of periods that started after the update are empty
+        """
+
+        run_update(
+            app,
+            [ContestRecord(1, "contest_1", datetime(2020, 1, 1), 7200)],
+            [],
+            [make_user("user_1"), make_user("user_2")],
+            [[make_contest_participant("user_1", 1)], []],
+            [
+                [
+                    make_problem_solved("user_1", 1, "A", "2020-01-01"),
+                    make_problem_solved(
+                        "user_1", 1, "B", datetime.now().isoformat(timespec="seconds")
+                    ),
+                ],
+                [],
+            ],
+            {"user_1": 10, "user_2": 20},
+        )
+
+        problem_statistics = client.get("/users/problems-solved").get_json()[
+            "problem_statistics"
+        ]
+        contest_statistics = client.get("/users/contests-participated").get_json()[
+            "contest_statistics"
+        ]
+
+        assert problem_statistics["user_1"]["all_time"]["total_problems"] == 2
+        assert problem_statistics["user_1"]["all_time"]["tags"] == {
+            "tag1": 2,
+            "tag2": 2,
+        }
+        assert problem_statistics["user_1"]["today"]["total_problems"] == 1
+        assert problem_statistics["user_2"]["all_time"]["total_problems"] == 0
+        assert contest_statistics["user_1"]["all_time"]["total_contests"] == 1
+        assert contest_statistics["user_1"]["all_time"]["best_rank"] == 1
+        assert contest_statistics["user_2"]["all_time"]["best_rank"] is None
+
+        # Statistics computed before the current month started are outdated. The data
+        # generation is incremented, since the cached responses are outdated as well.
+        with app.app_context():
+            db.session.merge(
+                Metadata(key="statistics_time", value=datetime(2020, 1, 1).isoformat())
+            )
+            bump_data_generation()
+            db.session.commit()
+
+        problem_statistics = client.get("/users/problems-solved").get_json()[
+            "problem_statistics"
+        ]
+
+        assert problem_statistics["user_1"]["all_time"]["total_problems"] == 2
+        assert problem_statistics["user_1"]["this_month"]["total_problems"] == 0
+        assert problem_statistics["user_1"]["today"]["total_problems"] == 0
+
+    def test_statistics_rebuilt_separately(self, app, monkeypatch):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the statistics cannot be rebuilt during an update
+        * THEN the data is updated regardless, since the statistics are rebuilt in a
+        separate transaction, and the statistics of the previous update are kept until
+        they are rebuilt before the next ratings refresh
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [],
+            [[make_problem_solved("user_1", 1, "A", "2020-01-01")]],
+            {"user_1": 10},
+        )
+
+        with app.app_context():
+            statistics_time = Metadata.query.get("statistics_time").value
+
+        def rebuild_statistics():
+            raise RuntimeError("Statistics cannot be rebuilt.")
+
+        monkeypatch.setattr(database, "rebuild_statistics", rebuild_statistics)
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [],
+            [
+                [
+                    make_problem_solved("user_1", 1, "A", "2020-01-01"),
+                    make_problem_solved("user_1", 1, "B", "2020-01-02"),
+                ]
+            ],
+            {"user_1": 20},
+        )
+
+        with app.app_context():
+            assert ProblemSolved.query.count() == 2
+            assert get_submission_watermarks() == {"user_1": 20}
+            assert Metadata.query.get("statistics_time").value == statistics_time
+            assert get_statistics_generation() != get_data_generation()
+
+        # The outdated statistics are rebuilt before the next ratings refresh (or update).
+        monkeypatch.undo()
+        update_users_ratings(app, [make_user("user_1")])
+
+        with app.app_context():
+            assert Metadata.query.get("statistics_time").value != statistics_time
+            assert get_statistics_generation() == get_data_generation()
+            assert (
+                UserProblemStat.query.filter_by(
+                    handle="user_1", period="all_time", dimension="total_problems"
+                )
+                .one()
+                .count
+                == 2
+            )
+
+    def test_problem_rated_after_solved(self, app):
+        """
+        * GIVEN a problem solved during its contest, before it was rated and tagged
+        * WHEN the database is updated incrementally once the problem is rated and tagged
+        * THEN the stored problem solved gets the rating and the tags of the problem
+        """
+
+        problem = ProblemRecord(1, "A", "problem_1", 0, "")
+        problem_solved = make_problem_solved("user_1", 1, "A", "2020-01-01")._replace(
+            rating=0, tags=()
+        )
+        run_update(
+            app,
+            [],
+            [problem],
+            [make_user("user_1")],
+            [],
+            [[problem_solved]],
+            {"user_1": 10},
+        )
+
+        # The submission is not fetched again, since it is below the watermark.
+        run_update(
+            app,
+            [],
+            [problem._replace(rating=1500, tags="greedy;math")],
+            [make_user("user_1")],
+            [],
+            [[]],
+            {"user_1": 10},
+            incremental_problems_handles={"user_1"},
+        )
+
+        with app.app_context():
+            tag_ids = {tag.name: tag.id for tag in Tag.query}
+            stored_problem_solved = ProblemSolved.query.one()
+
+            assert stored_problem_solved.rating == 1500
+            assert stored_problem_solved.tag_mask == (1 << tag_ids["greedy"]) | (
+                1 << tag_ids["math"]
+            )
+            assert (
+                UserProblemStat.query.filter_by(
+                    handle="user_1", period="all_time", dimension="ratings"
+                )
+                .one()
+                .key
+                == "1500"
+            )
+
+    def test_problem_tags(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN the database is updated with problems, and then with their tags changed
+        * THEN the tags of the problems are stored by ID, and follow the changes
+        """
+
+        problems = [
+            ProblemRecord(1, "A", "problem_1", 800, "greedy;math"),
+            ProblemRecord(2, "A", "problem_2", 800, ""),
+        ]
+        run_update(app, [], problems, [], [], [], {})
+
+        with app.app_context():
+            tag_names = {tag.id: tag.name for tag in Tag.query}
+            assert sorted(
+                (problem_tag.contest_id, tag_names[problem_tag.tag_id])
+                for problem_tag in ProblemTag.query
+            ) == [(1, "greedy"), (1, "math")]
+
+        problems[0] = problems[0]._replace(tags="math")
+        problems[1] = problems[1]._replace(tags="dp")
+        run_update(app, [], problems, [], [], [], {})
+
+        with app.app_context():
+            tag_names = {tag.id: tag.name for tag in Tag.query}
+            assert sorted(
+                (problem_tag.contest_id, tag_names[problem_tag.tag_id])
+                for problem_tag in ProblemTag.query
+            ) == [(1, "math"), (2, "dp")]
+
+    def test_contest_dates(self, app):
+        """
+        * GIVEN a Flask application and a database updated with some contests
+        * WHEN the contest dates are retrieved
+        * THEN they are read once per version of the contests, and read again once the
+        contests change
+        """
+
+        contest = ContestRecord(1, "contest_1", datetime(2020, 1, 1), 7200)
+        run_update(app, [contest], [], [], [], [], {})
+
+        with app.app_context():
+            assert get_contest_dates() == {1: datetime(2020, 1, 1)}
+
+            # The cached dates are used while the contests are unchanged.
+            Contest.query.get(1).date = datetime(2021, 1, 1)
+            db.session.commit()
+            assert get_contest_dates() == {1: datetime(2020, 1, 1)}
+
+        run_update(
+            app, [contest._replace(date=datetime(2022, 1, 1))], [], [], [], [], {}
+        )
+
+        with app.app_context():
+            assert get_contest_dates() == {1: datetime(2022, 1, 1)}
+
+    def test_ratings_refresh(self, app):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the users' ratings are refreshed
+        * THEN the ratings of the known users are updated and unknown users are ignored
+        """
+
+        run_update(app, [], [], [make_user("user_1")], [[]], [[]], {})
+
+        refreshed_user = make_user("user_1")._replace(rating=1500)
+        update_users_ratings(app, [refreshed_user, make_user("user_2")])
+
+        with app.app_context():
+            assert User.query.get("user_1").rating == 1500
+            assert User.query.get("user_2") is None
+
+    def test_pipelined_update(self, app, monkeypatch):
+        """
+        * GIVEN a Flask application and stubbed Codeforces fetchers
+        * WHEN a scheduled update is performed
+        * THEN the users' contests and problems retrieved are staged and stored, along with
+        the submission watermarks
+        """
+
+        monkeypatch.setattr(
+            application,
+            "get_organization_users_information",
+            lambda: [make_user("user_1"), make_user("user_2")],
+        )
+        monkeypatch.setattr(application, "get_all_contests", lambda: [])
+        monkeypatch.setattr(application, "get_all_problems", lambda: [])
+        monkeypatch.setattr(
+            application,
+            "get_organization_users_contests",
+            lambda handles: (
+                (handle, [make_contest_participant(handle, 1)]) for handle in handles
+            ),
+        )
+        monkeypatch.setattr(
+            application,
+            "get_organization_users_problems",
+            lambda handles, submission_watermarks: (
+                (handle, [make_problem_solved(handle, 1, "A", "2020-01-01")], 10)
+                for handle in handles
+            ),
+        )
+
+        perform_update(app)
+
+        with app.app_context():
+            assert User.query.count() == 2
+            assert ContestParticipant.query.count() == 2
+            assert ProblemSolved.query.count() == 2
+            assert get_submission_watermarks() == {"user_1": 10, "user_2": 10}
+
+    def test_failed_retrieval(self, app, monkeypatch):
+        """
+        * GIVEN a Flask application and a previously updated database
+        * WHEN the data retrieval fails after some data has been staged
+        * THEN the stored data is left untouched
+        """
+
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [],
+            [[make_problem_solved("user_1", 1, "A", "2020-01-01")]],
+            {"user_1": 10},
+        )
+
+        def get_organization_users_problems(handles, submission_watermarks):
+            yield "user_1", [make_problem_solved("user_1", 1, "B", "2020-01-02")], 20
+            raise ConnectionError("Codeforces is down.")
+
+        monkeypatch.setattr(
+            application,
+            "get_organization_users_information",
+            lambda: [make_user("user_1")],
+        )
+        monkeypatch.setattr(application, "get_all_contests", lambda: [])
+        monkeypatch.setattr(application, "get_all_problems", lambda: [])
+        monkeypatch.setattr(
+            application, "get_organization_users_contests", lambda handles: iter([])
+        )
+        monkeypatch.setattr(
+            application,
+            "get_organization_users_problems",
+            get_organization_users_problems,
+        )
+
+        perform_update(app)
+
+        with app.app_context():
+            assert [problem.index for problem in ProblemSolved.query.all()] == ["A"]
+            assert get_submission_watermarks() == {"user_1": 10}
+
+
+class TestBulkLoading:
+    """
+    Tests for the bulk loading of rows.
+    """
+
+    def test_copy_format(self):
+        """
+        * GIVEN rows containing separators, quotes, empty strings and NULL values
+        * WHEN the rows are formatted for PostgreSQL's COPY
+        * THEN every value is read back unchanged and NULL values are distinguishable
+        """
+
+        records = [("user_1", 'a,b;"c"', 1000), ("user_2", "", None)]
+
+        formatted = list(csv.reader(format_copy_records(records)))
+
+        assert formatted == [
+            ["user_1", 'a,b;"c"', "1000"],
+            ["user_2", "", "\\N"],
+        ]
+
+
+@pytest.mark.usefixtures("app")
+class TestPartitioning:
+    """
+    Tests for the partitioned storage mode.
+    """
+
+    def test_partition_ranges(self):
+        """
+        * GIVEN a date in December
+        * WHEN the partition ranges up to the following month are computed
+        * THEN the ranges are contiguous, yearly before the year of the date, monthly
+        from January of that year, and end with January of the following year
+        """
+
+        ranges = get_partition_ranges(datetime(2021, 12, 15).date())
+
+        assert ranges[0] == (
+            "2010",
+            datetime(2010, 1, 1).date(),
+            datetime(2011, 1, 1).date(),
+        )
+        assert ranges[10][0] == "2020"
+        assert ranges[11] == (
+            "2021_01",
+            datetime(2021, 1, 1).date(),
+            datetime(2021, 2, 1).date(),
+        )
+        assert ranges[-1][0] == "2022_01"
+        assert len(ranges) == 11 + 12 + 1
+        assert all(ranges[i][2] == ranges[i + 1][1] for i in range(len(ranges) - 1))
+
+    def test_partition_ranges_of_monthly_years(self):
+        """
+        * GIVEN a date in January and a previous year which already has monthly partitions
+        * WHEN the partition ranges are computed
+        * THEN that year stays partitioned by month, and the other years by year
+        """
+
+        ranges = get_partition_ranges(datetime(2022, 1, 15).date(), {2021})
+        suffixes = [suffix for suffix, _, _ in ranges]
+
+        assert suffixes[-14:] == [f"2021_{month:02}" for month in range(1, 13)] + [
+            "2022_01",
+            "2022_02",
+        ]
+        assert suffixes[:-14] == [str(year) for year in range(2010, 2021)]
+        assert all(ranges[i][2] == ranges[i + 1][1] for i in range(len(ranges) - 1))
+
+    def test_sqlite_unpartitioned(self, app, monkeypatch):
+        """
+        * GIVEN a Flask application using SQLite, with the partitioned storage mode enabled
+        * WHEN the database is updated
+        * THEN the mode is ignored and the tables are updated unpartitioned
+        """
+
+        monkeypatch.setenv("PARTITIONED_TABLES", "true")
+        monkeypatch.setenv("UPDATE_STRATEGY", "swap")
+
+        with app.app_context():
+            assert not is_partitioned()
+            assert get_partition_column(ProblemSolved.__table__) is None
+
+        init_partitions(app)
+        run_update(
+            app,
+            [],
+            [],
+            [make_user("user_1")],
+            [[make_contest_participant("user_1", 1)]],
+            [[make_problem_solved("user_1", 1, "A", "2020-01-01")]],
+            {"user_1": 1},
+        )
+
+        with app.app_context():
+            assert ProblemSolved.query.count() == 1
+            assert ContestParticipant.query.count() == 1
@@ -0,0 +1,95 @@
+"""
+Contains the testing functions for the JSON encoder of the responses. Tests for the JSON
+encoder ensure:
+* The responses are encoded as the same bytes as with Flask's encoder.
+
+To test this suite only, run `pytest -v tests/test_json_encoder.py`.
+"""
+
+import json
+import pytest
+from datetime import datetime
+
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+from application.utils.json_encoder import JSONEncoder
+
+
+def encode(payload: dict, encoder: type):
+    """
+    Encodes a payload the way jsonify does outside of debug mode.
+
+    Arguments:
+    * payload - The payload to encode.
+    * encoder - The JSON encoder class.
+    """
+
+    return json.dumps(payload, cls=encoder, separators=(",", ":"), sort_keys=True)
+
+
+@pytest.mark.usefixtures("app", "client")
+class TestJSONEncoder:
+    """
+    Tests for the JSON encoder.
+    """
+
+    def test_same_output(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN a response with string keys and dates is encoded
+        * THEN the output is the same as with Flask's encoder
+        """
+
+        payload = {
+            "last_update_time": "2020-01-01 00:00:00",
+            "problems": [
+                {"contest_id": 1, "index": "A", "name": "test_name", "rating": None},
+            ],
+            "contests": [{"contest_id": 1, "date": datetime(2020, 1, 1, 12, 30)}],
+        }
+
+        with app.app_context():
+            assert encode(payload, JSONEncoder) == encode(payload, FlaskJSONEncoder)
+
+    def test_integer_keys(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN a response with integer keys is encoded
+        * THEN the output is the same as with Flask's encoder, with the keys sorted as
+        integers
+        """
+
+        payload = {"ratings": {800: 1, 1000: 2, 3500: 3}, "total_problems": 6}
+
+        with app.app_context():
+            output = encode(payload, JSONEncoder)
+
+            assert output == encode(payload, FlaskJSONEncoder)
+            assert output.index('"800"') < output.index('"1000"')
+
+    def test_non_ascii_characters(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN a response with non-ASCII characters is encoded
+        * THEN the output is the same as with Flask's encoder, with the characters escaped
+        """
+
+        payload = {"contests": [{"contest_id": 1, "name": "Тест — 1"}]}
+
+        with app.app_context():
+            output = encode(payload, JSONEncoder)
+
+            assert output == encode(payload, FlaskJSONEncoder)
+            assert output.isascii()
+
+    def test_pretty_printing(self, app, client):
+        """
+        * GIVEN a Flask application in debug mode
+        * WHEN a route is requested
+        * THEN the response is pretty-printed by Flask's encoder
+        """
+
+        response = client.get("/problems")
+
+        assert response.status_code == 200
+        assert b"\n  " in response.get_data()
@@ -0,0 +1,109 @@
+"""
+Contains the testing functions for the schema migrations. Tests for the migrations ensure:
+* Outdated tables and missing indexes of an existing database are brought up to date.
+* The schema version is recorded, so that migrations are only applied once.
+
+To test this suite only, run `pytest -v tests/test_migrations.py`.
+"""
+
+import pytest
+from datetime import datetime
+
+from application.migrations import MIGRATIONS, get_schema_version, run_migrations
+from application.models.orm import db
+from application.models.models import Metadata, ProblemSolved, SubmissionWatermark
+
+
+@pytest.mark.usefixtures("app")
+class TestMigrations:
+    """
+    Tests for the schema migrations.
+    """
+
+    def test_fresh_database(self, app):
+        """
+        * GIVEN a Flask application with a newly created database
+        * WHEN the application is created
+        * THEN every migration is recorded as applied
+        """
+
+        with app.app_context():
+            assert get_schema_version() == len(MIGRATIONS)
+
+    def test_outdated_database(self, app):
+        """
+        * GIVEN a database created before the migrations, with an outdated problem_solved
+        table and without the newer indexes
+        * WHEN the migrations are applied
+        * THEN the table is recreated, the indexes are created, the submission watermarks
+        are reset and the schema version is recorded
+        """
+
+        with app.app_context():
+            db.session.execute(db.text("DROP TABLE problem_solved"))
+            db.session.execute(
+                db.text(
+                    "CREATE TABLE problem_solved (id INTEGER PRIMARY KEY, handle VARCHAR(100), "
+                    'contest_id INTEGER, "index" VARCHAR(5), rating INTEGER, tags VARCHAR(200), '
+                    "language VARCHAR(100), solved_time DATETIME)"
+                )
+            )
+            db.session.execute(
+                db.text("DROP INDEX ix_contest_participant_contest_id_rank")
+            )
+            db.session.add(SubmissionWatermark(handle="user_1", last_submission_id=10))
+            Metadata.query.filter_by(key="schema_version").delete()
+            db.session.commit()
+
+        run_migrations(app)
+
+        with app.app_context():
+            inspector = db.inspect(db.engine)
+            columns = {
+                column["name"] for column in inspector.get_columns("problem_solved")
+            }
+            problem_solved_indexes = {
+                index["name"] for index in inspector.get_indexes("problem_solved")
+            }
+            contest_participant_indexes = {
+                index["name"] for index in inspector.get_indexes("contest_participant")
+            }
+
+            assert {"tag_mask", "language_id"} <= columns
+            assert "tags" not in columns
+            assert "ix_problem_solved_handle_solved_time" in problem_solved_indexes
+            assert (
+                "ix_contest_participant_contest_id_rank" in contest_participant_indexes
+            )
+            assert SubmissionWatermark.query.count() == 0
+            assert get_schema_version() == len(MIGRATIONS)
+
+    def test_up_to_date_tables(self, app):
+        """
+        * GIVEN a database whose tables are up to date, with its schema version reset
+        * WHEN the migrations are applied again
+        * THEN the stored data is kept, since each migration only applies its own change
+        """
+
+        with app.app_context():
+            db.session.add(
+                ProblemSolved(
+                    handle="user_1",
+                    contest_id=1,
+                    index="A",
+                    rating=800,
+                    tag_mask=0,
+                    language_id=0,
+                    solved_time=datetime(2020, 1, 1),
+                )
+            )
+            db.session.add(SubmissionWatermark(handle="user_1", last_submission_id=10))
+            Metadata.query.filter_by(key="schema_version").delete()
+            db.session.commit()
+
+        run_migrations(app)
+
+        with app.app_context():
+            assert ProblemSolved.query.count() == 1
+            assert SubmissionWatermark.query.count() == 1
+            assert get_schema_version() == len(MIGRATIONS)
@@ -12,12 +12,15 @@ from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 
 from application.models.orm import db
+from application.utils.common import iterate_rows_by_handle
 from application.models.models import (
     User,
     Contest,
     ContestParticipant,
     Problem,
     ProblemSolved,
+    Tag,
+    Language,
     Metadata,
 )
 
@@ -264,6 +267,34 @@ class TestContestParticipantModel:
                 2020, 1, 1
             )
 
+    def test_rows_by_handle(self, app):
+        """
+        * GIVEN ContestParticipant objects of several users, stored in no particular order
+        * WHEN the rows are iterated by handle
+        * THEN each handle is yielded once, with all the rows of the user
+        """
+
+        with app.app_context():
+            for handle, contest_id in [("user_2", 1), ("user_1", 1), ("user_2", 2)]:
+                db.session.add(
+                    ContestParticipant(
+                        handle=handle,
+                        contest_id=contest_id,
+                        rank=1,
+                        old_rating=1000,
+                        new_rating=2000,
+                        rating_update_time=datetime(2020, 1, 1),
+                    )
+                )
+            db.session.commit()
+
+            rows_by_handle = {
+                handle: sorted(row["contest_id"] for row in rows)
+                for handle, rows in iterate_rows_by_handle(ContestParticipant.query)
+            }
+
+            assert rows_by_handle == {"user_1": [1], "user_2": [1, 2]}
+
 
 @pytest.mark.usefixtures("app")
 class TestProblemSolvedModel:
@@ -285,8 +316,8 @@ class TestProblemSolvedModel:
                 contest_id=1,
                 index="test_index",
                 rating=1000,
-                tags="tag1;tag2",
-                language="test_language",
+                tag_mask=0b101,
+                language_id=1,
                 solved_time=datetime(2020, 1, 1),
             )
             db.session.add(problem_solved)
@@ -300,11 +331,33 @@ class TestProblemSolvedModel:
             assert retrieved_problem_solved.handle == "test_handle"
             assert retrieved_problem_solved.index == "test_index"
             assert retrieved_problem_solved.rating == 1000
-            assert retrieved_problem_solved.tags.split(";") == ["tag1", "tag2"]
-            assert retrieved_problem_solved.language == "test_language"
+            assert retrieved_problem_solved.tag_mask == 0b101
+            assert retrieved_problem_solved.language_id == 1
             assert retrieved_problem_solved.solved_time == datetime(2020, 1, 1)
 
 
+@pytest.mark.usefixtures("app")
+class TestDictionaryModels:
+    """
+    Tests for the Tag and Language models.
+    """
+
+    def test_dictionary_creation(self, app):
+        """
+        * GIVEN a Flask application
+        * WHEN Tag and Language objects are created
+        * THEN the objects are stored in the database correctly
+        """
+
+        with app.app_context():
+            db.session.add(Tag(id=0, name="tag1"))
+            db.session.add(Language(id=0, name="test_language"))
+            db.session.commit()
+
+            assert Tag.query.get(0).name == "tag1"
+            assert Language.query.get(0).name == "test_language"
+
+
 @pytest.mark.usefixtures("app")
 class TestMetadataModel:
     """
@@ -0,0 +1,259 @@
+"""
+Contains the testing functions for the response cache. Tests for the response cache ensure:
+* Responses are served from the cache until the data changes.
+* The data generation is read again once RESPONSE_DATA_VERSION_TTL seconds have passed.
+* Responses cached on disk by one process are served by the others.
+* Query parameters not read by a route do not create new cache entries, and the on-disk
+cache is bounded.
+* Compressed responses are served to the clients accepting them.
+
+To test this suite only, run `pytest -v tests/test_response_cache.py`.
+"""
+
+import gzip
+import pytest
+from datetime import datetime
+from os import listdir
+
+from application import response_cache
+from application.database import bump_data_generation
+from application.models.orm import db
+from application.models.models import Problem, User
+
+
+def add_problem(app, contest_id: int):
+    """
+    Adds a problem to the database, without changing the data generation.
+
+    Arguments:
+    * app - The Flask application.
+    * contest_id - The contest ID of the problem.
+    """
+
+    with app.app_context():
+        db.session.add(
+            Problem(
+                contest_id=contest_id,
+                index="A",
+                name="test_name",
+                rating=1000,
+                tags="tag1;tag2",
+            )
+        )
+        db.session.commit()
+
+
+def bump_generation(app):
+    """
+    Increments the data generation, as an update does.
+
+    Arguments:
+    * app - The Flask application.
+    """
+
+    with app.app_context():
+        bump_data_generation()
+        db.session.commit()
+
+
+@pytest.mark.usefixtures("app", "client")
+class TestResponseCache:
+    """
+    Tests for the response cache.
+    """
+
+    def test_memory_cache(self, app, client):
+        """
+        * GIVEN a Flask application
+        * WHEN a route is requested again after the data changed
+        * THEN the cached response is served until the data generation is incremented
+        """
+
+        add_problem(app, 1)
+        assert len(client.get("/problems").get_json()["problems"]) == 1
+
+        add_problem(app, 2)
+        assert len(client.get("/problems").get_json()["problems"]) == 1
+
+        bump_generation(app)
+        assert len(client.get("/problems").get_json()["problems"]) == 2
+
+    def test_disk_cache(self, app, client, monkeypatch, tmp_path):
+        """
+        * GIVEN a Flask application with the on-disk cache enabled
+        * WHEN a route is requested by a process without the response in memory
+        * THEN the response cached on disk is served, and removed once the data
+        generation is incremented
+        """
+
+        monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path))
+
+        add_problem(app, 1)
+        assert len(client.get("/problems").get_json()["problems"]) == 1
+        assert len(listdir(tmp_path)) == 1
+
+        # Another process only has the response on disk.
+        response_cache.memory_cache.clear()
+        add_problem(app, 2)
+        assert len(client.get("/problems").get_json()["problems"]) == 1
+
+        bump_generation(app)
+        assert len(client.get("/problems").get_json()["problems"]) == 2
+        assert len(listdir(tmp_path)) == 1
+
+    def test_unread_parameters(self, app, client, monkeypatch, tmp_path):
+        """
+        * GIVEN a Flask application with the on-disk cache enabled
+        * WHEN a route is requested with query parameters it does not read
+        * THEN the response is cached once, regardless of their values
+        """
+
+        monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path))
+
+        add_problem(app, 1)
+        for i in range(10):
+            assert client.get(f"/problems?junk={i}").status_code == 200
+
+        assert len(response_cache.memory_cache) == 1
+        assert len(listdir(tmp_path)) == 1
+
+        # Parameters read by the route are part of the key.
+        client.get("/problems?min_rating=1000")
+        assert len(response_cache.memory_cache) == 2
+
+    def test_bounded_disk_cache(self, app, client, monkeypatch, tmp_path):
+        """
+        * GIVEN a Flask application with the on-disk cache enabled
+        * WHEN more responses than the on-disk cache holds are cached
+        * THEN the least recently used responses are removed from the disk
+        """
+
+        monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(response_cache, "RESPONSE_DISK_CACHE_SIZE", 3)
+
+        add_problem(app, 1)
+        for rating in range(5):
+            client.get(f"/problems?min_rating={rating}")
+
+        assert len(listdir(tmp_path)) == 3
+
+    def test_unsuccessful_responses(self, app, client):
+        """
+        * GIVEN a Flask application
+        * WHEN a route responds with an error
+        * THEN the response is not cached
+        """
+
+        assert client.get("/users/test_user").status_code == 404
+
+        with app.app_context():
+            db.session.add(
+                User(
+                    handle="test_user",
+                    creation_date=datetime(2020, 1, 1),
+                    rating=1000,
+                    max_rating=2000,
+                    rank="test_rank",
+                )
+            )
+            db.session.commit()
+
+        assert client.get("/users/test_user").status_code == 200
+
+    def test_conditional_requests(self, app, client):
+        """
+        * GIVEN a Flask application and a response with an ETag and a Last-Modified time
+        * WHEN the response is revalidated with If-None-Match or If-Modified-Since
+        * THEN 304 Not Modified is returned until the data generation is incremented
+        """
+
+        add_problem(app, 1)
+        response = client.get("/problems")
+        etag, last_modified = (
+            response.headers["ETag"],
+            response.headers["Last-Modified"],
+        )
+
+        response = client.get("/problems", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.get_data() == b""
+        assert response.headers["ETag"] == etag
+
+        response = client.get("/problems", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        # The ETag differs for other requests.
+        response = client.get(
+            "/problems?min_rating=1000", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+
+        bump_generation(app)
+
+        response = client.get("/problems", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+        response = client.get("/problems", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 200
+
+    def test_cached_data_version(self, app, client, monkeypatch):
+        """
+        * GIVEN a Flask application and a cached response
+        * WHEN the data generation is incremented
+        * THEN the cached response is served until the data generation is read again
+        """
+
+        monkeypatch.setattr(response_cache, "RESPONSE_DATA_VERSION_TTL", 60)
+        response_cache.data_version = None
+
+        add_problem(app, 1)
+        etag = client.get("/problems").headers["ETag"]
+
+        add_problem(app, 2)
+        bump_generation(app)
+
+        response = client.get("/problems")
+        assert response.headers["ETag"] == etag
+        assert len(response.get_json()["problems"]) == 1
+
+        monkeypatch.setattr(response_cache, "RESPONSE_DATA_VERSION_TTL", 0)
+
+        response = client.get("/problems")
+        assert response.headers["ETag"] != etag
+        assert len(response.get_json()["problems"]) == 2
+
+    def test_compressed_responses(self, app, client, monkeypatch, tmp_path):
+        """
+        * GIVEN a Flask application with a large and a small response
+        * WHEN the responses are requested by a client accepting gzip
+        * THEN the large response is served compressed, with its own ETag, and the small
+        response is served uncompressed
+        """
+
+        monkeypatch.setenv("RESPONSE_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(response_cache, "brotli", None)
+
+        for contest_id in range(100):
+            add_problem(app, contest_id)
+
+        response = client.get("/problems")
+        compressed_response = client.get(
+            "/problems", headers={"Accept-Encoding": "gzip, deflate"}
+        )
+
+        assert compressed_response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in compressed_response.headers["Vary"]
+        assert gzip.decompress(compressed_response.get_data()) == response.get_data()
+        assert compressed_response.headers["ETag"] != response.headers["ETag"]
+
+        # The compressed response is served from the disk by another process.
+        response_cache.memory_cache.clear()
+        compressed_response = client.get(
+            "/problems", headers={"Accept-Encoding": "gzip"}
+        )
+        assert gzip.decompress(compressed_response.get_data()) == response.get_data()
+
+        response = client.get("/organization", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert response.get_json() is not None
@@ -18,6 +18,9 @@ from application.models.models import (
     ContestParticipant,
     Problem,
     ProblemSolved,
+    ProblemTag,
+    Tag,
+    Language,
 )
 
 
@@ -234,14 +237,17 @@ class TestUserRoutes:
                     tags="tag1;tag2",
                 )
             )
+            db.session.add(Tag(id=0, name="tag1"))
+            db.session.add(Tag(id=1, name="tag2"))
+            db.session.add(Language(id=0, name="test_language"))
             db.session.add(
                 ProblemSolved(
-                    handle="test_handle",
+                    handle="test_user",
                     contest_id=1,
                     index="test_index",
                     rating=1000,
-                    tags="tag1;tag2",
-                    language="test_language",
+                    tag_mask=0b11,
+                    language_id=0,
                     solved_time=datetime(2020, 1, 1),
                 )
             )
@@ -285,14 +291,17 @@ class TestUserRoutes:
                     tags="tag1;tag2",
                 )
             )
+            db.session.add(Tag(id=0, name="tag1"))
+            db.session.add(Tag(id=1, name="tag2"))
+            db.session.add(Language(id=0, name="test_language"))
             db.session.add(
                 ProblemSolved(
-                    handle="test_handle",
+                    handle="test_user",
                     contest_id=1,
                     index="test_index",
                     rating=1000,
-                    tags="tag1;tag2",
-                    language="test_language",
+                    tag_mask=0b11,
+                    language_id=0,
                     solved_time=datetime(2020, 1, 1),
                 )
             )
@@ -309,6 +318,11 @@ class TestUserRoutes:
         assert response.get_json()["last_update_time"] is not None
         assert response.get_json()["problem_statistics"] is not None
 
+        # The tags and language are decoded from their IDs.
+        all_time = response.get_json()["problem_statistics"]["all_time"]
+        assert all_time["tags"] == {"tag1": 1, "tag2": 1}
+        assert all_time["languages"] == {"test_language": 1}
+
 
 @pytest.mark.usefixtures("app", "client")
 class TestContestRoutes:
@@ -421,6 +435,48 @@ class TestContestRoutes:
         assert response.get_json()["last_update_time"] is not None
         assert response.get_json()["contest_standings"] is not None
 
+    def test_contests_routes_with_filters_and_pagination(self, app, client):
+        """
+        * GIVEN a Flask application and contests in the database
+        * WHEN the '/contests' route is requested with filters, page by page
+        * THEN check only the contests matching the filters are returned, once and in the
+        order of their dates
+        * IF a filter is invalid, check the status code is 400
+        """
+
+        with app.app_context():
+            for contest_id, name, date in [
+                (1, "Codeforces Round 1", datetime(2020, 1, 3, 12)),
+                (2, "Codeforces Round 2", datetime(2020, 1, 2, 12)),
+                (3, "Educational Round 3", datetime(2020, 1, 2, 12)),
+                (4, "Codeforces Round 4", datetime(2020, 1, 1, 12)),
+                (5, "Codeforces Round 5", datetime(2020, 1, 4, 12)),
+            ]:
+                db.session.add(
+                    Contest(contest_id=contest_id, name=name, date=date, duration=100)
+                )
+            db.session.commit()
+
+        contests = []
+        cursor = ""
+        while cursor is not None:
+            response = client.get(
+                "/contests?start_date=2020-01-02&end_date=2020-01-03"
+                f"&limit=1&{f'cursor={cursor}' if cursor else ''}"
+            )
+            contests += response.get_json()["contests"]
+            cursor = response.get_json()["next_cursor"]
+
+        assert [contest["contest_id"] for contest in contests] == [2, 3, 1]
+
+        response = client.get("/contests?name_prefix=Codeforces&limit=2")
+        assert [
+            contest["contest_id"] for contest in response.get_json()["contests"]
+        ] == [4, 2]
+
+        response = client.get("/contests?start_date=01-01-2020")
+        assert response.status_code == 400
+
 
 @pytest.mark.usefixtures("app", "client")
 class TestProblemRoutes:
@@ -453,3 +509,115 @@ class TestProblemRoutes:
         assert response.get_json() is not None
         assert response.get_json()["last_update_time"] is not None
         assert response.get_json()["problems"] is not None
+
+    def test_problems_routes_with_filters(self, app, client):
+        """
+        * GIVEN a Flask application and problems of different ratings and tags
+        * WHEN the '/problems' route is requested with filters
+        * THEN check only the problems matching the filters are returned
+        * IF a filter is invalid, check the status code is 400
+        """
+
+        tag_ids = {"greedy": 0, "math": 1, "greedy math": 2}
+
+        with app.app_context():
+            for name, tag_id in tag_ids.items():
+                db.session.add(Tag(id=tag_id, name=name))
+            for contest_id, rating, tags in [
+                (1, 800, ["greedy", "math"]),
+                (2, 1500, ["math"]),
+                (3, 2000, ["greedy math"]),
+            ]:
+                db.session.add(
+                    Problem(
+                        contest_id=contest_id,
+                        index="A",
+                        name="test_name",
+                        rating=rating,
+                        tags=";".join(tags),
+                    )
+                )
+                for tag in tags:
+                    db.session.add(
+                        ProblemTag(
+                            tag_id=tag_ids[tag], contest_id=contest_id, index="A"
+                        )
+                    )
+            db.session.commit()
+
+        response = client.get("/problems?min_rating=1000&max_rating=2000")
+        assert [
+            problem["contest_id"] for problem in response.get_json()["problems"]
+        ] == [2, 3]
+
+        response = client.get("/problems?tag=greedy")
+        assert [
+            problem["contest_id"] for problem in response.get_json()["problems"]
+        ] == [1]
+
+        response = client.get("/problems?tag=unknown")
+        assert response.get_json()["problems"] == []
+
+        # The tag filter is combined with the other filters and the pagination.
+        response = client.get("/problems?tag=math&max_rating=1500&limit=1")
+        assert [
+            problem["contest_id"] for problem in response.get_json()["problems"]
+        ] == [1]
+        response = client.get(
+            "/problems?tag=math&max_rating=1500&limit=1"
+            f"&cursor={response.get_json()['next_cursor']}"
+        )
+        assert [
+            problem["contest_id"] for problem in response.get_json()["problems"]
+        ] == [2]
+
+        response = client.get("/problems?min_rating=easy")
+        assert response.status_code == 400
+
+    def test_problems_routes_with_pagination(self, app, client):
+        """
+        * GIVEN a Flask application and problems in the database
+        * WHEN the '/problems' route is requested page by page
+        * THEN check every problem is returned once, in order, and the last page has no
+        next cursor
+        * IF the cursor or the limit is invalid, check the status code is 400
+        """
+
+        with app.app_context():
+            for contest_id in (2, 1):
+                for index in ("B", "A"):
+                    db.session.add(
+                        Problem(
+                            contest_id=contest_id,
+                            index=index,
+                            name="test_name",
+                            rating=1000,
+                            tags="tag1;tag2",
+                        )
+                    )
+            db.session.commit()
+
+        # Unpaginated responses have no cursor.
+        response = client.get("/problems")
+        assert "next_cursor" not in response.get_json()
+
+        problems = []
+        response = client.get("/problems?limit=3")
+        problems += response.get_json()["problems"]
+        assert len(problems) == 3
+
+        response = client.get(
+            f"/problems?limit=3&cursor={response.get_json()['next_cursor']}"
+        )
+        problems += response.get_json()["problems"]
+        assert response.get_json()["next_cursor"] is None
+
+        assert [(problem["contest_id"], problem["index"]) for problem in problems] == [
+            (1, "A"),
+            (1, "B"),
+            (2, "A"),
+            (2, "B"),
+        ]
+
+        assert client.get("/problems?cursor=invalid").status_code == 400
+        assert client.get("/problems?limit=0").status_code == 400